@@ -0,0 +1,54 @@
+"""Benchmark the size of prompt context: raw API repr vs compact projections.
+
+Usage (from the project root):
+    python -m benchmarks.bench_prompt_projection [path/to/player_data.json]
+
+The input file must contain the 'profile' and 'battlelog' API payloads, like
+notebooks/player_data.json. Token counts are estimated with the same counter
+used by PromptGenerator when packing context.
+"""
+
+import json
+import sys
+
+from src.ai_insights.infrastructure.adapters.llm.context_packer import estimate_tokens
+from src.ai_insights.infrastructure.adapters.llm.context_projection import (
+    serialize_battlelog,
+    serialize_profile,
+)
+
+
+def _row(name: str, raw_text: str, compact_text: str) -> None:
+    raw_tokens = estimate_tokens(raw_text)
+    compact_tokens = estimate_tokens(compact_text)
+    print(
+        f"{name:<22}{len(raw_text):>10,}{len(compact_text):>10,}"
+        f"{raw_tokens:>10,}{compact_tokens:>10,}{raw_tokens / max(compact_tokens, 1):>9.1f}x"
+    )
+
+
+def main(path: str = "notebooks/player_data.json") -> None:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    profile, battlelog = data["profile"], data["battlelog"]
+
+    print(f"{'payload':<22}{'raw chars':>10}{'compact':>10}{'raw tok':>10}{'cmp tok':>10}{'ratio':>10}")
+    _row(
+        "profile (description)",
+        str(profile),
+        "\n".join(serialize_profile(profile, "player_description")),
+    )
+    _row(
+        "profile (recommend.)",
+        str(profile),
+        "\n".join(serialize_profile(profile, "recommendations")),
+    )
+    _row(
+        "battlelog",
+        str(battlelog),
+        "\n".join(serialize_battlelog(battlelog, profile.get("tag"))),
+    )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
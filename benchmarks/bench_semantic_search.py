@@ -0,0 +1,73 @@
+"""Benchmark the semantic search of replays: per-replay loop vs batched search.
+
+Usage (from the project root):
+    python -m benchmarks.bench_semantic_search [n_replays ...]
+
+Replays and recommendations get random embeddings of the size produced by
+SSEMEmbedder (768, all-mpnet-base-v2). Both searches must select the same replays; the loop is
+semantic_search called once per recommendation, as cli.py used to do.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from src.ai_insights.application.dtos.insight_dtos import RecommendedCharacterDTO
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.use_cases.semantic_search import (
+    batch_semantic_search,
+    semantic_search,
+)
+from src.ai_insights.domain.embedding import Embedding
+
+DIMENSION = 768
+N_RECOMMENDATIONS = 3
+TRESHOLD = 0.05
+
+
+def _replays(vectors: np.ndarray) -> list:
+    return [
+        ReplayDTO(id=ix, title=f"Replay {ix}", character_id=ix % 80, replay_description="",
+                  embedding=Embedding(id=ix, text_id=ix, model_id=1, vector=vector.reshape(1, -1)),
+                  video_path="")
+        for ix, vector in enumerate(vectors)
+    ]
+
+
+def _recommendations(vectors: np.ndarray) -> list:
+    return [
+        RecommendedCharacterDTO(character_id=str(ix), character_name=f"Brawler {ix}", reasoning="",
+                                embedding=Embedding(id=ix, text_id=ix, model_id=1, vector=vector.reshape(1, -1)))
+        for ix, vector in enumerate(vectors)
+    ]
+
+
+def _best_of(fn, repeat: int = 3) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(*sizes: str) -> None:
+    rng = np.random.default_rng(0)
+    recommendations = _recommendations(rng.normal(size=(N_RECOMMENDATIONS, DIMENSION)))
+
+    print(f"{'replays':>10}{'loop (ms)':>12}{'batch (ms)':>12}{'speedup':>10}{'matches':>10}")
+    for size in [int(size) for size in sizes] or [100, 1_000, 5_000]:
+        replays = _replays(rng.normal(size=(size, DIMENSION)))
+        loop_seconds, loop_results = _best_of(
+            lambda: [semantic_search(recommendation, replays, TRESHOLD) for recommendation in recommendations])
+        batch_seconds, batch_results = _best_of(
+            lambda: batch_semantic_search(recommendations, replays, TRESHOLD))
+        assert [sorted(r.id for r in found) for found in loop_results] == \
+            [sorted(r.id for r in found) for found in batch_results]
+        print(f"{size:>10,}{loop_seconds * 1000:>12.1f}{batch_seconds * 1000:>12.1f}"
+              f"{loop_seconds / batch_seconds:>9.0f}x{sum(map(len, batch_results)):>10,}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -4,35 +4,53 @@ import os
 import subprocess
 import sys
 
-import pandas as pd
 from dotenv import load_dotenv
 
 from src.ai_insights.infrastructure.adapters.llm.api_service import ApiService
-from src.ai_insights.domain.embedding import Embedding
 
 from src.ai_insights.application.use_cases import list_replays_by_recom
 
-from src.ai_insights.infrastructure.adapters.database.replays_df_repo import (
-    ReplaysDfRepo,
+from src.ai_insights.infrastructure.adapters.database.replay_embeddings import (
+    load_replays_with_embeddings,
+)
+from src.ai_insights.infrastructure.adapters.database.replay_vector_index import (
+    ReplayVectorIndex,
+)
+from src.ai_insights.infrastructure.adapters.database.replays_index_repo import (
+    ReplaysIndexRepo,
 )
 
 from src.ai_insights.infrastructure.adapters.game_api_clients.brawl_stars_client import (
     BrawlStarsClient,
 )
+from src.ai_insights.infrastructure.adapters.game_api_clients.rankings_cache import (
+    InMemoryRankingsCache,
+)
 
+from src.ai_insights.infrastructure.adapters.llm.clip_analysis_store import ClipAnalysisStore
 from src.ai_insights.infrastructure.adapters.llm.ssem_embedder import SSEMEmbedder
-from src.ai_insights.application.dtos.insight_dtos import RecommendedCharacterDTO
-from src.ai_insights.application.use_cases.semantic_search import semantic_search
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER
+from src.ai_insights.infrastructure.adapters.llm.response_schemas import (
+    parse_recommendations,
+    to_recommended_character_dtos,
+)
+from src.ai_insights.application.use_cases.nearest_replays import nearest_replays_by_recom
 
 
 load_dotenv()
 from src.ai_insights.infrastructure.adapters.llm.clip_context_generator import (
+    batch_clip_analysis,
     brawler_clip_analysis,
 )
 
 API_KEY = os.getenv("BRAWLSTARS_TOKEN")
 EMBEDDER_MODEL = SSEMEmbedder()
 SEMANTIC_SEARCH_TRESHOLD = 0.3
+SEMANTIC_SEARCH_TOP_K = 5
+CLIP_ANALYSES_PATH = "data/processed/clip_analyses.jsonl"
+CLIPS_DIR = "data/raw/clips"
+# rankings change slowly: shared by every replay lookup of the session
+RANKINGS_CACHE = InMemoryRankingsCache(ttl_seconds=3600)
 
 
 # Remember to set brawl api token
@@ -64,7 +82,7 @@ def get_insights():
     respuesta = input("Do you want to get player insights? (yes/no): ")
     if respuesta.strip().lower() in ("si", "yes", "y"):
         user_id = input("User ID:  (numbers only, eg. 9JVU8RC): ")
-        api = ApiService(game="brawl", user_id="%23" + user_id)
+        api = ApiService(game="brawl", user_id="%23" + user_id, debug=True)
         insights = api.get_ai_insights()
 
         print(insights["player_description"], "\n\n\n\n")
@@ -87,99 +105,65 @@ def embed_data() -> None:
 
 
 def show_replays_matching_recommendations(recommendations):
-    # parse recommendations
-    if recommendations.startswith("```json"):
-        recommendations = recommendations[7:]  # Remove ```json\n
-    if recommendations.endswith("```"):
-        recommendations = recommendations[:-3]  # Remove ```
-    recommendations_dict = json.loads(recommendations)
-    recommendations = recommendations_dict["recommendations"]
+    # parse recommendations (validated by the structured output of the recommendations stage)
+    recommendations = parse_recommendations(recommendations)["recommendations"]
 
     # load brawlers and ids data
     with open("data/processed/brawlers_to_ids.json", "r") as f:
         brawler_to_id = json.load(f)
 
-    # add brawler_id to each recommendation
-    for ix, recommendation in enumerate(recommendations):
-        brawler_name = recommendation["brawler_name"].upper()
-        brawler_id = brawler_to_id.get(brawler_name)
-        recommendations[ix]["brawler_id"] = brawler_id
-
-    # embed recommendation tips
-    recommendations_keys = list(recommendations[0].keys())
-    tip_column = "concise_tip" if "concise_tip" in recommendations_keys else "tip"
-
-    concise_tips_list = [
-        recommendation[tip_column] for recommendation in recommendations
-    ]
-    tips_embeddings = EMBEDDER_MODEL.generate_embeddings(concise_tips_list)
-    for ix in range(len(recommendations)):
-        recommendations[ix]["concise_tip_embedding"] = tips_embeddings[ix]
-    # create recommendation objects
-    recommendations_objects = [
-        RecommendedCharacterDTO(
-            character_id=recommendation["brawler_id"],
-            character_name=recommendation["brawler_name"],
-            reasoning=recommendation[tip_column],
-            embedding=Embedding(
-                id=0,
-                text_id=0,
-                model_id=1,
-                vector=recommendation["concise_tip_embedding"],
-            ),
-        )
-        for recommendation in recommendations
-    ]
+    # embed recommendation tips and create recommendation objects
+    tips_embeddings = EMBEDDER_MODEL.generate_embeddings(
+        [recommendation["concise_tip"] for recommendation in recommendations]
+    )
+    recommendations_objects = to_recommended_character_dtos(
+        recommendations, brawler_to_id, tips_embeddings
+    )
 
-    # load replays data
-    videos_data_df = pd.read_csv("data/mock/mock_replays.csv")
-    replay_descriptions = videos_data_df["replay_description"].tolist()
-    # embed replay descriptions
-    video_descriptions_embeddings = EMBEDDER_MODEL.generate_embeddings(
-        replay_descriptions
+    # load replays data with their embeddings (only new or changed descriptions are embedded)
+    videos_data_df, video_descriptions_embeddings = load_replays_with_embeddings(
+        EMBEDDER_MODEL, "data/mock/mock_replays.csv"
     )
-    # add embeddings to dataframe
-    for ix, row in videos_data_df.iterrows():
-        embedding = video_descriptions_embeddings[ix]
-        embedding = Embedding(id=ix, text_id=ix, model_id=1, vector=embedding)
-        videos_data_df.at[ix, "embedding"] = embedding
 
     # get replays from players with the same brawler in the rank of brawlers (TOP)
-    replays_df_repo = ReplaysDfRepo(videos_data_df)
+    replays_repo = ReplaysIndexRepo.from_dataframe(
+        videos_data_df, vectors=video_descriptions_embeddings
+    )
+    # vectors of each brawler's replays and analyzed clips, searched per brawler
+    replay_index = ReplayVectorIndex.from_repo(replays_repo)
+    replay_index.follow_clip_analyses(
+        ClipAnalysisStore(CLIP_ANALYSES_PATH), EMBEDDER_MODEL, brawler_to_id, CLIPS_DIR
+    )
     brawl_stars_client = BrawlStarsClient(API_KEY)
 
     country_code = "global"
 
     print("\nRecovering replays for recommendations...\n")
-    recovered_replays = []
-    for recommendation in recommendations:
-        brawler_id = recommendation["brawler_id"]
-        endpoint = f"/v1/rankings/{country_code}/brawlers/{brawler_id}"
-
-        request = {
-            "endpoint": endpoint,
+    # rankings of all the recommended brawlers fetched concurrently, one repository query
+    requests = [
+        {
+            "endpoint": f"/v1/rankings/{country_code}/brawlers/{recommendation.character_id}",
             "filters": ["items", "tag"],
         }
-
-        replays_list = list_replays_by_recom.list_replays_by_recom(
-            request=request,
-            game_api_client=brawl_stars_client,
-            replays_repo=replays_df_repo,
-        )
-
-        recovered_replays.extend(replays_list)
-    # reshape for semantic search
-    for ix in range(len(recovered_replays)):
-        recovered_replays[ix].embedding.vector = recovered_replays[
-            ix
-        ].embedding.vector.reshape(1, -1)
-
+        for recommendation in recommendations_objects
+    ]
+    recovered_replays = list_replays_by_recom.list_replays_by_recoms(
+        requests=requests,
+        game_api_client=brawl_stars_client,
+        replays_repo=replays_repo,
+        tracer=TRACER,
+        rankings_cache=RANKINGS_CACHE,
+    )
+    # nearest replays of each recommended brawler, among the top players' replays and analyzed clips
+    allowed_keys = {replay.id for replay in recovered_replays} | replay_index.clip_keys()
     relevant_replays_objects = []
-    for recommendation in recommendations_objects:
-        recommendation.embedding.vector = recommendation.embedding.vector.reshape(1, -1)
-        relevant_replays = semantic_search(
-            recommendation, recovered_replays, SEMANTIC_SEARCH_TRESHOLD
-        )
+    for relevant_replays in nearest_replays_by_recom(
+        recommendations_objects,
+        replay_index,
+        k=SEMANTIC_SEARCH_TOP_K,
+        treshold=SEMANTIC_SEARCH_TRESHOLD,
+        allow=allowed_keys,
+    ):
         relevant_replays_objects.extend(relevant_replays)
 
     print("Relevant replays found: ", len(relevant_replays_objects))
@@ -200,9 +184,12 @@ def analyze_clip() -> bool:
     )
     if respuesta.strip().lower() in ("si", "yes", "s", "y"):
         brawler_name_input = input(
-            "Enter the Brawler's name for the video clip analysis (e.g., hank, piper): "
+            "Enter the Brawler's name for the video clip analysis (e.g., hank, piper), or 'all' for every clip: "
         )
-        if brawler_name_input.strip():
+        if brawler_name_input.strip().lower() == "all":
+            batch_clip_analysis()
+            did_run_analysis = True
+        elif brawler_name_input.strip():
             print(
                 f"CLI: Triggering video clip analysis for Brawler: {brawler_name_input.strip()}"
             )
@@ -235,9 +222,12 @@ def analyze_clip() -> bool:
     )
     if respuesta.strip().lower() in ("si", "yes", "s", "y"):
         brawler_name_input = input(
-            "Enter the Brawler's name for the video clip analysis (e.g., hank, piper): "
+            "Enter the Brawler's name for the video clip analysis (e.g., hank, piper), or 'all' for every clip: "
         )
-        if brawler_name_input.strip():
+        if brawler_name_input.strip().lower() == "all":
+            batch_clip_analysis()
+            did_run_analysis = True
+        elif brawler_name_input.strip():
             print(
                 f"CLI: Triggering video clip analysis for Brawler: {brawler_name_input.strip()}"
             )
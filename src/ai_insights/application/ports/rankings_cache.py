@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+from typing import Callable, FrozenSet, Hashable
+
+
+class RankingsCache(ABC):
+    """
+    Abstract base class for caching the player tags of game rankings.
+    """
+
+    @abstractmethod
+    def get_or_load(self, key: Hashable, load: Callable[[], FrozenSet[str]]) -> FrozenSet[str]:
+        """
+        Returns the cached tags of a ranking, loading them on a miss.
+
+        Args:
+            key (Hashable): The ranking, e.g. (country code, brawler id).
+            load (callable): Fetches the tags of the ranking.
+
+        Returns:
+            FrozenSet[str]: The player tags of the ranking.
+        """
+        pass
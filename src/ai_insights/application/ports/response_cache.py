@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class ResponseCache(ABC):
+    """
+    Abstract base class for caching LLM responses.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """
+        Retrieves a cached response.
+
+        Args:
+            key (str): The cache key of the request.
+
+        Returns:
+            Optional[str]: The cached response, or None if missing or expired.
+        """
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """
+        Stores a response in the cache.
+
+        Args:
+            key (str): The cache key of the request.
+            value (str): The response to store.
+        """
+        pass
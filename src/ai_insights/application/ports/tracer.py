@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+from typing import Any, ContextManager
+
+
+class Tracer(ABC):
+    """
+    Abstract base class for request tracing.
+    """
+
+    @abstractmethod
+    def span(self, name: str, **attributes: Any) -> ContextManager:
+        """
+        Opens a span around a block of work, child of the span currently open (if any).
+
+        Args:
+            name (str): Name of the operation.
+            **attributes: Attributes describing the operation.
+
+        Returns:
+            ContextManager: Yields the span, which accepts more attributes with set_attribute.
+        """
+        pass
@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from typing import AbstractSet, Any, Hashable, List, Optional, Tuple
+
+
+class VectorIndex(ABC):
+    """
+    Abstract base class for vector indexes of replays, partitioned by character.
+    """
+
+    @abstractmethod
+    def upsert(self, key: Hashable, character_id: Any, vector, payload: Any = None) -> None:
+        """
+        Adds an item to the index of a character, replacing any item with the same key.
+
+        Args:
+            key (Hashable): Identifier of the item.
+            character_id: Character the item belongs to.
+            vector: Embedding of the item.
+            payload (optional): Object returned with the item by the searches (e.g. a ReplayDTO).
+        """
+        pass
+
+    @abstractmethod
+    def search(self, character_id: Any, queries, k: int, treshold: Optional[float] = None,
+               allow: Optional[AbstractSet[Hashable]] = None) -> List[List[Tuple[Hashable, float]]]:
+        """
+        Searches the items of one character most similar to each query vector.
+
+        Args:
+            character_id: Character whose items are searched.
+            queries: Query vectors, one per row (or a single vector).
+            k (int): Maximum number of items per query.
+            treshold (float, optional): Minimum cosine similarity of the items.
+            allow (set, optional): Keys of the only items that may be returned.
+
+        Returns:
+            For each query, (key, similarity) pairs, most similar first.
+        """
+        pass
+
+    @abstractmethod
+    def payload(self, key: Hashable) -> Any:
+        """
+        Returns the payload of an item, or None.
+        """
+        pass
@@ -3,17 +3,28 @@
 This module contains the function to retrieve replays from a repository
 based on a recommendation. It fetches data from a game's API (e.g., Brawl Stars),
 processes it, and then fetches the relevant replays from a repository.
+The batch variant does it for many recommendations at once: their API calls
+run concurrently (and through a cache if given), and the repository is
+queried once with the union of their results.
 """
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, FrozenSet, List
+
 from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.ports.rankings_cache import RankingsCache
 from src.ai_insights.application.ports.repository import Repository
 from src.ai_insights.application.ports.game_api_client import GameAPIClient
+from src.ai_insights.application.ports.tracer import Tracer
 
 
 def list_replays_by_recom(
     request: str,
     game_api_client: GameAPIClient,
     replays_repo: Repository,
+    tracer: Tracer = None,
 ):
     """
     Lists replays based on a recommendation.
@@ -24,11 +35,16 @@ def list_replays_by_recom(
     Then it retrieves the relevant replays from the
     replays repository. The relevant replays are those that match the character
     associated with the recommendation and the recommendation's description.
+    If a tracer is given, the API call and the repository query are traced.
     """
-    api_response = game_api_client.get(request["endpoint"])
-    # extract information from the API response
-    relevant_data = game_api_client.retrieve_data(api_response, request["filters"])
-    relevant_replays = replays_repo.get(filters=relevant_data)
+    span_context = tracer.span("list_replays_by_recom", endpoint=request["endpoint"]) if tracer else nullcontext()
+    with span_context as span:
+        api_response = game_api_client.get(request["endpoint"])
+        # extract information from the API response
+        relevant_data = game_api_client.retrieve_data(api_response, request["filters"])
+        relevant_replays = replays_repo.get(filters=relevant_data)
+        if span is not None:
+            span.set_attribute("replays", len(relevant_replays))
 
     # build replay DTOs
     replay_dtos = [
@@ -44,3 +60,59 @@ def list_replays_by_recom(
     ]
 
     return replay_dtos
+
+
+def list_replays_by_recoms(
+    requests: List[Dict[str, Any]],
+    game_api_client: GameAPIClient,
+    replays_repo: Repository,
+    tracer: Tracer = None,
+    rankings_cache: RankingsCache = None,
+    max_workers: int = 8,
+) -> List[ReplayDTO]:
+    """
+    Lists the replays of many recommendations with one repository query.
+
+    The API calls of the distinct requests run concurrently; with a rankings
+    cache, the ids of an endpoint fetched recently (e.g. the ranking of the
+    same country and brawler) are reused instead. The ids of all the requests
+    are then retrieved from the replays repository in a single query.
+    """
+    unique_requests = list({request["endpoint"]: request for request in requests}.values())
+
+    def fetch_ids(request: Dict[str, Any]) -> FrozenSet:
+        def load() -> FrozenSet:
+            span_context = tracer.span("rankings_lookup", endpoint=request["endpoint"]) if tracer else nullcontext()
+            with span_context:
+                api_response = game_api_client.get(request["endpoint"])
+                return frozenset(game_api_client.retrieve_data(api_response, request["filters"])["ids"])
+
+        if rankings_cache is None:
+            return load()
+        return rankings_cache.get_or_load(request["endpoint"], load)
+
+    span_context = tracer.span("list_replays_by_recoms", requests=len(unique_requests)) if tracer else nullcontext()
+    with span_context as span:
+        workers = max(1, min(max_workers, len(unique_requests)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rankings") as pool:
+            # the copied contexts make the lookup spans children of this span
+            futures = [
+                pool.submit(contextvars.copy_context().run, fetch_ids, request)
+                for request in unique_requests
+            ]
+            ids = set().union(*(future.result() for future in futures))
+        relevant_replays = replays_repo.get(filters={"ids": sorted(ids)})
+        if span is not None:
+            span.set_attribute("replays", len(relevant_replays))
+
+    return [
+        ReplayDTO(
+            id=replay["id"],
+            title=replay["title"],
+            character_id=replay["character_id"],
+            replay_description=replay["replay_description"],
+            embedding=replay["embedding"],
+            video_path=replay["video_path"],
+        )
+        for replay in relevant_replays
+    ]
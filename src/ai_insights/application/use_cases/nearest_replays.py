@@ -0,0 +1,56 @@
+"""Module for getting the replays nearest to each recommendation.
+
+This module contains the function to retrieve, for each recommendation, the
+replays of the recommended character whose description is the most similar
+to the recommendation tip. It queries a vector index partitioned by
+character, so only the replays of the recommended character are scored.
+"""
+
+from typing import AbstractSet, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from src.ai_insights.application.dtos.insight_dtos import RecommendedCharacterDTO
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.ports.vector_index import VectorIndex
+
+
+def nearest_replays_by_recom(
+    recommendations: List[RecommendedCharacterDTO],
+    replay_index: VectorIndex,
+    k: int = 5,
+    treshold: Optional[float] = None,
+    allow: Optional[AbstractSet[Hashable]] = None,
+) -> List[List[ReplayDTO]]:
+    """
+    Lists the replays nearest to each recommendation.
+
+    The recommendations of the same character are searched together, in the
+    part of the index holding that character's replays.
+
+    Args:
+        recommendations: The recommendation objects containing the embeddings
+        replay_index: Index of the replays by character, with ReplayDTO payloads
+        k: Maximum number of replays per recommendation
+        treshold: Minimum cosine similarity of the replays
+        allow: Index keys of the only replays that may be returned (e.g. the
+            ids of the replays of top players)
+    Returns:
+        For each recommendation (in order), its replays, most similar first.
+    """
+    by_character: Dict[object, List[int]] = {}
+    for ix, recommendation in enumerate(recommendations):
+        by_character.setdefault(recommendation.character_id, []).append(ix)
+
+    results: List[List[ReplayDTO]] = [[] for _ in recommendations]
+    for character_id, indexes in by_character.items():
+        queries = np.stack(
+            [
+                np.asarray(recommendations[ix].embedding.vector, dtype=np.float32).reshape(-1)
+                for ix in indexes
+            ]
+        )
+        matches = replay_index.search(character_id, queries, k, treshold, allow)
+        for ix, query_matches in zip(indexes, matches):
+            results[ix] = [replay_index.payload(key) for key, _ in query_matches]
+    return results
@@ -5,9 +5,13 @@ replays based on their description's similarity with a text, which is
 the recommendations made by our system. It handles:
 - Similarity calculations
 - Threshold-based filtering of results
+- Batched scoring of many recommendations with one matrix product, keeping
+  the top-k replays of each
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
 from src.ai_insights.application.dtos.insight_dtos import (
@@ -42,3 +46,51 @@ def semantic_search(
     ]
 
     return relevant_replays
+
+
+def _unit_rows(vectors: List[Any]) -> np.ndarray:
+    """Stacks vectors (of any shape, e.g. (1, d)) into a float32 matrix of unit rows."""
+    matrix = np.stack([np.asarray(vector, dtype=np.float32).reshape(-1) for vector in vectors])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # zero vectors stay zero (similarity 0) instead of dividing by zero
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def batch_semantic_search(
+    recommendations: List[RecommendedCharacterDTO],
+    replays: List[ReplayDTO],
+    treshold: float,
+    top_k: Optional[int] = None,
+) -> List[List[ReplayDTO]]:
+    """
+    Perform the semantic search of all the recommendations at once.
+
+    The replay vectors are normalized into one matrix, so the cosine similarities
+    of every recommendation with every replay are a single matrix product.
+
+    Args:
+        recommendations: The recommendation objects containing the embeddings
+        replays: List of replay objects to search through
+        treshold: Replays must have a cosine similarity above it
+        top_k: Maximum number of replays kept per recommendation. None keeps all.
+    Returns:
+        For each recommendation (in order), its relevant replays, most similar first.
+    """
+    if not recommendations:
+        return []
+    if not replays:
+        return [[] for _ in recommendations]
+
+    replay_matrix = _unit_rows([replay.embedding.vector for replay in replays])
+    query_matrix = _unit_rows([recommendation.embedding.vector for recommendation in recommendations])
+    scores = query_matrix @ replay_matrix.T
+
+    results = []
+    for row in scores:
+        candidates = np.flatnonzero(row > treshold)
+        if top_k is not None and len(candidates) > top_k:
+            # top-k in O(n), only those k get sorted
+            candidates = candidates[np.argpartition(-row[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-row[candidates], kind="stable")]
+        results.append([replays[ix] for ix in candidates])
+    return results
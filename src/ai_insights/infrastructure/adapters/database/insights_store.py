@@ -0,0 +1,75 @@
+"""Module implementing the keyed store of precomputed player insights.
+
+The batch precompute job writes the insights of each player tag here, and the
+web app reads them before computing insights on demand. Each tag is one JSON
+file, written atomically so readers never see a partial entry.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def normalize_tag(tag: str) -> str:
+    """Canonical form of a player tag: uppercase, without '#' or its URL encoding '%23'."""
+    tag = tag.strip().upper()
+    if tag.startswith("%23"):
+        tag = tag[3:]
+    return tag.lstrip("#")
+
+
+class InsightsStore:
+    """On-disk store of precomputed insights keyed by player tag."""
+
+    def __init__(self, store_dir: str = "data/processed/insights_store"):
+        """Initialize the store, creating its directory if needed.
+
+        Args:
+            store_dir: Directory holding one JSON file per player tag
+        """
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, tag: str) -> str:
+        return os.path.join(self.store_dir, f"{normalize_tag(tag)}.json")
+
+    def get(self, tag: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the stored entry of a tag.
+
+        Args:
+            tag: Player tag, with or without '#'
+            max_age_seconds: Entries older than this are ignored. None accepts any age.
+
+        Returns:
+            {'tag', 'insights', 'stats', 'stored_at'} or None if missing or too old
+        """
+        try:
+            with open(self._path(tag), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if max_age_seconds is not None and time.time() - entry["stored_at"] > max_age_seconds:
+            return None
+        return entry
+
+    def get_insights(self, tag: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """Return only the insight sections of a tag, or None if missing or too old."""
+        entry = self.get(tag, max_age_seconds)
+        return entry["insights"] if entry else None
+
+    def put(self, tag: str, insights: Dict[str, str], stats: Optional[Dict[str, Any]] = None) -> None:
+        """Store the insights of a tag, replacing any previous entry.
+
+        Args:
+            tag: Player tag, with or without '#'
+            insights: Insight sections as returned by ApiService.get_ai_insights
+            stats: Extra information about the run (timings, tokens...)
+        """
+        path = self._path(tag)
+        entry = {"tag": normalize_tag(tag), "insights": insights, "stats": stats or {}, "stored_at": time.time()}
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,141 @@
+"""
+This module implements the ingestion of replay embeddings.
+
+The embeddings of the replay descriptions are computed once and saved next to
+the replays file ('mock_replays.csv' -> 'mock_replays.embeddings.npy', with a
+'mock_replays.embeddings.json' manifest of the model and of the SHA-256 of the
+description embedded in each row). Later runs load the vectors and only embed
+the descriptions that are new or changed; the embeddings of removed replays
+are dropped. Changing the embedding model recomputes everything.
+
+Usage (from the project root):
+    python -m src.ai_insights.infrastructure.adapters.database.replay_embeddings [path/to/replays.csv]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.ai_insights.application.ports.embedder import Embedder
+
+DEFAULT_REPLAYS_PATH = "data/mock/mock_replays.csv"
+
+
+def description_hash(description: str) -> str:
+    return hashlib.sha256(str(description).encode("utf-8")).hexdigest()
+
+
+def embeddings_paths(replays_path: str) -> Tuple[str, str]:
+    """Paths of the vectors and of the manifest of a replays file."""
+    base, _ = os.path.splitext(replays_path)
+    return f"{base}.embeddings.npy", f"{base}.embeddings.json"
+
+
+def _model_name(embedder: Embedder) -> str:
+    return getattr(embedder, "model_name", type(embedder).__name__)
+
+
+class ReplayEmbeddings:
+    """Persisted embeddings of the descriptions of a replays file."""
+
+    def __init__(self, replays_path: str = DEFAULT_REPLAYS_PATH):
+        """Initialize the embeddings of a replays file, loading the saved ones if any.
+
+        Args:
+            replays_path: The replays CSV file; the embeddings are saved next to it
+        """
+        self.vectors_path, self.manifest_path = embeddings_paths(replays_path)
+        self.model_name: Optional[str] = None
+        self.hashes: List[str] = []
+        self.vectors: Optional[np.ndarray] = None
+        if os.path.exists(self.vectors_path) and os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            vectors = np.load(self.vectors_path)
+            if len(vectors) == len(manifest["hashes"]):
+                self.model_name, self.hashes, self.vectors = manifest["model_name"], manifest["hashes"], vectors
+            else:
+                print(f"Replay embeddings: '{self.vectors_path}' does not match its manifest, ignoring it.")
+
+    def _save(self) -> None:
+        # the vectors are written first: a manifest never describes vectors it does not match
+        tmp_path = f"{self.vectors_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, self.vectors)
+        os.replace(tmp_path, self.vectors_path)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model_name": self.model_name, "hashes": self.hashes}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def update(self, descriptions: List[str], embedder: Embedder) -> np.ndarray:
+        """
+        Embeddings of the descriptions, in their order. Only the descriptions without a saved
+        embedding (for this model) are embedded, and the saved embeddings are updated.
+
+        Args:
+            descriptions: Replay descriptions, one per replay
+            embedder: Embedder of the missing descriptions
+
+        Returns:
+            A float32 matrix with one row per description
+        """
+        model_name = _model_name(embedder)
+        saved = {}
+        if self.vectors is not None and self.model_name == model_name:
+            saved = {digest: row for row, digest in enumerate(self.hashes)}
+
+        hashes = [description_hash(description) for description in descriptions]
+        missing = list(dict.fromkeys(digest for digest in hashes if digest not in saved))
+        computed = {}
+        if missing:
+            texts = {digest: description for digest, description in zip(hashes, descriptions)}
+            print(f"Replay embeddings: Embedding {len(missing)} new or changed descriptions "
+                  f"({len(hashes) - len(missing)} reused).")
+            new_vectors = np.asarray(embedder.generate_embeddings([texts[digest] for digest in missing]),
+                                     dtype=np.float32)
+            computed = dict(zip(missing, new_vectors))
+
+        if not hashes:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = np.stack([computed[digest] if digest in computed else self.vectors[saved[digest]]
+                            for digest in hashes]).astype(np.float32, copy=False)
+        # the saved set is the current replays (one row per distinct description)
+        unique_hashes = list(dict.fromkeys(hashes))
+        if missing or unique_hashes != self.hashes or model_name != self.model_name:
+            first_row = {digest: row for row, digest in reversed(list(enumerate(hashes)))}
+            self.model_name, self.hashes = model_name, unique_hashes
+            self.vectors = vectors[[first_row[digest] for digest in unique_hashes]]
+            self._save()
+        return vectors
+
+
+def load_replays_with_embeddings(embedder: Embedder,
+                                 replays_path: str = DEFAULT_REPLAYS_PATH) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Loads the replays and the embeddings of their descriptions, embedding only the
+    descriptions not embedded before.
+
+    Args:
+        embedder: Embedder of the new or changed descriptions
+        replays_path: The replays CSV file
+
+    Returns:
+        The replays and their embeddings (one row per replay)
+    """
+    replays = pd.read_csv(replays_path)
+    vectors = ReplayEmbeddings(replays_path).update(replays["replay_description"].tolist(), embedder)
+    return replays, vectors
+
+
+if __name__ == "__main__":
+    from src.ai_insights.infrastructure.adapters.llm.ssem_embedder import SSEMEmbedder
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_REPLAYS_PATH
+    _, replay_vectors = load_replays_with_embeddings(SSEMEmbedder(), path)
+    print(f"Replay embeddings: {replay_vectors.shape[0]} replays embedded in '{embeddings_paths(path)[0]}'.")
@@ -0,0 +1,262 @@
+"""
+This module implements the VectorIndex interface with one sub-index per character.
+
+Replays (and analyzed clips) are only ever matched against the recommendation of
+their own brawler, so ReplayVectorIndex keeps a shard per character_id and a
+query only scores the vectors of one shard. Vectors are normalized, so inner
+products are cosine similarities.
+
+A shard is searched exactly (one matrix product) while it is small; once it
+reaches ann_min_size vectors, a faiss HNSW graph is built for it and queries go
+through the graph. Items are added incrementally: replaced or removed items are
+marked dead and filtered out of the results, and a shard is compacted (its
+graph rebuilt) when dead items make up a quarter of it.
+
+A search can be restricted to a set of keys (e.g. the replays of top
+players). The allowed items are located through the key index, so the cost
+of the filter depends on the size of the set rather than of the shard: a
+small set is scored exactly, and a large one filters the nearest neighbors
+of the graph, fetched with headroom for the items it excludes.
+
+Besides the replays of the repository, the index can follow a clip analysis
+store: every analyzed clip is indexed under its brawler (with the key
+'clip:<content hash>') as soon as its analysis is appended.
+"""
+
+import os
+import threading
+from typing import AbstractSet, Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import faiss
+import numpy as np
+
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.ports.embedder import Embedder
+from src.ai_insights.application.ports.vector_index import VectorIndex
+from src.ai_insights.domain.embedding import Embedding
+from src.ai_insights.infrastructure.adapters.database.replays_index_repo import ReplaysIndexRepo
+from src.ai_insights.infrastructure.adapters.llm.clip_analysis_store import ClipAnalysisStore
+
+# Ratio of dead items of a shard above which it is compacted
+MAX_DEAD_RATIO = 0.25
+# Share of the live items of a shard allowed by a search under which they are scored exactly
+EXACT_ALLOW_RATIO = 0.1
+
+
+def _unit(vectors) -> np.ndarray:
+    """Float32 matrix of unit rows (zero vectors stay zero)."""
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class _Shard:
+    """Vectors of one character, in insertion positions, with an optional HNSW graph."""
+
+    def __init__(self, dimension: int):
+        self.keys: List[Hashable] = []
+        self.vectors = np.empty((16, dimension), dtype=np.float32)
+        self.live = np.zeros(16, dtype=bool)
+        self.size = 0
+        self.dead = 0
+        self.ann = None
+
+    def add(self, key: Hashable, vector: np.ndarray) -> int:
+        if self.size == len(self.vectors):
+            # capacity doubles: amortized O(1) appends
+            self.vectors = np.concatenate([self.vectors, np.empty_like(self.vectors)])
+            self.live = np.concatenate([self.live, np.zeros_like(self.live)])
+        position = self.size
+        self.vectors[position] = vector
+        self.live[position] = True
+        self.keys.append(key)
+        self.size += 1
+        if self.ann is not None:
+            self.ann.add(self.vectors[position:position + 1])
+        return position
+
+    def remove(self, position: int) -> None:
+        self.live[position] = False
+        self.dead += 1
+
+    def build_ann(self, hnsw_m: int) -> None:
+        self.ann = faiss.IndexHNSWFlat(self.vectors.shape[1], hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        self.ann.add(self.vectors[:self.size])
+
+    def exact(self, queries: np.ndarray, k: int, mask: np.ndarray) -> List[List[Tuple[int, float]]]:
+        positions = np.flatnonzero(mask)
+        scores = queries @ self.vectors[positions].T
+        results = []
+        for row in scores:
+            top = np.arange(len(positions))
+            if len(top) > k:
+                top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top], kind="stable")]
+            results.append([(int(positions[ix]), float(row[ix])) for ix in top])
+        return results
+
+    def approximate(self, queries: np.ndarray, k: int, mask: Optional[np.ndarray] = None,
+                    allowed: Optional[int] = None) -> List[List[Tuple[int, float]]]:
+        # dead (and not allowed) items are skipped after the search, so fetch enough to still have k kept ones
+        fetch = k
+        if mask is not None:
+            fetch = 2 * k * (self.size - self.dead) // max(1, allowed)
+        fetch = min(self.size, fetch + self.dead)
+        self.ann.hnsw.efSearch = max(64, 2 * fetch)
+        scores, positions = self.ann.search(queries, fetch)
+        keep = self.live if mask is None else mask
+        return [[(int(p), float(s)) for s, p in zip(row_scores, row_positions)
+                 if p >= 0 and keep[p]][:k]
+                for row_scores, row_positions in zip(scores, positions)]
+
+
+class ReplayVectorIndex(VectorIndex):
+    def __init__(self, dimension: int, ann_min_size: int = 2048, hnsw_m: int = 32):
+        """
+        Args:
+            dimension (int): Size of the vectors.
+            ann_min_size (int): Size from which a shard is searched through an HNSW graph.
+            hnsw_m (int): Neighbors per node of the HNSW graphs.
+        """
+        self.dimension = dimension
+        self.ann_min_size = ann_min_size
+        self.hnsw_m = hnsw_m
+        self._shards: Dict[Any, _Shard] = {}
+        self._where: Dict[Hashable, Tuple[Any, int]] = {}
+        self._payloads: Dict[Hashable, Any] = {}
+        self._clip_keys: Set[Hashable] = set()
+        # clip analyses are appended from worker threads
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_repo(cls, repo: ReplaysIndexRepo, **kwargs) -> "ReplayVectorIndex":
+        """Index of the replays of a repository, keyed by replay id and with their ReplayDTO as payload."""
+        index = cls(repo.vectors.shape[1], **kwargs)
+        index.add_replays(repo)
+        return index
+
+    def add_replays(self, repo: ReplaysIndexRepo, rows=None) -> None:
+        """Indexes (again) replays of a repository, all of them by default."""
+        rows = range(repo.size) if rows is None else rows
+        for row in rows:
+            row = int(row)
+            self.upsert(repo.columns["id"][row], repo.columns["character_id"][row], repo.vectors[row],
+                        repo.replay_dto(row))
+
+    def follow_clip_analyses(self, store: ClipAnalysisStore, embedder: Embedder,
+                             brawler_to_id: Dict[str, Any], videos_dir: str = "data/raw/clips") -> None:
+        """
+        Indexes the analyzed clips of a store (the latest analysis of each clip), then every
+        analysis appended to it. Clips of brawlers missing from brawler_to_id are skipped.
+
+        Args:
+            store (ClipAnalysisStore): The clip analyses.
+            embedder (Embedder): Embedder of the clip descriptions.
+            brawler_to_id (dict): Character id by uppercase brawler name.
+            videos_dir (str): Directory of the analyzed clips, to resolve their paths.
+        """
+        latest = {}
+        for brawler in store.brawlers():
+            for record in store.for_brawler(brawler):
+                latest.setdefault(record["content_hash"], record)
+        records = [record for record in latest.values() if record["brawler"].upper() in brawler_to_id]
+        if records:
+            vectors = embedder.generate_embeddings([record["description"] for record in records])
+            for record, vector in zip(records, vectors):
+                self._upsert_clip(record, vector, brawler_to_id, videos_dir)
+
+        def on_append(record):
+            if "error" not in record and record["brawler"].upper() in brawler_to_id:
+                self._upsert_clip(record, embedder.generate_embeddings([record["description"]])[0], brawler_to_id,
+                                  videos_dir)
+        store.subscribe(on_append)
+
+    def _upsert_clip(self, record: Dict[str, Any], vector, brawler_to_id: Dict[str, Any], videos_dir: str) -> None:
+        character_id = brawler_to_id[record["brawler"].upper()]
+        key = f"clip:{record['content_hash']}"
+        payload = ReplayDTO(id=key, title=record["video_id"], character_id=character_id,
+                            replay_description=record["description"],
+                            embedding=Embedding(id=key, text_id=key, model_id=1, vector=vector),
+                            video_path=os.path.abspath(os.path.join(videos_dir, record["video_id"])))
+        with self._lock:
+            self.upsert(key, character_id, vector, payload)
+            self._clip_keys.add(key)
+
+    def clip_keys(self) -> Set[Hashable]:
+        """Keys of the indexed clips."""
+        with self._lock:
+            return set(self._clip_keys)
+
+    def upsert(self, key: Hashable, character_id: Any, vector, payload: Any = None) -> None:
+        vector = _unit(vector)[0]
+        with self._lock:
+            self.remove(key)
+            shard = self._shards.get(character_id)
+            if shard is None:
+                shard = self._shards[character_id] = _Shard(self.dimension)
+            position = shard.add(key, vector)
+            self._where[key] = (character_id, position)
+            self._payloads[key] = payload
+            if shard.ann is None and shard.size - shard.dead >= self.ann_min_size:
+                shard.build_ann(self.hnsw_m)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            located = self._where.pop(key, None)
+            if located is None:
+                return
+            self._payloads.pop(key, None)
+            self._clip_keys.discard(key)
+            character_id, position = located
+            shard = self._shards[character_id]
+            shard.remove(position)
+            if shard.dead > MAX_DEAD_RATIO * shard.size:
+                self._compact(character_id)
+
+    def _compact(self, character_id: Any) -> None:
+        """Rebuilds a shard with its live items only."""
+        old = self._shards[character_id]
+        shard = self._shards[character_id] = _Shard(self.dimension)
+        for position in np.flatnonzero(old.live[:old.size]):
+            key = old.keys[position]
+            self._where[key] = (character_id, shard.add(key, old.vectors[position]))
+        if shard.size >= self.ann_min_size:
+            shard.build_ann(self.hnsw_m)
+
+    def search(self, character_id: Any, queries, k: int, treshold: Optional[float] = None,
+               allow: Optional[AbstractSet[Hashable]] = None) -> List[List[Tuple[Hashable, float]]]:
+        queries = _unit(queries)
+        with self._lock:
+            shard = self._shards.get(character_id)
+            if shard is None or shard.size == shard.dead or k <= 0:
+                return [[] for _ in queries]
+
+            mask, allowed = None, shard.size - shard.dead
+            if allow is not None:
+                positions = [located[1] for located in map(self._where.get, allow)
+                             if located is not None and located[0] == character_id]
+                if not positions:
+                    return [[] for _ in queries]
+                mask, allowed = np.zeros(shard.size, dtype=bool), len(positions)
+                mask[positions] = True
+
+            matches = None
+            if shard.ann is not None and allowed >= EXACT_ALLOW_RATIO * (shard.size - shard.dead):
+                matches = shard.approximate(queries, k, mask, allowed)
+                if mask is not None and any(len(query_matches) < min(k, allowed) for query_matches in matches):
+                    # too few allowed items among the neighbors fetched: score them exactly
+                    matches = None
+            if matches is None:
+                matches = shard.exact(queries, k, shard.live[:shard.size] if mask is None else mask)
+            return [[(shard.keys[position], score) for position, score in query_matches
+                     if treshold is None or score > treshold]
+                    for query_matches in matches]
+
+    def payload(self, key: Hashable) -> Any:
+        with self._lock:
+            return self._payloads.get(key)
+
+    def shard_sizes(self) -> Dict[Any, int]:
+        """Live items of each character."""
+        with self._lock:
+            return {character_id: shard.size - shard.dead for character_id, shard in self._shards.items()}
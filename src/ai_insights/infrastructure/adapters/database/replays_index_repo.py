@@ -0,0 +1,130 @@
+"""
+This module implements the Repository interface with an indexed, columnar store of replays.
+
+ReplaysIndexRepo keeps every column of the replays as an array, the embeddings as
+one contiguous float32 matrix, and hash indexes from replay id and character id
+to row numbers. A query looks up the rows of its filters in the indexes, so its
+cost depends on the number of matching replays rather than the size of the
+table, and it returns a view over those rows: the replay dicts (and their
+Embedding objects, views into the matrix) are only built when read.
+"""
+
+from collections.abc import Sequence
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.ports.repository import Repository
+from src.ai_insights.domain.embedding import Embedding
+
+COLUMNS = ["id", "title", "character_id", "replay_description", "video_path"]
+
+
+class ReplayRows(Sequence):
+    """Replays selected by a query, as a read-only sequence of replay dicts built on access."""
+
+    def __init__(self, repo: "ReplaysIndexRepo", rows: np.ndarray):
+        self.repo = repo
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, ix):
+        if isinstance(ix, slice):
+            return ReplayRows(self.repo, self.rows[ix])
+        return self.repo.replay(int(self.rows[ix]))
+
+    def vectors(self) -> Optional[np.ndarray]:
+        """Embedding matrix of the selected replays, one row each (None without embeddings)."""
+        return None if self.repo.vectors is None else self.repo.vectors[self.rows]
+
+    def to_dtos(self) -> List[ReplayDTO]:
+        return [self.repo.replay_dto(int(row)) for row in self.rows]
+
+
+class ReplaysIndexRepo(Repository):
+    def __init__(self, columns: Dict[str, Iterable[Any]], vectors: Optional[np.ndarray] = None, model_id: int = 1):
+        """
+        Args:
+            columns: Values of each replay column (id, title, character_id,
+                replay_description, video_path), in row order
+            vectors: Embeddings of the replays, one row each, or None if not embedded
+            model_id: Identifier of the model that made the embeddings
+        """
+        self.columns = {name: np.asarray(list(columns[name]), dtype=object) for name in COLUMNS}
+        self.size = len(self.columns["id"])
+        self.vectors = None
+        if vectors is not None:
+            self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            if self.vectors.shape[0] != self.size:
+                raise ValueError(f"{self.vectors.shape[0]} embeddings for {self.size} replays")
+        self.model_id = model_id
+        self._rows_by_id = self._index(self.columns["id"])
+        self._rows_by_character = self._index(self.columns["character_id"])
+
+    @staticmethod
+    def _index(values: np.ndarray) -> Dict[Any, np.ndarray]:
+        """Rows of every value of a column, in row order."""
+        rows_by_value: Dict[Any, List[int]] = {}
+        for row, value in enumerate(values.tolist()):
+            rows_by_value.setdefault(value, []).append(row)
+        return {value: np.asarray(rows, dtype=np.int64) for value, rows in rows_by_value.items()}
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame, vectors: Optional[np.ndarray] = None,
+                       model_id: int = 1) -> "ReplaysIndexRepo":
+        """
+        Builds the repository from a replays DataFrame (like data/mock/mock_replays.csv).
+
+        Args:
+            data: The replays, with the columns of ReplaysDfRepo
+            vectors: Embeddings of the rows. If None, they are taken from the Embedding objects
+                of the 'embedding' column when it has some.
+            model_id: Identifier of the model that made the embeddings
+        """
+        if vectors is None and "embedding" in data and len(data) and \
+                all(isinstance(embedding, Embedding) for embedding in data["embedding"]):
+            vectors = np.stack([np.asarray(embedding.vector, dtype=np.float32).reshape(-1)
+                                for embedding in data["embedding"]])
+        return cls({name: data[name].tolist() for name in COLUMNS}, vectors, model_id)
+
+    def rows(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Row numbers of the replays matching the filters ('ids' and/or 'character_id'), in row order."""
+        filters = filters or {}
+        if "ids" in filters:
+            found = [self._rows_by_id[replay_id] for replay_id in set(filters["ids"]) if replay_id in self._rows_by_id]
+            rows = np.sort(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+            if "character_id" in filters:
+                rows = rows[self.columns["character_id"][rows] == filters["character_id"]]
+            return rows
+        if "character_id" in filters:
+            return self._rows_by_character.get(filters["character_id"], np.empty(0, dtype=np.int64))
+        return np.arange(self.size)
+
+    def get(self, filters: Optional[Dict[str, Any]] = None) -> ReplayRows:
+        """
+        Retrieves the replays matching the filters.
+
+        Args:
+            filters: Optional dictionary with 'ids' (replay ids) and/or 'character_id'
+
+        Returns:
+            A sequence of replay dicts, like ReplaysDfRepo.get, built when read
+        """
+        return ReplayRows(self, self.rows(filters))
+
+    def embedding(self, row: int) -> Optional[Embedding]:
+        if self.vectors is None:
+            return None
+        return Embedding(id=row, text_id=row, model_id=self.model_id, vector=self.vectors[row])
+
+    def replay(self, row: int) -> Dict[str, Any]:
+        replay = {name: self.columns[name][row] for name in COLUMNS}
+        replay["embedding"] = self.embedding(row)
+        return replay
+
+    def replay_dto(self, row: int) -> ReplayDTO:
+        return ReplayDTO(**self.replay(row))
@@ -0,0 +1,83 @@
+"""
+This module implements the RankingsCache interface in memory.
+
+Rankings change slowly, so the tags of a ranking are kept ttl_seconds and
+shared by every lookup of the process. Concurrent lookups of the same missing
+ranking wait for a single API call instead of each making one.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, FrozenSet, Hashable, Optional
+
+from src.ai_insights.application.ports.rankings_cache import RankingsCache
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+
+class InMemoryRankingsCache(RankingsCache):
+    """Thread-safe LRU cache of ranking tags with a TTL and single-flight loads."""
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 512,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize the cache.
+
+        Args:
+            ttl_seconds: Seconds the tags of a ranking stay valid
+            max_entries: Max number of rankings kept; least recently used are evicted
+            clock: Monotonic clock in seconds, replaceable in tests
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key: Hashable) -> Optional[FrozenSet[str]]:
+        """Cached tags of a ranking if still valid. Called with the lock held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, tags = entry
+        if self._clock() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return tags
+
+    def get_or_load(self, key: Hashable, load: Callable[[], FrozenSet[str]]) -> FrozenSet[str]:
+        with self._lock:
+            tags = self._fresh(key)
+            if tags is not None:
+                METRICS.counter("rankings_cache_total", result="hit").inc()
+                return tags
+            future = self._loading.get(key)
+            is_loader = future is None
+            if is_loader:
+                future = self._loading[key] = Future()
+        if not is_loader:
+            METRICS.counter("rankings_cache_total", result="coalesced").inc()
+            return future.result()
+
+        METRICS.counter("rankings_cache_total", result="miss").inc()
+        try:
+            tags = frozenset(load())
+        except Exception as e:
+            # failures are not cached: the next lookup tries again
+            with self._lock:
+                del self._loading[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = (self._clock(), tags)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            del self._loading[key]
+        future.set_result(tags)
+        return tags
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,42 +1,332 @@
+import contextvars
+import json
+import queue
+import threading
+import time
+
 from src.ai_insights.infrastructure.adapters.llm.context_handler import ContextHandler
+from src.ai_insights.infrastructure.adapters.llm.deadline import Deadline, DeadlineExceeded
 from src.ai_insights.infrastructure.adapters.llm.prompt_generator import PromptGenerator
-from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector, StructuredOutputError
+from src.ai_insights.infrastructure.adapters.llm.response_schemas import (
+    FUSED_INSIGHTS_SCHEMA,
+    RECOMMENDATIONS_SCHEMA,
+    json_output_config,
+    parse_json_response,
+    parse_recommendations,
+    validate_recommendations,
+)
+from src.ai_insights.infrastructure.adapters.llm.semantic_cache import build_semantic_key, trophy_band
+from src.ai_insights.infrastructure.adapters.llm.stage_graph import Stage, StageGraph
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER
+
+INSIGHT_SECTIONS = ["player_description", "performance_summary", "recommendations"]
+# Tasks whose answer does not depend on player specific details and can be shared between similar players
+SEMANTIC_CACHE_TASKS = ["recommendations"]
+# Sections that can be left out to answer within the deadline, with the time they usually need.
+# The player description is the minimal answer and is never skipped.
+OPTIONAL_STAGE_MIN_SECONDS = {"performance_summary": 3.0, "recommendations": 5.0}
+
+
+def _parse_fused_response(response_text: str) -> dict:
+    """Splits the single structured response of the fused mode into the three sections."""
+    parsed = parse_json_response(response_text)
+    sections = {section: json.dumps(parsed[section], ensure_ascii=False) for section in INSIGHT_SECTIONS}
+    # same format as the recommendations stage of the staged mode
+    sections['recommendations'] = json.dumps({'recommendations': validate_recommendations(parsed['recommendations'])},
+                                             ensure_ascii=False)
+    return sections
+
+
+def _parse_recommendations_text(response_text: str) -> str:
+    return json.dumps(parse_recommendations(response_text), ensure_ascii=False)
+
+
+# Tasks answered in structured-output mode: (response schema, parser returning the stage result)
+STRUCTURED_TASKS = {
+    'recommendations': (RECOMMENDATIONS_SCHEMA, _parse_recommendations_text),
+    'fused_insights': (FUSED_INSIGHTS_SCHEMA, _parse_fused_response),
+}
+
 
 class ApiService:
-    def __init__(self, game=None, user_id=None, llm_provider = "google", model = None):
+    def __init__(self, game=None, user_id=None, llm_provider = "google", model = None, token_budgets = None,
+                 fused = False, response_cache = None, semantic_cache = None, local_config = None,
+                 rag_retriever = None, deadline = None, hedger = None, llm_client = None, debug = False):
+        """
+        Args:
+            llm_provider (str): 'google', or 'local' for the offline LLM stand-in.
+            model (str, optional): LLM model name. Defaults to the connector default.
+            fused (bool): Ask for the three insight sections in a single structured LLM call
+                instead of one call per section.
+            response_cache (ResponseCache, optional): Cache of LLM responses shared between requests.
+            semantic_cache (SemanticResponseCache, optional): Cache reusing the recommendations of
+                players with a similar profile.
+            local_config (LocalLLMConfig, optional): Latency/error behaviour of the 'local' provider.
+            rag_retriever (RAGRetriever, optional): Already loaded retriever shared between services,
+                instead of loading the embedder and index for this request.
+            deadline (Deadline, optional): Time budget of the request. Optional stages are skipped or
+                degraded when it runs short; they are listed in skipped_stages. No deadline if None.
+            hedger (RequestHedger, optional): Hedges the slow LLM calls, shared between requests.
+            llm_client (optional): Client of the LLM calls, e.g. an AsyncConnectorClient shared between
+                services so its rate limits apply to all of them. By default, one of the provider.
+            debug (bool): Print the prompt sizes and stage timings of every run. They are recorded in
+                METRICS and the trace spans either way.
+        """
         self.game = game
         self.user_id = user_id
         self.llm_provider = llm_provider
         self.model = model
-    
-    def get_ai_insights(self):
-        handler = ContextHandler(game=self.game, user_id=self.user_id, rag_enabled=True)
+        self.token_budgets = token_budgets
+        self.fused = fused
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.local_config = local_config
+        self.rag_retriever = rag_retriever
+        self.deadline = deadline or Deadline()
+        self.hedger = hedger
+        self.llm_client = llm_client
+        self.debug = debug
+        self.prompt_stats = {}
+        # Reason of every stage skipped or degraded to meet the deadline in the last run
+        self.skipped_stages = {}
+        # Wall time in seconds of each pipeline stage of the last run, plus 'total'
+        self.stage_timings = {}
+
+    def _skip_stage(self, task, reason, on_event=None):
+        self.deadline.record_skip(task, reason)
+        if on_event is not None:
+            on_event({'event': 'section_skipped', 'section': task, 'reason': reason})
+        return None
+
+    def _llm_stage(self, task, llm_connector, prompt_generator, context_fn, index_version=None, on_event=None,
+                   optional=False):
+        """
+        Builds the function of a stage that prompts the LLM for one task.
+        For SEMANTIC_CACHE_TASKS, a response of a similar player is reused when available.
+        If on_event is given, the response is streamed and every chunk is reported as a
+        'delta' event, followed by a 'section_done' event with the whole text.
+        STRUCTURED_TASKS are asked for JSON matching their schema; an invalid answer is repaired
+        by the connector without running the other stages again.
+        An optional stage returns None (and reports a 'section_skipped' event) instead of
+        failing when the deadline leaves no time for it.
+        """
+        use_semantic_cache = (self.semantic_cache is not None and self.semantic_cache.embedder is not None
+                              and task in SEMANTIC_CACHE_TASKS)
+        schema, parser = STRUCTURED_TASKS.get(task, (None, None))
+
+        def run(results):
+            semantic_key = None
+            if use_semantic_cache:
+                semantic_key = build_semantic_key(task, *results['player_api'])
+                band = trophy_band(results['player_api'][0])
+                cached_response = self.semantic_cache.lookup(task, semantic_key, index_version, partition=band)
+                if cached_response is not None:
+                    print(f"ApiService: '{task}' served from the semantic cache.")
+                    prompt_generator.prompt_stats[task] = {'semantic_cache_hit': True}
+                    if on_event is not None:
+                        on_event({'event': 'delta', 'section': task, 'text': cached_response})
+                        on_event({'event': 'section_done', 'section': task, 'text': cached_response})
+                    return cached_response
+
+            if optional and not self.deadline.allows(OPTIONAL_STAGE_MIN_SECONDS[task]):
+                return self._skip_stage(task, "insufficient_time", on_event)
+            prompt = prompt_generator.generate_prompt(requested_task=task, context=context_fn(results))
+            try:
+                response = generate(prompt)
+            except DeadlineExceeded:
+                if not optional:
+                    raise
+                return self._skip_stage(task, "deadline_exceeded", on_event)
+            prompt_generator.prompt_stats[task]['actual_prompt_tokens'] = llm_connector.last_prompt_token_count
+            prompt_generator.prompt_stats[task]['actual_output_tokens'] = llm_connector.last_output_token_count
+            if semantic_key is not None:
+                self.semantic_cache.store(task, semantic_key, response, index_version, partition=band)
+            return response
+
+        def generate(prompt):
+            if on_event is None:
+                if parser is None:
+                    return llm_connector.get_llm_response(prompt)
+                return llm_connector.get_structured_response(prompt, parser, schema)
+            chunks = []
+            stream = (llm_connector.stream_llm_response(prompt) if parser is None else
+                      llm_connector.stream_llm_response(prompt, config=json_output_config(schema)))
+            for chunk in stream:
+                chunks.append(chunk)
+                on_event({'event': 'delta', 'section': task, 'text': chunk})
+            response = "".join(chunks)
+            if parser is not None:
+                response = llm_connector.parse_structured_response(prompt, response, parser, schema)
+            on_event({'event': 'section_done', 'section': task, 'text': response})
+            return response
+        return run
+
+    def _build_stages(self, handler, llm_connector, prompt_generator, tasks, fused, on_event=None):
+        """
+        Declares the insights pipeline. The player description, the performance summary and the
+        RAG retrieval only need the player data, so they run concurrently; the recommendations
+        wait for all of them.
+        """
+        def fetch_player_data(results):
+            profile, battlelog = handler.fetch_player_data()
+            if not profile:
+                raise RuntimeError(f"Could not fetch player profile for {self.user_id}.")
+            return profile, battlelog
+
+        index_version = handler.rag_retriever.index_version if handler.rag_retriever else "none"
+
+        def player_context(results):
+            profile, battlelog = results['player_api']
+            return {'player_data': profile, 'battle_logs': battlelog}
+
+        def recommendations_context(results):
+            performance_summary = results['performance_summary']
+            if performance_summary is None:
+                # skipped for the deadline: the battle log summary derived without the LLM stands in
+                player = results['community_context'].get('community_data', {}).get('playerContext', {})
+                performance_summary = player.get('recentPerformanceSummary', "Not available.")
+            return {**results['community_context'], 'player_description': results['player_description'],
+                    'performance_summary': performance_summary}
+
+        stages = [
+            Stage('player_api', fetch_player_data),
+            Stage('community_context',
+                  lambda results: handler.build_llm_context(*results['player_api'], task_types=tasks),
+                  deps=['player_api']),
+        ]
+
+        if fused:
+            fused_stage = self._llm_stage('fused_insights', llm_connector, prompt_generator,
+                                          lambda results: results['community_context'])
+
+            def fused_insights(results):
+                try:
+                    return fused_stage(results)
+                except StructuredOutputError as e:
+                    # None makes get_ai_insights fall back to one call per section
+                    print(f"ApiService: {e}")
+                    return None
+
+            stages.append(Stage('fused_insights', fused_insights, deps=['community_context']))
+            return stages
+
+        stages += [
+            Stage('player_description',
+                  self._llm_stage('player_description', llm_connector, prompt_generator, player_context,
+                                  on_event=on_event),
+                  deps=['player_api']),
+            Stage('performance_summary',
+                  self._llm_stage('performance_summary', llm_connector, prompt_generator, player_context,
+                                  on_event=on_event, optional=True),
+                  deps=['player_api']),
+            Stage('recommendations',
+                  self._llm_stage('recommendations', llm_connector, prompt_generator, recommendations_context,
+                                  index_version, on_event, optional=True),
+                  deps=['player_description', 'performance_summary', 'community_context']),
+        ]
+        return stages
+
+    def _setup(self):
+        handler = ContextHandler(game=self.game, user_id=self.user_id, rag_enabled=True,
+                                 rag_retriever=self.rag_retriever, deadline=self.deadline)
         tasks = ["character_recommendation", "player_description", "creator_lookalike"]
-        llm_ready_context = handler.context_for_llm(task_types=tasks)
 
-        print("\n--- Final Context for LLM ---")
-        if llm_ready_context:
-            # print(f"\nContext generated. RAG Active reported: {llm_ready_context.get('meta', {}).get('rag_active')}")
-            print(f"Number of community items in context: {len(llm_ready_context.get('communityContext', []))}")
-            print(f"Number of characters in context: {len(llm_ready_context.get('gameContext', {}).get('characterData', []))}")
-        else:
-            print("Failed to generate context.")
+        llm_connector = LLMConnector(llm_provider=self.llm_provider, model_name=self.model,
+                                     cache=self.response_cache, local_config=self.local_config,
+                                     deadline=self.deadline, hedger=self.hedger, client=self.llm_client)
+        if self.semantic_cache is not None and self.semantic_cache.embedder is None:
+            # reuse the model already loaded for RAG instead of loading a second one
+            self.semantic_cache.embedder = handler.embedder
+        prompt_generator = PromptGenerator(token_budgets=self.token_budgets)
+        return handler, llm_connector, prompt_generator, tasks
 
-        llm_connector = LLMConnector()
+    def _report(self, prompt_generator, start):
+        self.prompt_stats = prompt_generator.prompt_stats
+        self.stage_timings['total'] = time.perf_counter() - start
+        self.skipped_stages = self.deadline.skipped_stages
+        if not self.debug:
+            return
 
-        prompt_generator = PromptGenerator()
-        player_description_prompt = prompt_generator.generate_prompt(requested_task='player_description', context=llm_ready_context)
-        llm_ready_context['player_description'] = llm_connector.get_llm_response(player_description_prompt)
+        for task, stats in self.prompt_stats.items():
+            if stats.get('semantic_cache_hit'):
+                continue
+            print(f"Prompt '{task}': ~{stats['prompt_tokens']} tokens estimated, {stats.get('actual_prompt_tokens')} billed "
+                  f"(context {stats['context_tokens']}/{stats['budget']}, {stats['items_dropped']} items dropped)")
+        print("Stage timings: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.stage_timings.items()))
+        if self.skipped_stages:
+            print(f"ApiService: Skipped to meet the deadline: {self.skipped_stages}")
 
-        performance_summary_prompt = prompt_generator.generate_prompt(requested_task='performance_summary', context=llm_ready_context)
-        llm_ready_context['performance_summary'] = llm_connector.get_llm_response(performance_summary_prompt)
- 
-        recommendations_prompt = prompt_generator.generate_prompt(requested_task='recommendations', context=llm_ready_context)
-        llm_ready_context['recommendations'] = llm_connector.get_llm_response(recommendations_prompt)
+    def get_ai_insights(self):
+        with TRACER.span("ApiService.get_ai_insights", user_id=self.user_id, fused=self.fused,
+                         llm_provider=self.llm_provider) as span:
+            ai_insights = self._get_ai_insights()
+            span.set_attribute("total_seconds", self.stage_timings.get('total'))
+            span.set_attribute("skipped_stages", ",".join(self.skipped_stages))
+            return ai_insights
+
+    def _get_ai_insights(self):
+        start = time.perf_counter()
+        handler, llm_connector, prompt_generator, tasks = self._setup()
 
-        ai_insights = {}
-        ai_insights['player_description'] = llm_ready_context['player_description']
-        ai_insights['performance_summary'] = llm_ready_context['performance_summary']
-        ai_insights['recommendations'] = llm_ready_context['recommendations']
+        graph = StageGraph(self._build_stages(handler, llm_connector, prompt_generator, tasks, self.fused))
+        results = graph.run()
+        self.stage_timings = dict(graph.timings)
 
+        ai_insights = None
+        if self.fused:
+            ai_insights = results['fused_insights']
+            if ai_insights is None:
+                print("ApiService: No valid fused response. Falling back to one call per section.")
+                # The player data and RAG context are reused, only the LLM stages run again
+                graph = StageGraph(self._build_stages(handler, llm_connector, prompt_generator, tasks, fused=False))
+                results = graph.run({name: results[name] for name in ('player_api', 'community_context')})
+                self.stage_timings.update(graph.timings)
+        if ai_insights is None:
+            ai_insights = {section: results[section] for section in INSIGHT_SECTIONS}
+
+        self._report(prompt_generator, start)
         return ai_insights
+
+    def stream_ai_insights(self):
+        """
+        Runs the pipeline (always one LLM call per section) and yields events as the
+        sections are generated, so a client can render each section as soon as its first
+        tokens arrive.
+
+        Yields:
+            dict: {'event': 'delta', 'section', 'text'} for every chunk of a section,
+                {'event': 'section_done', 'section', 'text'} with the whole section,
+                {'event': 'section_skipped', 'section', 'reason'} for a section left out for the deadline,
+                then {'event': 'end', 'stage_timings', 'skipped_stages'} or {'event': 'error', 'message'}.
+        """
+        start = time.perf_counter()
+        events = queue.Queue()
+
+        def run_pipeline():
+            with TRACER.span("ApiService.stream_ai_insights", user_id=self.user_id):
+                run_stages()
+
+        def run_stages():
+            try:
+                handler, llm_connector, prompt_generator, tasks = self._setup()
+                graph = StageGraph(self._build_stages(handler, llm_connector, prompt_generator, tasks,
+                                                      fused=False, on_event=events.put))
+                graph.run()
+                self.stage_timings = dict(graph.timings)
+                self._report(prompt_generator, start)
+                events.put({'event': 'end', 'stage_timings': self.stage_timings,
+                            'skipped_stages': self.skipped_stages})
+            except Exception as e:
+                print(f"ApiService: Error while streaming insights: {e}")
+                events.put({'event': 'error', 'message': str(e)})
+            finally:
+                events.put(None)
+
+        # the copied context keeps the pipeline spans in the trace of the caller
+        threading.Thread(target=contextvars.copy_context().run, args=(run_pipeline,), daemon=True).start()
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield event
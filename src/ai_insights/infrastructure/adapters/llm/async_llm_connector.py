@@ -0,0 +1,374 @@
+"""Module implementing an asyncio LLM connector for high request concurrency.
+
+AsyncLLMConnector sends prompts through the google.genai async client. All
+the connectors of a process share one client per API key, and each connector
+limits the requests in flight with a semaphore, paces them with token
+buckets sized to the RPM/TPM quota, and retries 429/5xx responses with
+jittered exponential backoff. Latencies, retries and failures are recorded
+in the METRICS registry.
+
+The asyncio primitives bind to the event loop that first uses them, so a
+connector must be used from a single long-lived event loop. Thread-based
+code (LLMConnector, ApiService, the batch job, the web app) reaches it through
+AsyncConnectorClient, which runs the connector on an event loop thread of its
+own and looks like a genai client.
+"""
+
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from typing import AsyncIterator, Optional
+
+from google import genai
+from dotenv import load_dotenv
+
+from src.ai_insights.infrastructure.adapters.llm.context_packer import estimate_tokens
+from src.ai_insights.infrastructure.adapters.llm.local_llm import LocalLLMClient
+from src.ai_insights.infrastructure.adapters.llm.response_cache import make_cache_key
+from src.ai_insights.infrastructure.adapters.metrics_logging.histogram import Histogram
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+load_dotenv(override=True)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_shared_clients = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_client(api_key: str) -> genai.Client:
+    """Returns the process-wide genai client for the API key, creating it once."""
+    with _shared_clients_lock:
+        if api_key not in _shared_clients:
+            _shared_clients[api_key] = genai.Client(api_key=api_key)
+        return _shared_clients[api_key]
+
+
+class AsyncTokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """Initialize a full bucket.
+
+        Args:
+            capacity: Max tokens the bucket can hold (the allowed burst)
+            refill_per_second: Tokens added per second
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Wait until the amount of tokens is available and take it.
+
+        Requests larger than the capacity are capped to the capacity, so they
+        wait for a full bucket instead of blocking forever.
+        """
+        amount = min(amount, self.capacity)
+        # the lock makes waiters acquire in arrival order
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.refill_per_second)
+                self._refill()
+            self._tokens -= amount
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+class AsyncLLMConnector:
+    def __init__(
+        self,
+        llm_provider="google",
+        api_key=None,
+        model_name=None,
+        cache=None,
+        max_concurrency: int = 16,
+        requests_per_minute: Optional[float] = 1000,
+        tokens_per_minute: Optional[float] = 1_000_000,
+        max_retries: int = 5,
+        base_retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+        timeout_seconds: Optional[float] = 60.0,
+        local_config=None,
+    ):
+        """
+        Async counterpart of LLMConnector.
+        Args:
+            llm_provider (str): 'google', or 'local' for the offline stand-in used in load tests.
+            api_key (str, optional): API key. Defaults to env var.
+            model_name (str, optional): Specific LLM model.
+            cache (ResponseCache, optional): Exact-match cache of responses. Disabled if None.
+            max_concurrency (int): Max requests in flight at the same time.
+            requests_per_minute (float, optional): RPM quota. None disables request pacing.
+            tokens_per_minute (float, optional): Input TPM quota. None disables token pacing.
+            max_retries (int): Retries of a request failing with 429 or 5xx.
+            base_retry_delay (float): Backoff of the first retry, in seconds; doubles every retry.
+            max_retry_delay (float): Max backoff between retries, in seconds.
+            timeout_seconds (float, optional): Timeout of each attempt.
+            local_config (LocalLLMConfig, optional): Latency/error behaviour of the 'local' provider.
+        """
+        if llm_provider not in ("google", "local"):
+            raise ValueError(f"Unsupported LLM provider for AsyncLLMConnector: '{llm_provider}'")
+        self.provider = llm_provider
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.model_name = model_name or "gemini-2.0-flash"
+        self.cache = cache
+        self.client = get_shared_client(self.api_key) if llm_provider == "google" else LocalLLMClient(local_config)
+
+        self.max_retries = max_retries
+        self.base_retry_delay = base_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.timeout_seconds = timeout_seconds
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._request_bucket = (
+            AsyncTokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute else None
+        )
+        self._token_bucket = AsyncTokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+
+        self.retries = 0
+        self.failures = 0
+
+    def _latency_histogram(self, name: str) -> Histogram:
+        return METRICS.histogram(name, provider=self.provider, model=self.model_name)
+
+    @property
+    def attempt_latency(self) -> Histogram:
+        """Latency of each attempt sent to the API."""
+        return self._latency_histogram("llm_async_attempt_seconds")
+
+    @property
+    def call_latency(self) -> Histogram:
+        """Latency of whole calls, including retries and rate limit waits."""
+        return self._latency_histogram("llm_async_call_seconds")
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_retry_delay, self.base_retry_delay * 2 ** attempt))
+
+    async def _pace(self, prompt_text: str) -> None:
+        if self._request_bucket is not None:
+            await self._request_bucket.acquire(1)
+        if self._token_bucket is not None:
+            await self._token_bucket.acquire(estimate_tokens(prompt_text))
+
+    async def _with_timeout(self, awaitable):
+        if self.timeout_seconds is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.timeout_seconds)
+
+    def _retry_delay_or_raise(self, error: Exception, attempt: int, retryable: bool = True) -> float:
+        """Backoff before retrying after the failed attempt; re-raises the error if it is not retried."""
+        labels = {"provider": self.provider, "model": self.model_name}
+        retryable = retryable and (isinstance(error, asyncio.TimeoutError)
+                                   or _status_code(error) in RETRYABLE_STATUS_CODES)
+        if not retryable or attempt >= self.max_retries:
+            self.failures += 1
+            METRICS.counter("llm_async_failures_total", **labels).inc()
+            raise error
+        delay = self._retry_delay(attempt)
+        print(f"AsyncLLMConnector: attempt {attempt + 1} failed ({error}). Retrying in {delay:.1f}s...")
+        self.retries += 1
+        METRICS.counter("llm_async_retries_total", **labels).inc()
+        return delay
+
+    async def _generate(self, prompt_text: str, config: dict = None):
+        await self._pace(prompt_text)
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                return await self._with_timeout(self.client.aio.models.generate_content(
+                    model=self.model_name, contents=prompt_text, config=config
+                ))
+            finally:
+                self.attempt_latency.observe(time.perf_counter() - start)
+
+    async def generate_content(self, prompt_text: str, config: dict = None):
+        """
+        Sends the prompt to the LLM, within the concurrency and rate limits and with retries.
+
+        Returns:
+            The response of the model (text and usage_metadata).
+        """
+        start = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                try:
+                    return await self._generate(prompt_text, config)
+                except Exception as e:
+                    delay = self._retry_delay_or_raise(e, attempt)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+        finally:
+            self.call_latency.observe(time.perf_counter() - start)
+
+    async def generate_content_stream(self, prompt_text: str, config: dict = None) -> AsyncIterator:
+        """
+        Streams the response chunks of the prompt, within the concurrency and rate limits. Failures
+        before the first chunk are retried like in generate_content; a stream failing midway is not,
+        its chunks being already handed out. The stream holds its concurrency slot until it is
+        finished or closed, and the timeout bounds each read rather than the whole response.
+        """
+        start = time.perf_counter()
+        attempt = 0
+        streamed = False
+        try:
+            while True:
+                await self._pace(prompt_text)
+                try:
+                    async with self._semaphore:
+                        attempt_start = time.perf_counter()
+                        try:
+                            stream = await self._with_timeout(self.client.aio.models.generate_content_stream(
+                                model=self.model_name, contents=prompt_text, config=config
+                            ))
+                            chunks = stream.__aiter__()
+                            while True:
+                                try:
+                                    chunk = await self._with_timeout(chunks.__anext__())
+                                except StopAsyncIteration:
+                                    return
+                                streamed = True
+                                yield chunk
+                        finally:
+                            self.attempt_latency.observe(time.perf_counter() - attempt_start)
+                except Exception as e:
+                    delay = self._retry_delay_or_raise(e, attempt, retryable=not streamed)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+        finally:
+            self.call_latency.observe(time.perf_counter() - start)
+
+    async def get_llm_response(self, prompt_text: str, config: dict = None, use_cache: bool = True) -> str:
+        """
+        Sends the prompt to the LLM and retrieves the raw response.
+
+        Args:
+            prompt_text (str): The prompt generated by PromptGenerator.
+            config (dict, optional): Generation config sent to the model.
+            use_cache (bool): Set to False to bypass the cache (the fresh response is still stored).
+
+        Returns:
+            str: The raw response text from the LLM.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(self.provider, self.model_name, prompt_text, config)
+            if use_cache:
+                cached_response = self.cache.get(cache_key)
+                if cached_response is not None:
+                    return cached_response
+
+        response = await self.generate_content(prompt_text, config)
+        if cache_key is not None and response.text is not None:
+            self.cache.set(cache_key, response.text)
+        return response.text
+
+    def latency_stats(self) -> dict:
+        """
+        Latency summaries (count, mean, p50/p90/p99) plus retry and failure counts. The latencies
+        are those of the METRICS histograms of the provider and model, shared by their connectors.
+        """
+        return {
+            "attempts": self.attempt_latency.snapshot(),
+            "calls": self.call_latency.snapshot(),
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+
+_END_OF_STREAM = object()
+
+
+class _ConnectorModels:
+    def __init__(self, client: "AsyncConnectorClient"):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        return self._client.run(self._client.connector.generate_content(contents, config))
+
+    def generate_content_stream(self, model, contents, config=None):
+        chunks = queue.Queue()
+
+        async def pump():
+            stream = self._client.connector.generate_content_stream(contents, config)
+            try:
+                async for chunk in stream:
+                    chunks.put((chunk, None))
+                chunks.put((_END_OF_STREAM, None))
+            except Exception as e:
+                chunks.put((_END_OF_STREAM, e))
+            finally:
+                await stream.aclose()
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._client._loop)
+        try:
+            while True:
+                chunk, error = chunks.get()
+                if chunk is _END_OF_STREAM:
+                    if error is not None:
+                        raise error
+                    return
+                yield chunk
+        finally:
+            # a caller that stops reading closes the stream and frees its concurrency slot
+            future.cancel()
+
+
+class AsyncConnectorClient:
+    """
+    Synchronous stand-in of a genai client whose calls go through an AsyncLLMConnector, so the
+    threads of a pipeline share its concurrency limit, rate limits and retries:
+
+        client = AsyncConnectorClient(AsyncLLMConnector(max_concurrency=16))
+        LLMConnector(client=client).get_llm_response(prompt)
+
+    The connector runs on an event loop of its own, in a daemon thread. Requests are sent with
+    the model of the connector. Streams are relayed chunk by chunk as the connector receives them.
+    """
+
+    def __init__(self, connector: AsyncLLMConnector):
+        self.connector = connector
+        self.models = _ConnectorModels(self)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-llm-connector", daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine):
+        """Runs a coroutine on the loop of the connector and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+_process_connector = None
+_process_connector_lock = threading.Lock()
+
+
+def get_async_llm_connector(**kwargs) -> AsyncLLMConnector:
+    """
+    Returns the process-wide AsyncLLMConnector, creating it with kwargs on the first call.
+    Sharing it makes its concurrency and rate limits apply to the whole process.
+    """
+    global _process_connector
+    with _process_connector_lock:
+        if _process_connector is None:
+            _process_connector = AsyncLLMConnector(**kwargs)
+        return _process_connector
@@ -0,0 +1,243 @@
+"""Module implementing the offline batch precompute of player insights.
+
+The job runs the insights pipeline of ApiService for a list of player tags,
+read from a file (one tag per line) or from the player rankings endpoint, and
+writes the results to the InsightsStore read first by the web app.
+
+    python -m src.ai_insights.infrastructure.adapters.llm.batch_insights --tags-file tags.txt
+    python -m src.ai_insights.infrastructure.adapters.llm.batch_insights --rankings global --limit 200
+
+Players are processed by a bounded worker pool. Progress is checkpointed after
+every player, so an interrupted job resumes where it stopped. All the workers
+share one embedder and RAG index, the retrievals (MemoizedRetriever) and the
+LLM response caches, so work common to several players is done once. Their
+LLM calls all go through one AsyncLLMConnector, which keeps the job within
+the concurrency and RPM/TPM limits and retries rate-limited calls.
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.ai_insights.infrastructure.adapters.database.insights_store import InsightsStore, normalize_tag
+from src.ai_insights.infrastructure.adapters.game_api_clients.brawl_stars_client import BrawlStarsClient
+from src.ai_insights.infrastructure.adapters.llm.api_service import ApiService
+from src.ai_insights.infrastructure.adapters.llm.async_llm_connector import AsyncConnectorClient, AsyncLLMConnector
+from src.ai_insights.infrastructure.adapters.llm.context_handler import ContextHandler
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import MODEL_PRICING
+from src.ai_insights.infrastructure.adapters.llm.rag import MemoizedRetriever
+from src.ai_insights.infrastructure.adapters.llm.response_cache import InMemoryResponseCache
+from src.ai_insights.infrastructure.adapters.llm.semantic_cache import SemanticResponseCache
+from src.ai_insights.infrastructure.adapters.metrics_logging.exporters import JsonLinesExporter
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+
+def read_tags_file(path: str) -> List[str]:
+    """Reads one player tag per line, ignoring blank lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def fetch_ranking_tags(country: str = "global", limit: int = 200, client: BrawlStarsClient = None) -> List[str]:
+    """Returns the tags of the top players of a country ('global' for the worldwide ranking)."""
+    client = client or BrawlStarsClient(os.getenv("BRAWLSTARS_TOKEN"))
+    data = client.get(f"/v1/rankings/{country}/players?limit={limit}")
+    return client.retrieve_data(data, ["items", "tag"])["ids"]
+
+
+class BatchCheckpoint:
+    """Progress of a batch job, saved to a JSON file after every player."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            self.done = set(saved.get("done", []))
+            self.failed = saved.get("failed", {})
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed}, f)
+        os.replace(tmp_path, self.path)
+
+    def mark_done(self, tag: str) -> None:
+        with self._lock:
+            self.done.add(tag)
+            self.failed.pop(tag, None)
+            self._save()
+
+    def mark_failed(self, tag: str, error: str) -> None:
+        with self._lock:
+            self.failed[tag] = error
+            self._save()
+
+
+@dataclass
+class BatchReport:
+    players_done: int = 0
+    players_failed: int = 0
+    players_skipped: int = 0
+    elapsed_seconds: float = 0.0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    retrieval_hits: int = 0
+
+    @property
+    def players_per_minute(self) -> float:
+        return self.players_done / self.elapsed_seconds * 60 if self.elapsed_seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.players_done} players done, {self.players_failed} failed, {self.players_skipped} skipped "
+                f"in {self.elapsed_seconds:.1f}s ({self.players_per_minute:.1f} players/min). "
+                f"Tokens: {self.prompt_tokens} prompt, {self.output_tokens} output. Cost: ${self.cost_usd:.4f}. "
+                f"Shared retrievals reused: {self.retrieval_hits}.")
+
+
+class BatchInsightsJob:
+    def __init__(self, store: InsightsStore, checkpoint: BatchCheckpoint, max_workers: int = 4,
+                 service_factory: Callable[[str], ApiService] = None, pricing: Dict[str, float] = None,
+                 llm_provider: str = "google", model: str = None, llm_concurrency: int = 16,
+                 requests_per_minute: Optional[float] = 1000, tokens_per_minute: Optional[float] = 1_000_000):
+        """
+        Args:
+            store (InsightsStore): Where the insights of each player are written.
+            checkpoint (BatchCheckpoint): Progress of the job; players already done are skipped.
+            max_workers (int): Players processed concurrently.
+            service_factory (callable, optional): Builds the ApiService of a user id ('%23' + tag).
+                Defaults to services sharing one retriever and the LLM caches.
+            pricing (dict, optional): USD per million 'input_per_million' and 'output_per_million' tokens.
+                Defaults to the list prices of the model.
+            llm_provider (str): Provider of the default services.
+            model (str, optional): Model of the default services.
+            llm_concurrency (int): LLM requests in flight at the same time, over all the players.
+            requests_per_minute (float, optional): RPM quota of the LLM calls of the default services.
+            tokens_per_minute (float, optional): Input TPM quota of the LLM calls of the default services.
+        """
+        self.store = store
+        self.checkpoint = checkpoint
+        self.max_workers = max_workers
+        free = {"input_per_million": 0.0, "output_per_million": 0.0}
+        self.pricing = pricing or (free if llm_provider == "local" else
+                                   MODEL_PRICING.get(model or "gemini-2.0-flash", free))
+        self.llm_provider = llm_provider
+        self.model = model
+        self.llm_concurrency = llm_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.retriever = None
+        self.llm_connector = None
+        self.service_factory = service_factory or self._default_service_factory()
+
+    def _default_service_factory(self) -> Callable[[str], ApiService]:
+        rag_retriever = ContextHandler(game="brawl", rag_enabled=True).rag_retriever
+        self.retriever = MemoizedRetriever(rag_retriever) if rag_retriever is not None else None
+        response_cache = InMemoryResponseCache(max_entries=10000, ttl_seconds=None)
+        semantic_cache = SemanticResponseCache()
+        self.llm_connector = AsyncLLMConnector(llm_provider=self.llm_provider, model_name=self.model,
+                                               max_concurrency=self.llm_concurrency,
+                                               requests_per_minute=self.requests_per_minute,
+                                               tokens_per_minute=self.tokens_per_minute)
+        llm_client = AsyncConnectorClient(self.llm_connector)
+
+        def build(user_id):
+            return ApiService(game="brawl", user_id=user_id, llm_provider=self.llm_provider,
+                              model=self.llm_connector.model_name, response_cache=response_cache,
+                              semantic_cache=semantic_cache, rag_retriever=self.retriever, llm_client=llm_client)
+        return build
+
+    def _run_player(self, tag: str) -> Dict[str, int]:
+        service = self.service_factory("%23" + tag)
+        insights = service.get_ai_insights()
+        usage = {
+            "prompt_tokens": sum(stats.get("actual_prompt_tokens") or 0 for stats in service.prompt_stats.values()),
+            "output_tokens": sum(stats.get("actual_output_tokens") or 0 for stats in service.prompt_stats.values()),
+        }
+        self.store.put(tag, insights, {"stage_timings": service.stage_timings, **usage})
+        return usage
+
+    def run(self, tags: List[str]) -> BatchReport:
+        """Computes and stores the insights of every tag not done yet, and reports throughput and cost."""
+        report = BatchReport()
+        pending = []
+        for tag in dict.fromkeys(normalize_tag(tag) for tag in tags):
+            if tag in self.checkpoint.done:
+                report.players_skipped += 1
+            else:
+                pending.append(tag)
+        print(f"BatchInsightsJob: {len(pending)} players to process, {report.players_skipped} already done.")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._run_player, tag): tag for tag in pending}
+            for future in as_completed(futures):
+                tag = futures[future]
+                try:
+                    usage = future.result()
+                except Exception as e:
+                    print(f"BatchInsightsJob: Player {tag} failed: {e}")
+                    report.players_failed += 1
+                    self.checkpoint.mark_failed(tag, str(e))
+                    continue
+                report.players_done += 1
+                report.prompt_tokens += usage["prompt_tokens"]
+                report.output_tokens += usage["output_tokens"]
+                self.checkpoint.mark_done(tag)
+
+        report.elapsed_seconds = time.perf_counter() - start
+        report.cost_usd = (report.prompt_tokens * self.pricing["input_per_million"]
+                           + report.output_tokens * self.pricing["output_per_million"]) / 1_000_000
+        if self.retriever is not None:
+            report.retrieval_hits = self.retriever.hits
+        print(f"BatchInsightsJob: {report.summary()}")
+        if self.llm_connector is not None:
+            print(f"BatchInsightsJob: LLM calls: {self.llm_connector.latency_stats()}")
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> BatchReport:
+    parser = argparse.ArgumentParser(description="Precompute the insights of a list of players.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tags-file", help="File with one player tag per line")
+    source.add_argument("--rankings", metavar="COUNTRY", help="Use the top players of a country ('global' for all)")
+    parser.add_argument("--limit", type=int, default=200, help="Players taken from the rankings")
+    parser.add_argument("--workers", type=int, default=4, help="Players processed concurrently")
+    parser.add_argument("--store-dir", default="data/processed/insights_store")
+    parser.add_argument("--checkpoint", default="data/processed/insights_store/_batch_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and process every player")
+    parser.add_argument("--llm-provider", default="google", help="'google', or 'local' for the offline stand-in")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="LLM requests in flight at the same time")
+    parser.add_argument("--rpm", type=float, default=1000, help="Requests per minute quota of the model")
+    parser.add_argument("--tpm", type=float, default=1_000_000, help="Input tokens per minute quota of the model")
+    parser.add_argument("--metrics-jsonl", default=None, help="Append the pipeline metrics to this JSON lines file")
+    args = parser.parse_args(argv)
+
+    tags = read_tags_file(args.tags_file) if args.tags_file else fetch_ranking_tags(args.rankings, args.limit)
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    job = BatchInsightsJob(InsightsStore(args.store_dir), BatchCheckpoint(args.checkpoint), max_workers=args.workers,
+                           llm_provider=args.llm_provider, model=args.model, llm_concurrency=args.llm_concurrency,
+                           requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    report = job.run(tags)
+    if args.metrics_jsonl:
+        METRICS.add_exporter(JsonLinesExporter(args.metrics_jsonl))
+        METRICS.export()
+    print(json.dumps({**asdict(report), "players_per_minute": report.players_per_minute}, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Module implementing the append-only store of clip analyses.
+
+Every analysis (or failed analysis) of a clip is appended as one JSON line:
+
+    {"content_hash", "brawler", "video_id", "prompt_version", "analyzed_at", "description" | "error"}
+
+Nothing is overwritten, so the results of earlier runs stay available after
+a rerun. The file is loaded once and indexed in memory by brawler and by clip
+hash, each index in analysis order so time ranges are found by bisection;
+lines appended since (e.g. by another process) are read on the next lookup.
+Subscribers are called with every record appended by this process.
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _analyzed_at(record: Dict[str, Any]) -> float:
+    return record["analyzed_at"]
+
+
+class ClipAnalysisStore:
+    def __init__(self, path: str = "data/processed/clip_analyses.jsonl"):
+        """
+        Args:
+            path (str): JSON lines file of the analyses, created on first append.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: List[Dict[str, Any]] = []
+        self._by_brawler: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_hash: Dict[str, List[Dict[str, Any]]] = {}
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        # Bytes of the file already indexed
+        self._offset = 0
+        self._read_new_lines()
+
+    def _index(self, record: Dict[str, Any]) -> None:
+        self._records.append(record)
+        for index, key in ((self._by_brawler, record.get("brawler")), (self._by_hash, record.get("content_hash"))):
+            if key is None:
+                continue
+            # kept sorted by time even if concurrent writers appended slightly out of order
+            bisect.insort(index.setdefault(key, []), record, key=_analyzed_at)
+
+    def _read_new_lines(self) -> None:
+        """Indexes the lines appended to the file since the last read. Called with the lock held."""
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+        except OSError:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # line still being written (or cut by a crash): read again next time
+                    break
+                self._offset += len(line)
+                try:
+                    self._index(json.loads(line))
+                except ValueError:
+                    print(f"LLM Service Warning: Skipping an unreadable line of '{self.path}'.")
+
+    def append(self, content_hash: Optional[str], brawler: str, video_id: str, prompt_version: str,
+               description: Optional[str] = None, error: Optional[str] = None) -> Dict[str, Any]:
+        """Records an analysis (description) or a failed one (error) and returns the record."""
+        record = {"content_hash": content_hash, "brawler": brawler.lower(), "video_id": video_id,
+                  "prompt_version": prompt_version, "analyzed_at": time.time()}
+        if error is not None:
+            record["error"] = error
+        else:
+            record["description"] = description
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            self._read_new_lines()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(line)
+                end = f.tell()
+            if end - len(line) == self._offset:
+                self._offset = end
+                self._index(record)
+            # else another process appended in between: the next read indexes both lines
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber(record)
+            except Exception as e:
+                print(f"LLM Service Warning: A clip analysis subscriber failed: {e}")
+        return record
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Calls callback with every record appended from now on."""
+        self._subscribers.append(callback)
+
+    @staticmethod
+    def _select(records: List[Dict[str, Any]], prompt_version: Optional[str], since: Optional[float],
+                include_errors: bool) -> List[Dict[str, Any]]:
+        start = bisect.bisect_left(records, since, key=_analyzed_at) if since is not None else 0
+        return [r for r in reversed(records[start:])
+                if (prompt_version is None or r["prompt_version"] == prompt_version)
+                and (include_errors or "error" not in r)]
+
+    def for_brawler(self, brawler: str, prompt_version: Optional[str] = None, since: Optional[float] = None,
+                    include_errors: bool = False) -> List[Dict[str, Any]]:
+        """Analyses of the clips of a brawler, newest first."""
+        with self._lock:
+            self._read_new_lines()
+            return self._select(self._by_brawler.get(brawler.lower(), []), prompt_version, since, include_errors)
+
+    def for_clip(self, content_hash: str, prompt_version: Optional[str] = None,
+                 include_errors: bool = False) -> List[Dict[str, Any]]:
+        """Analyses of a clip (by the hash of its bytes), newest first."""
+        with self._lock:
+            self._read_new_lines()
+            return self._select(self._by_hash.get(content_hash, []), prompt_version, None, include_errors)
+
+    def latest(self, brawler: str, prompt_version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Newest successful analysis of a brawler's clips, or None."""
+        records = self.for_brawler(brawler, prompt_version)
+        return records[0] if records else None
+
+    def brawlers(self) -> List[str]:
+        with self._lock:
+            self._read_new_lines()
+            return sorted(self._by_brawler)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._read_new_lines()
+            return len(self._records)
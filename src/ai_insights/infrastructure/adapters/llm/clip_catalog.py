@@ -0,0 +1,71 @@
+"""Module implementing the cached catalog of the clip files of a directory.
+
+Looking up the clip of a brawler used to list the clips directory on every
+call. ClipCatalog lists it once and keeps the clips sorted and grouped by
+brawler ('leon_clip.mp4' -> 'leon'); a lookup only stats the directory and
+lists it again when its modification time changed (a clip added, removed or
+renamed).
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+
+def brawler_from_clip(video_path: str) -> str:
+    """Brawler of a clip, from its file name ('leon_clip.mp4' -> 'leon')."""
+    return os.path.splitext(os.path.basename(video_path))[0].split("_")[0].lower()
+
+
+class ClipCatalog:
+    def __init__(self, videos_dir: str):
+        """
+        Args:
+            videos_dir (str): Absolute path of the clips directory.
+        """
+        self.videos_dir = videos_dir
+        self._lock = threading.Lock()
+        self._mtime_ns: Optional[int] = None
+        self._clips: List[str] = []
+        self._by_brawler: Dict[str, List[str]] = {}
+
+    def _refresh(self) -> bool:
+        """Lists the directory again if it changed. Returns False if it does not exist."""
+        try:
+            mtime_ns = os.stat(self.videos_dir).st_mtime_ns
+        except OSError:
+            self._mtime_ns, self._clips, self._by_brawler = None, [], {}
+            return False
+        if mtime_ns != self._mtime_ns:
+            clips = sorted(os.path.join(self.videos_dir, f_name) for f_name in os.listdir(self.videos_dir)
+                           if f_name.lower().endswith(VIDEO_EXTENSIONS))
+            by_brawler = {}
+            for path in clips:
+                by_brawler.setdefault(brawler_from_clip(path), []).append(path)
+            self._mtime_ns, self._clips, self._by_brawler = mtime_ns, clips, by_brawler
+        return True
+
+    def exists(self) -> bool:
+        with self._lock:
+            return self._refresh()
+
+    def clips(self) -> List[str]:
+        """Absolute paths of all the clips, sorted."""
+        with self._lock:
+            self._refresh()
+            return list(self._clips)
+
+    def for_brawler(self, brawler_name: str) -> List[str]:
+        """
+        Clips of a brawler, sorted: those named after it ('leon_*.mp4'), else the clips whose
+        file name contains its name.
+        """
+        name = brawler_name.lower()
+        with self._lock:
+            self._refresh()
+            named = self._by_brawler.get(name)
+            if named:
+                return list(named)
+            return [path for path in self._clips if name in os.path.basename(path).lower()]
@@ -1,9 +1,17 @@
 import google.generativeai as genai
 import os
+import threading
 import time
 import json
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from src.ai_insights.infrastructure.adapters.llm.clip_analysis_store import ClipAnalysisStore
+from src.ai_insights.infrastructure.adapters.llm.clip_catalog import ClipCatalog, brawler_from_clip
+from src.ai_insights.infrastructure.adapters.llm.clip_preprocessing import ClipPreprocessor, ProxySettings
+from src.ai_insights.infrastructure.adapters.llm.clip_registry import ClipRegistry, file_sha256
+from src.ai_insights.infrastructure.adapters.llm.upload_watcher import UploadStatusWatcher
+
 try:
     PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", ".."))
 except NameError: 
@@ -45,35 +53,14 @@ def _ensure_api_key_is_configured():
 
 def _resolve_path(base_dir_relative_to_root: str, filename: str = "") -> str:
     """Resolves a path to be absolute from the project root."""
+    if not filename:
+        return os.path.join(PROJECT_ROOT, base_dir_relative_to_root)
     return os.path.join(PROJECT_ROOT, base_dir_relative_to_root, filename)
 
-def _analyze_clip_with_gemini(video_path: str, user_provided_context: str) -> dict:
-    """Internal core Gemini analysis function."""
-    video_filename = os.path.basename(video_path)
-    if not os.path.exists(video_path): 
-        return {"video_id": video_filename, "error": f"Video file not found at '{video_path}'."}
-    
-    if not _api_key_configured_globally: 
-         print("LLM Service Error: API key not configured prior to Gemini call.")
-         return {"video_id": video_filename, "error": "Google API Key not configured before Gemini call."}
-
-    video_file_resource = None
-    try:
-        print(f"LLM Service: Uploading video '{video_filename}' from '{video_path}'...")
-        video_file_resource = genai.upload_file(path=video_path)
-
-        while video_file_resource.state.name == "PROCESSING":
-            print(f"LLM Service: Video '{video_filename}' processing (state: {video_file_resource.state.name})...")
-            time.sleep(2) 
-            video_file_resource = genai.get_file(video_file_resource.name)
-
-        if video_file_resource.state.name == "FAILED":
-            return {"video_id": video_filename, "error": f"Gemini API failed to process video '{video_file_resource.name}'."}
-        
-        print(f"LLM Service: Video '{video_filename}' processed (state: {video_file_resource.state.name}).")
-
-        model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-        full_prompt = f"""
+CLIP_MODEL_NAME = "gemini-1.5-flash"
+# Bump when CLIP_ANALYSIS_PROMPT changes, so stored analyses of the old prompt are not reused
+CLIP_PROMPT_VERSION = "v1"
+CLIP_ANALYSIS_PROMPT = """
         You are an expert eSports analyst for Brawl Stars.
         Analyze the provided video clip. Your goal is to generate a concise, exciting, Brawler-focused description of the key play,
         no more than two lines (approximately 30-50 words).
@@ -97,39 +84,130 @@ def _analyze_clip_with_gemini(video_path: str, user_provided_context: str) -> di
 
         Now, analyze the video and generate the Brawler-focused description:
         """
+
+
+def _upload_clip(video_path: str):
+    """Uploads a clip to the Gemini File API and returns its file resource (usually still PROCESSING)."""
+    print(f"LLM Service: Uploading video '{os.path.basename(video_path)}' from '{video_path}'...")
+    return genai.upload_file(path=video_path)
+
+
+def _upload_key(content_hash: str, proxy_tag: str = None) -> str:
+    """Identifies what is uploaded for a clip: the clip itself, or its proxy made with the settings of proxy_tag."""
+    return f"{content_hash}:proxy-{proxy_tag}" if proxy_tag else content_hash
+
+
+def _analysis_version(proxy_tag: str = None) -> str:
+    """Prompt version of the stored analyses; analyses of proxies are not mixed with those of clips."""
+    return f"{CLIP_PROMPT_VERSION}+proxy-{proxy_tag}" if proxy_tag else CLIP_PROMPT_VERSION
+
+
+def _proxy_tag(proxy_result) -> str | None:
+    """Settings tag of a proxy, None if no proxy was made and the clip itself is uploaded."""
+    return getattr(proxy_result, "settings_tag", None) if proxy_result is not None else None
+
+
+def _get_file(name: str):
+    return genai.get_file(name)
+
+
+_shared_watcher = None
+_shared_watcher_lock = threading.Lock()
+
+
+def _upload_watcher() -> UploadStatusWatcher:
+    """Watcher shared by the uploads of the process that are not given their own."""
+    global _shared_watcher
+    with _shared_watcher_lock:
+        if _shared_watcher is None:
+            _shared_watcher = UploadStatusWatcher(get_file=_get_file)
+        return _shared_watcher
+
+
+def _wait_until_processed(video_file_resource, size_bytes: int = None, watcher: UploadStatusWatcher = None):
+    """Waits until Gemini has processed an uploaded file, and returns its final resource."""
+    if video_file_resource.state.name == "PROCESSING":
+        print(f"LLM Service: Video '{video_file_resource.name}' processing...")
+    return (watcher or _upload_watcher()).watch(video_file_resource, size_bytes).result()
+
+
+def _generate_clip_description(video_file_resource, user_provided_context: str) -> str:
+    """Prompts the model with a processed clip and returns the description."""
+    model = genai.GenerativeModel(model_name=CLIP_MODEL_NAME)
+    full_prompt = CLIP_ANALYSIS_PROMPT.format(user_provided_context=user_provided_context)
+    response = model.generate_content([full_prompt, video_file_resource])
+    return response.text.strip()
+
+
+def _delete_uploaded_file(video_file_resource) -> None:
+    if video_file_resource and hasattr(video_file_resource, 'name') and video_file_resource.name:
+        try:
+            genai.delete_file(video_file_resource.name)
+        except Exception as e_del:
+            print(f"LLM Service Warning: Could not delete API file {video_file_resource.name}. Error: {e_del}")
+
+
+def _analysis_error(video_filename: str, e: Exception) -> dict:
+    error_message = f"LLM Service: Error during analysis of '{video_filename}': {str(e)}"
+    if any(code in str(e).lower() for code in ["permission_denied", "authentication", "api key", "400", "401", "403", "429"]):
+        error_message = f"LLM Service: API communication error for '{video_filename}'. Check API Key/quota/permissions. Details: {str(e)}"
+    return {"video_id": video_filename, "error": error_message}
+
+
+def _analyze_clip_with_gemini(video_path: str, user_provided_context: str, upload_path: str = None) -> dict:
+    """Internal core Gemini analysis function. upload_path is what is uploaded, by default the clip itself."""
+    video_filename = os.path.basename(video_path)
+    if not os.path.exists(video_path): 
+        return {"video_id": video_filename, "error": f"Video file not found at '{video_path}'."}
+    
+    if not _api_key_configured_globally: 
+         print("LLM Service Error: API key not configured prior to Gemini call.")
+         return {"video_id": video_filename, "error": "Google API Key not configured before Gemini call."}
+
+    upload_path = upload_path or video_path
+    video_file_resource = None
+    try:
+        video_file_resource = _upload_clip(upload_path)
+        video_file_resource = _wait_until_processed(video_file_resource, os.path.getsize(upload_path))
+
+        if video_file_resource.state.name == "FAILED":
+            return {"video_id": video_filename, "error": f"Gemini API failed to process video '{video_file_resource.name}'."}
+        
+        print(f"LLM Service: Video '{video_filename}' processed (state: {video_file_resource.state.name}).")
         print(f"LLM Service: Generating content for '{video_filename}'...")
-        response = model.generate_content([full_prompt, video_file_resource])
-        return {"video_id": video_filename, "description": response.text.strip()}
+        return {"video_id": video_filename,
+                "description": _generate_clip_description(video_file_resource, user_provided_context)}
     except Exception as e:
-        error_message = f"LLM Service: Error during analysis of '{video_filename}': {str(e)}"
-        if any(code in str(e).lower() for code in ["permission_denied", "authentication", "api key", "400", "401", "403", "429"]):
-            error_message = f"LLM Service: API communication error for '{video_filename}'. Check API Key/quota/permissions. Details: {str(e)}"
-        return {"video_id": video_filename, "error": error_message}
+        return _analysis_error(video_filename, e)
     finally:
-        if video_file_resource and hasattr(video_file_resource, 'name') and video_file_resource.name:
-            try:
-                genai.delete_file(video_file_resource.name)
-            except Exception as e_del:
-                print(f"LLM Service Warning: Could not delete API file {video_file_resource.name}. Error: {e_del}")
+        _delete_uploaded_file(video_file_resource)
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def _clip_catalog(videos_dir_relative: str) -> ClipCatalog:
+    """Catalog of a clips directory, shared by the calls of the process."""
+    abs_videos_dir = os.path.normpath(_resolve_path(videos_dir_relative))
+    with _catalogs_lock:
+        if abs_videos_dir not in _catalogs:
+            _catalogs[abs_videos_dir] = ClipCatalog(abs_videos_dir)
+        return _catalogs[abs_videos_dir]
+
 
 def _find_video_path(brawler_name: str, videos_dir_relative: str) -> str | None:
     """Finds the absolute path to a video file for the given brawler."""
-    abs_videos_dir = _resolve_path(videos_dir_relative)
-    if not os.path.isdir(abs_videos_dir):
-        print(f"LLM Service Error: Videos directory '{abs_videos_dir}' not found.")
+    catalog = _clip_catalog(videos_dir_relative)
+    if not catalog.exists():
+        print(f"LLM Service Error: Videos directory '{catalog.videos_dir}' not found.")
         return None
         
-    found_videos = []
-    for f_name in os.listdir(abs_videos_dir):
-        if brawler_name.lower() in f_name.lower() and f_name.lower().endswith((".mp4", ".mov", ".avi", ".mkv", ".webm")):
-            found_videos.append(os.path.join(abs_videos_dir, f_name))
-    
+    found_videos = catalog.for_brawler(brawler_name)
     if not found_videos:
-        print(f"LLM Service: No video files found for Brawler '{brawler_name}' in '{abs_videos_dir}' (searched for filenames containing '{brawler_name.lower()}').")
+        print(f"LLM Service: No video files found for Brawler '{brawler_name}' in '{catalog.videos_dir}' (searched for filenames containing '{brawler_name.lower()}').")
         return None
     
     if len(found_videos) > 1:
-        found_videos.sort() 
         print(f"LLM Service Warning: Multiple videos found for '{brawler_name}': {[os.path.basename(v) for v in found_videos]}.")
         print(f"Using the first one found (alphabetically): '{os.path.basename(found_videos[0])}'.")
     return found_videos[0]
@@ -202,8 +280,18 @@ def _create_sample_context_if_needed(brawler_name: str, contexts_dir_relative: s
 def brawler_clip_analysis( 
         brawler_name: str,
         videos_dir_relative_to_root: str = "data/raw/clips/",
-        contexts_dir_relative_to_root: str = "data/raw/context/"
+        contexts_dir_relative_to_root: str = "data/raw/context/",
+        registry_path_relative_to_root: str = "data/processed/clip_registry.jsonl",
+        store_path_relative_to_root: str = "data/processed/clip_analyses.jsonl",
+        preprocess: bool = True,
+        proxy_settings: ProxySettings = None,
     ):
+    """
+    Analyzes the clip of a brawler. The analysis is appended to the clip analysis store, and
+    '<brawler>_clip_context.json' lists it first, followed by the earlier analyses of the
+    brawler's other clips kept in the store. With preprocess (and ffmpeg installed), a smaller
+    proxy of the clip is uploaded.
+    """
     output_json_dir_relative_to_root = "data/raw/clip_context/" 
     output_filename = f"{brawler_name.lower()}_clip_context.json"
 
@@ -237,10 +325,50 @@ def brawler_clip_analysis(
             context_snippet = context_text_for_analysis.replace('\n', ' ').strip()
             print(f"LLM Service: Using context (first 100 chars): '{context_snippet[:100]}...'")
             
-            analysis_result_dictionary = _analyze_clip_with_gemini(video_absolute_path, context_text_for_analysis)
+            registry = ClipRegistry(_resolve_path(registry_path_relative_to_root))
+            store = ClipAnalysisStore(_resolve_path(store_path_relative_to_root))
+            preprocessor = ClipPreprocessor(_resolve_path("data/processed/clip_proxies"), proxy_settings) if preprocess else None
+            if preprocessor is not None and not preprocessor.enabled:
+                preprocessor = None
+            content_hash = registry.content_hash(video_absolute_path)
+            proxy_tag = preprocessor.settings.tag() if preprocessor is not None else None
+            stored = registry.get_analysis(content_hash, context_text_for_analysis, _analysis_version(proxy_tag))
+            proxy_result = None
+            if stored is None and preprocessor is not None:
+                proxy_result = preprocessor.proxy(video_absolute_path, content_hash)
+                proxy_tag = _proxy_tag(proxy_result)
+                if proxy_tag is None:
+                    # no proxy could be made: the clip itself may have been analyzed before
+                    stored = registry.get_analysis(content_hash, context_text_for_analysis, _analysis_version())
+            if stored is not None:
+                print("LLM Service: Same clip, context and prompt analyzed before. Reusing the stored analysis.")
+                analysis_result_dictionary = {"video_id": os.path.basename(video_absolute_path),
+                                              "description": stored["description"]}
+            else:
+                analysis_version = _analysis_version(proxy_tag)
+                analysis_result_dictionary = _analyze_clip_with_gemini(
+                    video_absolute_path, context_text_for_analysis,
+                    upload_path=proxy_result.proxy_path if proxy_tag else None)
+                if "description" in analysis_result_dictionary:
+                    registry.put_analysis(content_hash, context_text_for_analysis, analysis_version,
+                                          analysis_result_dictionary["description"],
+                                          analysis_result_dictionary["video_id"])
+                    if proxy_tag:
+                        analysis_result_dictionary["preprocessing"] = proxy_result.report()
+                store.append(content_hash, brawler_name, analysis_result_dictionary["video_id"], analysis_version,
+                             description=analysis_result_dictionary.get("description"),
+                             error=analysis_result_dictionary.get("error"))
             
             if analysis_result_dictionary:
                 analysis_data_list.append(analysis_result_dictionary)
+
+            # earlier results are listed too, so a rerun never loses them
+            listed_hashes = {content_hash}
+            for record in store.for_brawler(brawler_name):
+                if record["content_hash"] not in listed_hashes:
+                    listed_hashes.add(record["content_hash"])
+                    analysis_data_list.append({"video_id": record["video_id"], "description": record["description"],
+                                               "analyzed_at": record["analyzed_at"]})
         
         result_to_save = analysis_data_list
 
@@ -248,7 +376,7 @@ def brawler_clip_analysis(
     try:
         with open(output_filepath_absolute, 'w', encoding='utf-8') as f:
             json.dump(result_to_save, f, ensure_ascii=False, indent=4)
-        print(f"LLM Service: Analysis result saved/overwritten: {output_filepath_absolute}")
+        print(f"LLM Service: Analysis results of '{brawler_name}' saved: {output_filepath_absolute}")
     except IOError as e: 
         print(f"LLM Service Error: Could not save JSON to '{output_filepath_absolute}': {e}")
         print("LLM Service Result (console output instead due to save error):\n", json.dumps(result_to_save, ensure_ascii=False, indent=4))
@@ -256,4 +384,267 @@ def brawler_clip_analysis(
         print(f"LLM Service Error: Could not serialize result to JSON for '{output_filepath_absolute}': {e}")
         print("LLM Service Result (raw data that failed serialization):\n", result_to_save)
     
-    print("\nLLM Service: Brawler clip analysis process finished.")
\ No newline at end of file
+    print("\nLLM Service: Brawler clip analysis process finished.")
+
+
+def _discover_clips(videos_dir_relative: str) -> list[str]:
+    """Absolute paths of all the video files of the clips directory, sorted."""
+    catalog = _clip_catalog(videos_dir_relative)
+    if not catalog.exists():
+        print(f"LLM Service Error: Videos directory '{catalog.videos_dir}' not found.")
+        return []
+    return catalog.clips()
+
+
+class ClipBatchAnalyzer:
+    """
+    Analyzes many clips concurrently. Each clip goes through upload, processing wait and
+    generation; every stage has its own concurrency limit, so uploads of the next clips
+    overlap with the processing and generation of the previous ones.
+
+    Identical clips (same bytes) are uploaded once per run. With a registry, a clip already
+    analyzed with the same context and prompt version is neither uploaded nor analyzed, and
+    uploaded files can be kept for later runs instead of being deleted. With a preprocessor,
+    a smaller proxy of each clip is made first (its own stage, as ffmpeg is CPU bound) and
+    uploaded instead of the clip.
+    """
+
+    def __init__(self, results_path: str, contexts_dir_relative: str = "data/raw/context/",
+                 max_uploads: int = 2, max_processing: int = 8, max_generations: int = 4, max_preprocessing: int = 2,
+                 poll_seconds: float = None, registry: ClipRegistry = None, keep_uploaded_files: bool = False,
+                 preprocessor: ClipPreprocessor = None, watcher: UploadStatusWatcher = None,
+                 store: ClipAnalysisStore = None):
+        """
+        Args:
+            results_path (str): JSON lines file where each result is appended as soon as it is ready.
+            contexts_dir_relative (str): Directory of the '<brawler>_context.txt' files.
+            max_uploads (int): Clips uploaded at the same time (bandwidth bound).
+            max_processing (int): Uploaded clips waiting for Gemini processing at the same time.
+            max_generations (int): Concurrent generate_content calls (rate limit bound).
+            max_preprocessing (int): Proxies made at the same time (ffmpeg processes, CPU bound).
+            poll_seconds (float, optional): Shortest interval between two polls of a processing clip,
+                for a watcher of the run. By default the clips are watched by the watcher shared by the
+                process, which keeps what it learned of Gemini's processing speed across runs.
+            registry (ClipRegistry, optional): Stored analyses and uploaded files reused across runs.
+            keep_uploaded_files (bool): Keep the uploaded files (within the registry TTL) for later
+                prompts instead of deleting them at the end of the run. Needs a registry.
+            preprocessor (ClipPreprocessor, optional): Makes the trimmed/downscaled proxies uploaded
+                instead of the clips.
+            watcher (UploadStatusWatcher, optional): Watcher of the clips being processed.
+            store (ClipAnalysisStore, optional): Store every new analysis (or failure) is appended to.
+        """
+        self.results_path = results_path
+        self.contexts_dir_relative = contexts_dir_relative
+        self.max_workers = max_uploads + max_processing + max_generations + max_preprocessing
+        if watcher is None:
+            watcher = _upload_watcher() if poll_seconds is None else \
+                UploadStatusWatcher(get_file=_get_file, min_poll_seconds=poll_seconds)
+        self.watcher = watcher
+        self.registry = registry
+        self.store = store
+        self.keep_uploaded_files = keep_uploaded_files and registry is not None
+        self.preprocessor = preprocessor if preprocessor is not None and preprocessor.enabled else None
+        # Proxy of each clip hash of the run (only those actually made), with its savings
+        self.proxy_results = {}
+        self._preprocessing = threading.BoundedSemaphore(max_preprocessing)
+        self._uploads = threading.BoundedSemaphore(max_uploads)
+        self._processing = threading.BoundedSemaphore(max_processing)
+        self._generations = threading.BoundedSemaphore(max_generations)
+        self._write_lock = threading.Lock()
+        # Proxy result and processed file of each clip hash of the run, shared by identical clips
+        self._proxies_by_hash = {}
+        self._files_by_hash = {}
+        self._files_lock = threading.Lock()
+
+    def _content_hash(self, video_path: str) -> str:
+        return self.registry.content_hash(video_path) if self.registry else file_sha256(video_path)
+
+    def _once(self, futures: dict, key, compute):
+        """compute() for a key of the run, called by the first clip asking for it and awaited by the others."""
+        with self._files_lock:
+            future = futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = futures[key] = Future()
+        if not is_owner:
+            return future.result()
+        try:
+            result = compute()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def _registered_file(self, content_hash: str):
+        """The file uploaded by a previous run if still alive and processed, else None."""
+        file_name = self.registry.get_file(content_hash) if self.registry else None
+        if file_name is None:
+            return None
+        try:
+            video_file_resource = genai.get_file(file_name)
+            if video_file_resource.state.name == "ACTIVE":
+                print(f"LLM Service: Reusing uploaded file '{file_name}'.")
+                return video_file_resource
+        except Exception as e:
+            print(f"LLM Service: Uploaded file '{file_name}' is gone ({e}).")
+        self.registry.forget_file(content_hash)
+        return None
+
+    def _proxy(self, content_hash: str, video_path: str):
+        """Proxy of a clip (None without preprocessor), made once per run in the preprocessing stage."""
+        if self.preprocessor is None:
+            return None
+
+        def make_proxy():
+            with self._preprocessing:
+                proxy_result = self.preprocessor.proxy(video_path, content_hash)
+            if _proxy_tag(proxy_result):
+                self.proxy_results[content_hash] = proxy_result
+            return proxy_result
+        return self._once(self._proxies_by_hash, content_hash, make_proxy)
+
+    def _processed_file(self, content_hash: str, upload_path: str, proxy_tag: str = None):
+        """Processed file of a clip (or of its proxy), uploaded only by the first clip of the run with these bytes."""
+        upload_key = _upload_key(content_hash, proxy_tag)
+
+        def upload():
+            video_file_resource = self._registered_file(upload_key)
+            if video_file_resource is None:
+                with self._uploads:
+                    video_file_resource = _upload_clip(upload_path)
+                with self._processing:
+                    video_file_resource = _wait_until_processed(video_file_resource, os.path.getsize(upload_path),
+                                                                self.watcher)
+                if self.registry is not None and video_file_resource.state.name == "ACTIVE":
+                    self.registry.put_file(upload_key, video_file_resource.name)
+            return video_file_resource
+        return self._once(self._files_by_hash, upload_key, upload)
+
+    def _stored_description(self, content_hash: str, context_text: str, proxy_tag: str = None) -> str | None:
+        if self.registry is None:
+            return None
+        stored = self.registry.get_analysis(content_hash, context_text, _analysis_version(proxy_tag))
+        return stored["description"] if stored is not None else None
+
+    def analyze_clip(self, video_path: str) -> dict:
+        video_filename = os.path.basename(video_path)
+        brawler_name = brawler_from_clip(video_path)
+        context_text, _ = _load_context_text(brawler_name, self.contexts_dir_relative)
+        content_hash = None
+        proxy_tag = None
+        try:
+            content_hash = self._content_hash(video_path)
+            # an analysis of a proxy made with the current settings is found without running ffmpeg
+            proxy_tag = self.preprocessor.settings.tag() if self.preprocessor is not None else None
+            description = self._stored_description(content_hash, context_text, proxy_tag)
+            proxy_result = None
+            if description is None and self.preprocessor is not None:
+                proxy_result = self._proxy(content_hash, video_path)
+                proxy_tag = _proxy_tag(proxy_result)
+                if proxy_tag is None:
+                    # no proxy could be made: the clip itself is uploaded, and may have been analyzed before
+                    description = self._stored_description(content_hash, context_text)
+            if description is not None:
+                return {"video_id": video_filename, "brawler": brawler_name,
+                        "description": description, "cached": True}
+
+            upload_path = proxy_result.proxy_path if proxy_tag else video_path
+            video_file_resource = self._processed_file(content_hash, upload_path, proxy_tag)
+            if video_file_resource.state.name == "FAILED":
+                result = {"video_id": video_filename, "brawler": brawler_name,
+                          "error": f"Gemini API failed to process video '{video_file_resource.name}'."}
+            else:
+                with self._generations:
+                    description = _generate_clip_description(video_file_resource, context_text)
+                if self.registry is not None:
+                    self.registry.put_analysis(content_hash, context_text, _analysis_version(proxy_tag), description,
+                                               video_filename)
+                result = {"video_id": video_filename, "brawler": brawler_name, "description": description}
+                if proxy_tag:
+                    result["preprocessing"] = proxy_result.report()
+        except Exception as e:
+            result = {**_analysis_error(video_filename, e), "brawler": brawler_name}
+        if self.store is not None:
+            self.store.append(content_hash, brawler_name, video_filename, _analysis_version(proxy_tag),
+                              description=result.get("description"), error=result.get("error"))
+        return result
+
+    def _release_files(self) -> None:
+        """Deletes the files uploaded in the run, unless they are kept for later runs."""
+        with self._files_lock:
+            files, self._files_by_hash = self._files_by_hash, {}
+        for upload_key, future in files.items():
+            if future.exception() is not None or self.keep_uploaded_files:
+                continue
+            _delete_uploaded_file(future.result())
+            if self.registry is not None:
+                self.registry.forget_file(upload_key)
+
+    def _write_result(self, result: dict) -> None:
+        with self._write_lock, open(self.results_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def run(self, video_paths: list[str]) -> list[dict]:
+        """Analyzes the clips and returns the results in completion order."""
+        results = []
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(video_paths)))) as pool:
+                futures = {pool.submit(self.analyze_clip, path): path for path in video_paths}
+                for future in as_completed(futures):
+                    result = future.result()
+                    self._write_result(result)
+                    results.append(result)
+                    status = "failed" if "error" in result else ("reused" if result.get("cached") else "done")
+                    print(f"LLM Service: [{len(results)}/{len(video_paths)}] '{result['video_id']}' {status} "
+                          f"after {time.perf_counter() - start:.1f}s.")
+        finally:
+            self._release_files()
+        return results
+
+
+def batch_clip_analysis(
+        videos_dir_relative_to_root: str = "data/raw/clips/",
+        contexts_dir_relative_to_root: str = "data/raw/context/",
+        output_json_dir_relative_to_root: str = "data/raw/clip_context/",
+        max_uploads: int = 2,
+        max_processing: int = 8,
+        max_generations: int = 4,
+        max_preprocessing: int = 2,
+        registry_path_relative_to_root: str = "data/processed/clip_registry.jsonl",
+        store_path_relative_to_root: str = "data/processed/clip_analyses.jsonl",
+        keep_uploaded_files: bool = False,
+        preprocess: bool = True,
+        proxy_settings: ProxySettings = None,
+    ) -> list[dict]:
+    """
+    Analyzes every clip of the clips directory concurrently. Results are appended to
+    'batch_clip_context.jsonl' of the output directory as they complete. Clips already
+    analyzed with the same context and prompt version are served from the clip registry;
+    new analyses are also appended to the clip analysis store. With preprocess (and ffmpeg installed), smaller proxies of the clips are uploaded.
+    """
+    if not _ensure_api_key_is_configured():
+        print("LLM Service Error: API Key not configured for LLM Service. Batch clip analysis skipped.")
+        return []
+    _ensure_directory_exists(output_json_dir_relative_to_root)
+
+    video_paths = _discover_clips(videos_dir_relative_to_root)
+    print(f"LLM Service: Batch analysis of {len(video_paths)} clips.")
+    analyzer = ClipBatchAnalyzer(
+        results_path=_resolve_path(output_json_dir_relative_to_root, "batch_clip_context.jsonl"),
+        contexts_dir_relative=contexts_dir_relative_to_root,
+        max_uploads=max_uploads, max_processing=max_processing, max_generations=max_generations,
+        max_preprocessing=max_preprocessing,
+        registry=ClipRegistry(_resolve_path(registry_path_relative_to_root)), keep_uploaded_files=keep_uploaded_files,
+        preprocessor=ClipPreprocessor(_resolve_path("data/processed/clip_proxies"), proxy_settings) if preprocess else None,
+        store=ClipAnalysisStore(_resolve_path(store_path_relative_to_root)),
+    )
+    results = analyzer.run(video_paths)
+    if analyzer.proxy_results:
+        bytes_saved = sum(proxy.bytes_saved for proxy in analyzer.proxy_results.values())
+        tokens_saved = sum(proxy.tokens_saved or 0 for proxy in analyzer.proxy_results.values())
+        print(f"LLM Service: Pre-processing saved {bytes_saved} upload bytes and ~{tokens_saved} video tokens "
+              f"over {len(analyzer.proxy_results)} clips.")
+    print(f"\nLLM Service: Batch clip analysis finished ({sum('error' not in r for r in results)}/{len(results)} succeeded).")
+    return results
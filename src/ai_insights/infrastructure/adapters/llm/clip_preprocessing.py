@@ -0,0 +1,185 @@
+"""Module implementing the local pre-processing of clips before their upload.
+
+Gemini bills video by duration: about 258 tokens per sampled frame (1 frame
+per second) plus 32 tokens per second of audio. Resolution and frame rate
+beyond that only cost upload bandwidth and processing wait. ClipPreprocessor
+uses ffmpeg to make a proxy of each clip:
+
+- trimmed to a window of the clip (start_seconds, max_duration_seconds),
+- downscaled to max_height and reduced to `fps` frames per second,
+- without audio unless keep_audio,
+- or, with keyframes_only, made of the scene-change frames only.
+
+Proxies are cached by the hash of the source clip and the settings, so a
+clip is converted once. ffmpeg is optional: without it (or if a conversion
+fails) the source clip is uploaded as before.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+from src.ai_insights.infrastructure.adapters.llm.clip_registry import file_sha256
+
+# Gemini video tokenization (default media resolution)
+TOKENS_PER_FRAME = 258
+AUDIO_TOKENS_PER_SECOND = 32
+# Frames per second sampled by Gemini from an uploaded video
+GEMINI_SAMPLED_FPS = 1.0
+
+
+def estimate_video_tokens(duration_seconds: float, fps: float = GEMINI_SAMPLED_FPS, has_audio: bool = True) -> int:
+    """Tokens billed for a video: the frames Gemini samples (at most 1 per second) and the audio."""
+    frames = duration_seconds * min(fps, GEMINI_SAMPLED_FPS)
+    return int(round(frames * TOKENS_PER_FRAME + (duration_seconds * AUDIO_TOKENS_PER_SECOND if has_audio else 0)))
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def probe_video(path: str) -> dict:
+    """Duration, frame rate and audio presence of a video, read with ffprobe."""
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration:stream=codec_type,avg_frame_rate",
+         "-of", "json", path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    info = json.loads(output)
+    streams = info.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), {})
+    numerator, _, denominator = video.get("avg_frame_rate", "0/1").partition("/")
+    fps = float(numerator) / float(denominator or 1) if float(denominator or 1) else 0.0
+    return {
+        "duration_seconds": float(info.get("format", {}).get("duration", 0.0)),
+        "fps": fps,
+        "has_audio": any(stream.get("codec_type") == "audio" for stream in streams),
+    }
+
+
+@dataclass(frozen=True)
+class ProxySettings:
+    start_seconds: float = 0.0
+    max_duration_seconds: Optional[float] = None
+    max_height: int = 480
+    fps: float = 1.0
+    keep_audio: bool = False
+    keyframes_only: bool = False
+    scene_threshold: float = 0.3
+    crf: int = 28
+
+    def tag(self) -> str:
+        """Short identifier of the settings, part of the proxy cache key."""
+        return hashlib.sha256(json.dumps(asdict(self), sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class ProxyResult:
+    source_path: str
+    proxy_path: str
+    source_bytes: int
+    proxy_bytes: int
+    source_tokens: Optional[int] = None
+    proxy_tokens: Optional[int] = None
+    cached: bool = False
+    # Tag of the settings the proxy was made with; None when the source clip is used as is
+    settings_tag: Optional[str] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.source_bytes - self.proxy_bytes
+
+    @property
+    def tokens_saved(self) -> Optional[int]:
+        if self.source_tokens is None or self.proxy_tokens is None:
+            return None
+        return self.source_tokens - self.proxy_tokens
+
+    def report(self) -> dict:
+        return {"source_bytes": self.source_bytes, "proxy_bytes": self.proxy_bytes, "bytes_saved": self.bytes_saved,
+                "source_tokens": self.source_tokens, "proxy_tokens": self.proxy_tokens,
+                "tokens_saved": self.tokens_saved, "cached": self.cached}
+
+
+def build_proxy_command(source_path: str, proxy_path: str, settings: ProxySettings) -> List[str]:
+    """ffmpeg command making the proxy of a clip."""
+    command = ["ffmpeg", "-y", "-v", "error"]
+    if settings.start_seconds:
+        command += ["-ss", str(settings.start_seconds)]
+    if settings.max_duration_seconds is not None:
+        command += ["-t", str(settings.max_duration_seconds)]
+    command += ["-i", source_path]
+
+    # never upscale: min(max_height, input height), width keeping the aspect ratio (even for x264)
+    scale = f"scale=-2:'min({settings.max_height},ih)'"
+    if settings.keyframes_only:
+        command += ["-vf", f"select='gt(scene,{settings.scene_threshold})',{scale}", "-fps_mode", "vfr"]
+    else:
+        command += ["-vf", f"fps={settings.fps},{scale}"]
+    command += ["-c:v", "libx264", "-preset", "veryfast", "-crf", str(settings.crf)]
+    command += ["-c:a", "aac", "-b:a", "64k"] if settings.keep_audio else ["-an"]
+    command += ["-movflags", "+faststart", proxy_path]
+    return command
+
+
+class ClipPreprocessor:
+    def __init__(self, cache_dir: str = "data/processed/clip_proxies", settings: ProxySettings = None):
+        """
+        Args:
+            cache_dir (str): Directory of the proxies, named after the source hash and settings.
+            settings (ProxySettings, optional): How the proxies are made.
+        """
+        self.cache_dir = cache_dir
+        self.settings = settings or ProxySettings()
+        self.enabled = ffmpeg_available()
+        if not self.enabled:
+            print("ClipPreprocessor: ffmpeg/ffprobe not found, clips are uploaded without pre-processing.")
+
+    def _video_tokens(self, path: str) -> Optional[int]:
+        try:
+            info = probe_video(path)
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            print(f"ClipPreprocessor: Could not probe '{path}': {e}")
+            return None
+        return estimate_video_tokens(info["duration_seconds"], info["fps"], info["has_audio"])
+
+    def proxy(self, source_path: str, content_hash: Optional[str] = None) -> ProxyResult:
+        """
+        Proxy of a clip, made on first use. Falls back to the source clip (a result without
+        settings_tag) if ffmpeg is missing or fails.
+        """
+        source_bytes = os.path.getsize(source_path)
+        unchanged = ProxyResult(source_path=source_path, proxy_path=source_path,
+                                source_bytes=source_bytes, proxy_bytes=source_bytes)
+        if not self.enabled:
+            return unchanged
+
+        content_hash = content_hash or file_sha256(source_path)
+        proxy_path = os.path.join(self.cache_dir, f"{content_hash[:16]}_{self.settings.tag()}.mp4")
+        cached = os.path.exists(proxy_path)
+        if not cached:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # written under a temporary name, so an interrupted conversion is never taken for a proxy
+            tmp_path = f"{proxy_path}.{threading.get_ident()}.tmp.mp4"
+            try:
+                subprocess.run(build_proxy_command(source_path, tmp_path, self.settings),
+                               check=True, capture_output=True)
+                os.replace(tmp_path, proxy_path)
+            except (OSError, subprocess.CalledProcessError) as e:
+                print(f"ClipPreprocessor: Could not make the proxy of '{source_path}', uploading it as is: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return unchanged
+
+        result = ProxyResult(source_path=source_path, proxy_path=proxy_path, source_bytes=source_bytes,
+                             proxy_bytes=os.path.getsize(proxy_path), source_tokens=self._video_tokens(source_path),
+                             proxy_tokens=self._video_tokens(proxy_path), cached=cached,
+                             settings_tag=self.settings.tag())
+        print(f"ClipPreprocessor: '{os.path.basename(source_path)}' proxy {'reused' if cached else 'made'}: "
+              f"{result.bytes_saved} bytes and {result.tokens_saved} tokens saved.")
+        return result
@@ -0,0 +1,165 @@
+"""Module implementing the registry of analyzed and uploaded clips.
+
+Clips are identified by the SHA-256 of their bytes, so renamed or duplicated
+files (e.g. the same video saved for two brawlers) are recognized. The
+registry keeps:
+
+- the analyses, keyed by clip hash + context text + prompt version: a clip
+  analyzed before with the same inputs is not uploaded nor analyzed again;
+- the Gemini file handles of uploaded clips, so a clip can be prompted again
+  (new context or prompt version) without a new upload while the handle is
+  alive (Gemini deletes uploaded files after 48 hours);
+- the hash of each file path with its size and mtime, so unchanged files are
+  not hashed again.
+
+The registry is a JSON lines file (data/processed/clip_registry.jsonl by
+default), not a JSON document: every change is appended as one line holding
+the updated entries, e.g. {"files": {"<hash>": {...}}}, a null value removing
+an entry, so a batch over many clips writes one line per clip instead of the
+whole registry each time. The file is rewritten as a single line when loaded
+with more superseded lines than live entries.
+
+Registries of earlier versions were saved whole as clip_registry.json, which
+reads as one such line: a missing .jsonl registry is migrated from the .json
+file next to it on load.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Uploaded files live 48h on Gemini; handles older than this are not reused
+DEFAULT_FILE_TTL_SECONDS = 46 * 3600
+DEFAULT_REGISTRY_PATH = "data/processed/clip_registry.jsonl"
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def analysis_key(content_hash: str, context_text: str, prompt_version: str) -> str:
+    """Key of an analysis: the same clip, context and prompt always give the same key."""
+    return hashlib.sha256("\n".join([content_hash, prompt_version, context_text]).encode("utf-8")).hexdigest()
+
+
+class ClipRegistry:
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH,
+                 file_ttl_seconds: float = DEFAULT_FILE_TTL_SECONDS):
+        """
+        Args:
+            path (str): JSON lines file of the registry, created on first change. If missing, a
+                .jsonl registry is migrated from the .json registry of the same name.
+            file_ttl_seconds (float): Age after which an uploaded file handle is considered expired.
+        """
+        self.path = path
+        self.file_ttl_seconds = file_ttl_seconds
+        self._lock = threading.RLock()
+        self.analyses: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.hashes: Dict[str, Dict[str, Any]] = {}
+        # A line cut by a crash (or a registry saved whole) has no newline to append after
+        self._needs_newline = False
+        legacy_path = f"{os.path.splitext(path)[0]}.json"
+        if os.path.exists(path):
+            if self._load(path):
+                self._compact()
+        elif path.endswith(".jsonl") and os.path.exists(legacy_path):
+            self._load(legacy_path)
+            self._compact()
+            os.remove(legacy_path)
+            print(f"ClipRegistry: Migrated '{legacy_path}' to '{path}'.")
+
+    def _tables(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return {"analyses": self.analyses, "files": self.files, "hashes": self.hashes}
+
+    def _load(self, path: str) -> bool:
+        """Applies the lines of a registry file. Returns whether more of them are superseded than live."""
+        tables = self._tables()
+        updates = 0
+        with open(path, "rb") as f:
+            data = f.read()
+        self._needs_newline = bool(data) and not data.endswith(b"\n")
+        for line in data.splitlines():
+            try:
+                changes = json.loads(line)
+            except ValueError:
+                print(f"LLM Service Warning: Skipping an unreadable line of '{path}'.")
+                continue
+            for table, entries in changes.items():
+                for key, entry in entries.items():
+                    updates += 1
+                    if entry is None:
+                        tables[table].pop(key, None)
+                    else:
+                        tables[table][key] = entry
+        return updates > 2 * sum(len(entries) for entries in tables.values())
+
+    def _compact(self) -> None:
+        """Rewrites the file atomically as one line holding the live entries."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._tables(), ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._needs_newline = False
+
+    def _append(self, table: str, key: str, entry: Optional[Dict[str, Any]]) -> None:
+        """Appends one change (None removes the entry). Called with the lock held."""
+        line = json.dumps({table: {key: entry}}, ensure_ascii=False) + "\n"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n" + line if self._needs_newline else line)
+        self._needs_newline = False
+
+    def content_hash(self, video_path: str) -> str:
+        """SHA-256 of a clip, computed again only if its size or modification time changed."""
+        abs_path = os.path.abspath(video_path)
+        stat = os.stat(abs_path)
+        with self._lock:
+            known = self.hashes.get(abs_path)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                return known["sha256"]
+        sha256 = file_sha256(abs_path)
+        with self._lock:
+            self.hashes[abs_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+            self._append("hashes", abs_path, self.hashes[abs_path])
+        return sha256
+
+    def get_analysis(self, content_hash: str, context_text: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.analyses.get(analysis_key(content_hash, context_text, prompt_version))
+
+    def put_analysis(self, content_hash: str, context_text: str, prompt_version: str, description: str,
+                     video_id: str) -> None:
+        key = analysis_key(content_hash, context_text, prompt_version)
+        with self._lock:
+            self.analyses[key] = {
+                "content_hash": content_hash, "prompt_version": prompt_version, "video_id": video_id,
+                "description": description, "analyzed_at": time.time(),
+            }
+            self._append("analyses", key, self.analyses[key])
+
+    def get_file(self, content_hash: str) -> Optional[str]:
+        """Name of the Gemini file of a clip if uploaded less than file_ttl_seconds ago."""
+        with self._lock:
+            entry = self.files.get(content_hash)
+        if entry is None or time.time() - entry["uploaded_at"] > self.file_ttl_seconds:
+            return None
+        return entry["name"]
+
+    def put_file(self, content_hash: str, file_name: str, uploaded_at: Optional[float] = None) -> None:
+        with self._lock:
+            self.files[content_hash] = {"name": file_name, "uploaded_at": uploaded_at or time.time()}
+            self._append("files", content_hash, self.files[content_hash])
+
+    def forget_file(self, content_hash: str) -> None:
+        with self._lock:
+            if self.files.pop(content_hash, None) is not None:
+                self._append("files", content_hash, None)
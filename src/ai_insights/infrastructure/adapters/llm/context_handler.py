@@ -10,14 +10,29 @@ import os
 import requests
 import json
 from dotenv import load_dotenv
+import threading
 from datetime import datetime, timezone
+from typing import Dict, List
 from urllib.parse import quote
 
+from src.ai_insights.infrastructure.adapters.llm.deadline import Deadline, DeadlineExceeded
 from src.ai_insights.infrastructure.adapters.llm.ssem_embedder import SSEMEmbedder
 from src.ai_insights.infrastructure.adapters.llm.rag import RAGRetriever
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER
 
 load_dotenv(override=True)
 
+# Timeout of a game API call when the request has no tighter deadline
+GAME_API_TIMEOUT_SECONDS = 10.0
+# Time left below which the RAG retrieval is skipped (the last retrieved meta items are reused if any)
+RAG_MIN_SECONDS = 2.0
+# Items retrieved for the game part of the query (shared by all players) and for the player part
+RAG_GAME_TOP_K = 50
+RAG_PLAYER_TOP_K = 50
+# Time left below which the creator profiles are left out of the context (shorter recommendations prompt)
+CREATOR_LOOKALIKE_MIN_SECONDS = 8.0
+
 
 """
 from src.ai_insights.infrastructure.adapters.llm.ssem_embedder import (
@@ -33,10 +48,37 @@ jsons_embeddings = embedder.generate_embeddings(list_of_jsons)
 """
 
 
-class ContextHandler:
+# Meta items of the last RAG retrieval of each game, reused when a request has no time for
+# retrieval. Only these are player-independent: the other items answer the query of a player.
+_LAST_META_ITEMS: Dict[str, List[dict]] = {}
+_LAST_META_ITEMS_LOCK = threading.Lock()
+
+
+def _rag_data_type(item_dict: dict, game_suffix: str) -> str:
+    if "role" in item_dict and "rarity" in item_dict: return "character_info"
+    if "dominantBrawlers" in item_dict or "gameVersion" in item_dict: return "meta_info"
+    if "platform" in item_dict and "styleFocus" in item_dict: return "creator_info"
+    if "summary" in item_dict and "topic" in item_dict: return f"community_{game_suffix}"
+    return "unknown"
+
+
+def _merge_rag_items(*retrievals: List[dict]) -> List[dict]:
+    """Items of several retrievals in order, without the ones retrieved twice."""
+    seen, merged = set(), []
+    for items in retrievals:
+        for item in items:
+            key = json.dumps(item, sort_keys=True, default=str)
+            if key not in seen:
+                seen.add(key)
+                merged.append(item)
+    return merged
 
-    def __init__(self, game=None, user_id=None, base_data_path: str = 'data', rag_enabled: bool = True):
+
+class ContextHandler:
+    def __init__(self, game=None, user_id=None, base_data_path: str = 'data', rag_enabled: bool = True,
+                 rag_retriever: RAGRetriever = None, deadline: Deadline = None):
         self.user_id = user_id
+        self.deadline = deadline or Deadline()
         
         abs_base_data_path = os.path.abspath(base_data_path)
         self.raw_data_path = os.path.join(abs_base_data_path, 'raw') # For legacy fallback
@@ -50,7 +92,13 @@ class ContextHandler:
         self.embedder = None
         self.rag_retriever = None
 
-        if self.rag_enabled:
+        if self.rag_enabled and rag_retriever is not None:
+            # Shared by several handlers (e.g. a batch job), the model and index are loaded once
+            self.rag_retriever = rag_retriever
+            self.embedder = rag_retriever.embedder
+            if self.rag_retriever.index is None or self.rag_retriever.index.ntotal == 0:
+                self.rag_enabled = False
+        elif self.rag_enabled:
             print(f"ContextHandler: RAG Mode Enabled for game '{self.game_suffix}'. Initializing...")
             try:
                 # Assuming SSEMEmbedder uses 'all-MiniLM-L6-v2' by default or takes model name
@@ -79,14 +127,27 @@ class ContextHandler:
             "User-Agent": "ColabBrawlClient/1.0",
         }
 
-        player_data = requests.get(
-            api + f"/v1/players/{self.user_id}", headers=headers, params=params
-        )
-        battlelog = requests.get(
-            api + f"/v1/players/{self.user_id}/battlelog",
-            headers=headers,
-            params=params,
-        )
+        try:
+            self.deadline.check("player_api")
+            with METRICS.timer("brawlstars_api_request_seconds", endpoint="player"):
+                player_data = requests.get(
+                    api + f"/v1/players/{self.user_id}", headers=headers, params=params,
+                    timeout=self.deadline.timeout(cap=GAME_API_TIMEOUT_SECONDS),
+                )
+            self.deadline.check("player_api")
+            with METRICS.timer("brawlstars_api_request_seconds", endpoint="battlelog"):
+                battlelog = requests.get(
+                    api + f"/v1/players/{self.user_id}/battlelog",
+                    headers=headers,
+                    params=params,
+                    timeout=self.deadline.timeout(cap=GAME_API_TIMEOUT_SECONDS),
+                )
+        except requests.Timeout as e:
+            if self.deadline.expired():
+                raise DeadlineExceeded("player_api") from e
+            raise
+        for endpoint, response in (("player", player_data), ("battlelog", battlelog)):
+            METRICS.counter("brawlstars_api_requests_total", endpoint=endpoint, status=response.status_code).inc()
 
         player_data.raise_for_status()
         battlelog.raise_for_status()
@@ -170,14 +231,31 @@ class ContextHandler:
 
 
 
+    def fetch_player_data(self) -> tuple:
+        """Fetches the player profile and battlelog from the game API."""
+        with TRACER.span("ContextHandler.fetch_player_data", game=self.game_suffix):
+            if self.game_suffix == "brawl": # Assuming self.game_suffix is 'brawl' or 'royale'
+                return self._brawlstars_get()
+            return None, None
+
     def context_for_llm(self, task_types: list) -> dict:
-        if self.game_suffix == "brawl": # Assuming self.game_suffix is 'brawl' or 'royale'
-            profile_api_data, battlelog_api_data = self._brawlstars_get()
-        
-        if not profile_api_data:
-            print(f"Critical: Could not fetch player profile for {self.user_id}. Aborting.")
-            return {}
+        with TRACER.span("ContextHandler.context_for_llm", user_id=self.user_id):
+            profile_api_data, battlelog_api_data = self.fetch_player_data()
+
+            if not profile_api_data:
+                print(f"Critical: Could not fetch player profile for {self.user_id}. Aborting.")
+                return {}
+
+            return self.build_llm_context(profile_api_data, battlelog_api_data, task_types)
 
+    def build_llm_context(self, profile_api_data: dict, battlelog_api_data: dict, task_types: list) -> dict:
+        """Builds the LLM context (RAG retrieval included) from already fetched player data."""
+        with TRACER.span("ContextHandler.build_llm_context", rag_enabled=self.rag_enabled) as span:
+            context = self._build_llm_context(profile_api_data, battlelog_api_data, task_types)
+            span.set_attribute("rag_active", context['community_data']['meta']['rag_active'])
+            return context
+
+    def _build_llm_context(self, profile_api_data: dict, battlelog_api_data: dict, task_types: list) -> dict:
         player_api_tag = profile_api_data.get("tag", "") # Usually includes '#'
         player_context_live = {
             "username": profile_api_data.get("name", "N/A"),
@@ -198,26 +276,45 @@ class ContextHandler:
         retrieved_meta_for_prompt = {}
         retrieved_creators_for_prompt = []
         rag_actually_used = False
-
-        if self.rag_enabled and self.rag_retriever:
-            query_parts = [
+        rag_skipped = False
+
+        if "creator_lookalike" in task_types and not self.deadline.allows(CREATOR_LOOKALIKE_MIN_SECONDS):
+            self.deadline.record_skip("creator_lookalike", "insufficient_time")
+            task_types = [task for task in task_types if task != "creator_lookalike"]
+
+        retrieved_items_from_rag = []
+        if self.rag_enabled and self.rag_retriever and not self.deadline.allows(RAG_MIN_SECONDS):
+            rag_skipped = True
+            with _LAST_META_ITEMS_LOCK:
+                retrieved_items_from_rag = list(_LAST_META_ITEMS.get(self.game_suffix, []))
+            # 'cached_meta': the meta items of the last retrieval for this game replace a fresh one
+            self.deadline.record_skip("rag", "cached_meta" if retrieved_items_from_rag else "insufficient_time")
+        elif self.rag_enabled and self.rag_retriever:
+            # The game part of the query is the same for every player, so it is retrieved on its own
+            # and a shared retriever (e.g. MemoizedRetriever in a batch) reuses it between players
+            game_query = f"Requested insights: {', '.join(sorted(task_types))} for game {self.game_suffix}."
+            player_query = " ".join([
                 f"Player: {player_context_live['username']}, Trophies: {player_context_live['trophies']}.",
                 f"Primary Brawlers: {', '.join(b['name'] for b in player_context_live['primaryBrawlers'])}.",
-                f"Requested insights: {', '.join(task_types)} for game {self.game_suffix}."
-            ]
-            rag_query = " ".join(query_parts)
-            
+                f"Game: {self.game_suffix}."
+            ])
+
             # Retrieve more items initially, then filter/categorize
             # The items returned by retrieve are the original_content dicts from metadata
-            retrieved_items_from_rag = self.rag_retriever.retrieve(rag_query, top_k=100) 
-            rag_actually_used = bool(retrieved_items_from_rag) 
+            retrieved_items_from_rag = _merge_rag_items(
+                self.rag_retriever.retrieve(game_query, top_k=RAG_GAME_TOP_K),
+                self.rag_retriever.retrieve(player_query, top_k=RAG_PLAYER_TOP_K))
+            meta_items = [item for item in retrieved_items_from_rag
+                          if _rag_data_type(item, self.game_suffix) == "meta_info"]
+            if meta_items:
+                with _LAST_META_ITEMS_LOCK:
+                    _LAST_META_ITEMS[self.game_suffix] = meta_items
+
+        if retrieved_items_from_rag:
+            rag_actually_used = True
 
             for item_dict in retrieved_items_from_rag:
-                data_type = "unknown" # Default
-                if "role" in item_dict and "rarity" in item_dict: data_type = "character_info"
-                elif "dominantBrawlers" in item_dict or "gameVersion" in item_dict: data_type = "meta_info"
-                elif "platform" in item_dict and "styleFocus" in item_dict: data_type = "creator_info"
-                elif "summary" in item_dict and "topic" in item_dict: data_type = f"community_{self.game_suffix}"
+                data_type = _rag_data_type(item_dict, self.game_suffix)
                 
                 if data_type.startswith("community"): retrieved_community_for_prompt.append(item_dict)
                 elif data_type == "character_info": retrieved_characters_for_prompt.append(item_dict)
@@ -227,8 +324,8 @@ class ContextHandler:
             print(f"ContextHandler RAG: Community({len(retrieved_community_for_prompt)}), Chars({len(retrieved_characters_for_prompt)}), Meta({1 if retrieved_meta_for_prompt else 0}), Creators({len(retrieved_creators_for_prompt)})")
 
 
-        # Fallback logic if RAG didn't fetch enough or is disabled
-        if not rag_actually_used:
+        # Fallback logic if RAG didn't fetch enough or is disabled (not when skipped: loading everything is slower)
+        if not rag_actually_used and not rag_skipped:
             if rag_actually_used: print("ContextHandler: RAG results were sparse, augmenting with legacy data.")
             else: print("ContextHandler: RAG disabled or failed, using legacy data loading.")
             
@@ -253,7 +350,8 @@ class ContextHandler:
 
         final_llm_context = {
             "meta": {"timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-                     "targetPlayerId": self.user_id, "game": self.game_suffix, "rag_active": rag_actually_used},
+                     "targetPlayerId": self.user_id, "game": self.game_suffix, "rag_active": rag_actually_used,
+                     "rag_cached": rag_skipped and rag_actually_used},
             "playerContext": player_context_live,
             "gameContext": {
                 "currentMetaSummary": final_meta_data.get("summary", "N/A"),
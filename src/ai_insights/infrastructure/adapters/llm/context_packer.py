@@ -0,0 +1,114 @@
+"""Module implementing token-budgeted context assembly for LLM prompts.
+
+The prompts sent to the LLM are built from several context sources (player
+profile, battlelog, RAG items). This module ranks those pieces by relevance
+and greedily fills a per-task token budget, so prompt size stays bounded and
+measurable.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+# Rough chars-per-token ratio for Gemini/SentencePiece style tokenizers on
+# mixed English/JSON text. Good enough for budgeting; the exact count billed
+# is reported back by LLMConnector.last_prompt_token_count.
+CHARS_PER_TOKEN = 4
+
+DEFAULT_TOKEN_BUDGETS = {
+    "player_description": 1500,
+    "performance_summary": 2500,
+    "recommendations": 3000,
+    "fused_insights": 6000,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text without calling the LLM API.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Approximate number of tokens in the text
+    """
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass
+class ContextItem:
+    """A single piece of context that can be included in a prompt.
+
+    Attributes:
+        section: Name of the prompt section the item belongs to
+        text: Serialized content of the item
+        relevance: Ranking score, higher values are included first
+        required: If True the item is always included, even over budget
+    """
+
+    section: str
+    text: str
+    relevance: float = 0.0
+    required: bool = False
+    position: int = 0
+
+
+@dataclass
+class PackedContext:
+    """Result of packing context items into a token budget."""
+
+    items: List[ContextItem] = field(default_factory=list)
+    dropped: List[ContextItem] = field(default_factory=list)
+    tokens_used: int = 0
+    budget: int = 0
+
+    def section_text(self, section: str, separator: str = "\n") -> str:
+        """Join the text of the included items of a section, in original order."""
+        return separator.join(item.text for item in self.items if item.section == section)
+
+
+class ContextPacker:
+    """Greedy packer that fills a token budget with the most relevant items."""
+
+    def __init__(self, token_counter: Optional[Callable[[str], int]] = None):
+        """Initialize the packer.
+
+        Args:
+            token_counter: Callable returning the number of tokens of a text.
+                Defaults to estimate_tokens.
+        """
+        self.token_counter = token_counter or estimate_tokens
+
+    def pack(self, items: List[ContextItem], budget: int) -> PackedContext:
+        """Select the items that fit in the budget, most relevant first.
+
+        Required items are always kept. The remaining items are visited by
+        descending relevance and added while they fit; an item that does not
+        fit is skipped so that smaller, less relevant items can still use the
+        remaining space.
+
+        Args:
+            items: Candidate context items
+            budget: Maximum number of tokens for all the included items
+
+        Returns:
+            PackedContext with the included items in their original order
+        """
+        for position, item in enumerate(items):
+            item.position = position
+
+        packed = PackedContext(budget=budget)
+        ranked = sorted(items, key=lambda item: (not item.required, -item.relevance, item.position))
+        for item in ranked:
+            # separators between items count roughly as one token each
+            cost = self.token_counter(item.text) + 1
+            if item.required or packed.tokens_used + cost <= budget:
+                packed.items.append(item)
+                packed.tokens_used += cost
+            else:
+                packed.dropped.append(item)
+
+        packed.items.sort(key=lambda item: item.position)
+        return packed
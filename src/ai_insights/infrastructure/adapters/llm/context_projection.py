@@ -0,0 +1,124 @@
+"""Module implementing compact projections of Brawl Stars API data for prompts.
+
+The raw API payloads contain icon ids, full gadget/gear lists and the whole
+roster of every battle. The projections in this module keep only the fields
+each prompt type needs and serialize them as compact, key-sorted JSON lines,
+so the same input always produces the same (and much smaller) prompt text.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+PROFILE_FIELDS = [
+    "tag",
+    "name",
+    "trophies",
+    "highestTrophies",
+    "expLevel",
+    "3vs3Victories",
+    "soloVictories",
+    "duoVictories",
+]
+
+# Fields kept for each brawler, per prompt type
+BRAWLER_FIELDS = {
+    "player_description": ["name", "power", "rank", "trophies", "highestTrophies"],
+    "recommendations": ["name", "power", "trophies", "gadgets", "starPowers", "gears"],
+}
+
+
+def to_compact_json(data: Any) -> str:
+    """Serialize data as dense, stable JSON (no whitespace, sorted keys)."""
+    return json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _names(items: Optional[List[Dict[str, Any]]]) -> List[str]:
+    return [item.get("name") for item in items or []]
+
+
+def project_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the profile header fields relevant for the LLM (no icon, no brawlers)."""
+    projected = {field: profile[field] for field in PROFILE_FIELDS if field in profile}
+    club_name = (profile.get("club") or {}).get("name")
+    if club_name:
+        projected["club"] = club_name
+    return projected
+
+
+def project_brawler(brawler: Dict[str, Any], prompt_type: str = "player_description") -> Dict[str, Any]:
+    """Keep the brawler fields needed by the prompt type; item lists become name lists."""
+    projected = {}
+    for field in BRAWLER_FIELDS.get(prompt_type, BRAWLER_FIELDS["player_description"]):
+        if field not in brawler:
+            continue
+        value = brawler[field]
+        if field in ("gadgets", "starPowers", "gears"):
+            value = _names(value)
+            if not value:
+                continue
+        projected[field] = value
+    return projected
+
+
+def _player_brawler(player: Dict[str, Any]) -> Optional[str]:
+    return (player.get("brawler") or {}).get("name")
+
+
+def project_battle(battle_event: Dict[str, Any], player_tag: Optional[str] = None) -> Dict[str, Any]:
+    """Project a battlelog entry to its outcome and the brawlers involved.
+
+    Player names, tags and the -1 power/trophy placeholders are dropped. When
+    the player tag is known, the rosters are split into the player's own
+    brawler, teammates and opponents instead of repeating every team.
+
+    Args:
+        battle_event: Item of the battlelog 'items' list
+        player_tag: Tag of the player the battlelog belongs to
+
+    Returns:
+        Dictionary with the fields relevant for a performance summary
+    """
+    battle = battle_event.get("battle", {})
+    event = battle_event.get("event", {})
+    projected = {
+        "time": battle_event.get("battleTime"),
+        "mode": battle.get("mode", event.get("mode")),
+        "map": event.get("map"),
+    }
+    for field in ("type", "result", "rank", "trophyChange", "duration"):
+        if field in battle:
+            projected[field] = battle[field]
+
+    star_player = battle.get("starPlayer") or {}
+    if star_player and player_tag:
+        projected["starPlayer"] = star_player.get("tag") == player_tag
+
+    if battle.get("teams"):
+        teams = battle["teams"]
+        own_team = next((team for team in teams if any(p.get("tag") == player_tag for p in team)), None)
+        if own_team is not None:
+            projected["brawler"] = next(_player_brawler(p) for p in own_team if p.get("tag") == player_tag)
+            projected["allies"] = [_player_brawler(p) for p in own_team if p.get("tag") != player_tag]
+            projected["enemies"] = [[_player_brawler(p) for p in team] for team in teams if team is not own_team]
+        else:
+            projected["teams"] = [[_player_brawler(p) for p in team] for team in teams]
+    elif battle.get("players"):
+        players = battle["players"]
+        own = next((p for p in players if p.get("tag") == player_tag), None)
+        if own is not None:
+            projected["brawler"] = _player_brawler(own)
+        projected["enemies"] = [_player_brawler(p) for p in players if p is not own]
+
+    return {key: value for key, value in projected.items() if value is not None}
+
+
+def serialize_profile(profile: Dict[str, Any], prompt_type: str = "player_description") -> List[str]:
+    """Encode a profile as JSON lines: the header first, then one line per brawler."""
+    lines = [to_compact_json(project_profile(profile))]
+    lines += [to_compact_json(project_brawler(b, prompt_type)) for b in profile.get("brawlers", [])]
+    return lines
+
+
+def serialize_battlelog(battle_logs: Dict[str, Any], player_tag: Optional[str] = None) -> List[str]:
+    """Encode a battlelog as JSON lines, one line per battle (most recent first)."""
+    return [to_compact_json(project_battle(item, player_tag)) for item in battle_logs.get("items", [])]
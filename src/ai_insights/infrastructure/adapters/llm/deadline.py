@@ -0,0 +1,92 @@
+"""Module implementing the time budget of a request.
+
+A Deadline is created when a request arrives (web/app.py) and handed to every
+component working on it (ApiService, ContextHandler, LLMConnector). Blocking
+calls use the remaining time as their timeout, and optional work checks it
+before starting: when it does not fit, the work is skipped (or degraded) and
+recorded, so the response can say what is missing instead of blowing the SLO.
+
+    deadline = Deadline(budget_seconds=20)
+    if not deadline.allows(4.0):
+        deadline.record_skip("performance_summary", "insufficient_time")
+    requests.get(url, timeout=deadline.timeout(cap=10))
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import current_span
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage cannot finish within the time budget of the request."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during '{stage}'")
+        self.stage = stage
+
+
+class Deadline:
+    """Time budget of one request, shared by the threads working on it."""
+
+    def __init__(self, budget_seconds: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            budget_seconds (float, optional): Time allowed from now. None means no deadline.
+            clock (callable): Monotonic clock in seconds, replaceable in tests.
+        """
+        self.budget_seconds = budget_seconds
+        self._clock = clock
+        self.expires_at = None if budget_seconds is None else clock() + budget_seconds
+        self._skipped: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Seconds left, infinite without deadline and never negative."""
+        if self.expires_at is None:
+            return math.inf
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """Whether work expected to take `seconds` still fits in the budget."""
+        return self.remaining() >= seconds
+
+    def check(self, stage: str) -> None:
+        """Raises DeadlineExceeded if no time is left for the stage."""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """
+        Timeout for a blocking call: the remaining time, at most `cap`.
+        None only when there is neither deadline nor cap.
+        """
+        remaining = self.remaining()
+        if cap is not None:
+            remaining = min(remaining, cap)
+        if math.isinf(remaining):
+            return None
+        # a zero timeout means "no timeout" for some clients
+        return max(remaining, 0.001)
+
+    def record_skip(self, stage: str, reason: str) -> None:
+        """Records a stage skipped or degraded to stay within the budget."""
+        with self._lock:
+            self._skipped[stage] = reason
+        print(f"Deadline: Skipped '{stage}' ({reason}, {self.remaining():.2f}s left).")
+        METRICS.counter("pipeline_stages_skipped_total", stage=stage, reason=reason).inc()
+        span = current_span()
+        if span is not None:
+            span.set_attribute("skipped", reason)
+
+    @property
+    def skipped_stages(self) -> Dict[str, str]:
+        """Reason of every skipped stage, keyed by stage name."""
+        with self._lock:
+            return dict(self._skipped)
@@ -0,0 +1,144 @@
+"""Module implementing hedged requests, against the latency tail of LLM calls.
+
+A hedged call starts the request and, if it has not answered after a high
+percentile of the recent latencies (p95 by default), sends a duplicate. The
+first answer wins; the other call is cancelled if it has not started and
+otherwise left to finish in the background, its result discarded.
+
+Duplicates cost tokens, so they are capped by a budget: every call earns
+`max_extra_ratio` of a hedge (at most `burst` saved up) and every hedge
+spends one, so hedges stay under that fraction of the calls even when the
+provider is slow for everyone (where hedging would only double the load).
+
+One RequestHedger is shared by all the connectors of a process, so the
+latency window and the budget cover all the requests. Its threads run the
+hedged calls of all of them, so it is sized from their concurrency: calls
+beyond `max_concurrency` wait for a thread, and so for the others.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+T = TypeVar("T")
+
+
+class RequestHedger:
+    def __init__(self, percentile: float = 95.0, window: int = 200, min_samples: int = 20,
+                 min_delay_seconds: float = 0.05, max_extra_ratio: float = 0.05, burst: float = 5.0,
+                 max_concurrency: int = 16):
+        """
+        Args:
+            percentile (float): Percentile of the recent latencies after which a duplicate is sent.
+            window (int): Number of recent latencies considered.
+            min_samples (int): Latencies needed before hedging starts.
+            min_delay_seconds (float): Lower bound of the hedging delay.
+            max_extra_ratio (float): Max hedges per call, e.g. 0.05 for at most 5% extra calls.
+            burst (float): Hedges that can be sent in a row when the budget is full.
+            max_concurrency (int): LLM calls made through the hedger at the same time, i.e. the
+                concurrency of the connectors sharing it. Each call gets a thread for its first
+                attempt and one for its duplicate.
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.max_extra_ratio = max_extra_ratio
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._latencies = deque(maxlen=window)
+        self._budget = burst
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * max_concurrency, thread_name_prefix="hedger")
+
+    def observe(self, seconds: float) -> None:
+        """Records the latency of one call (not hedged as a whole: each attempt on its own)."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Time to wait for an answer before sending a duplicate, None until enough latencies are known."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        rank = min(len(latencies) - 1, max(0, math.ceil(self.percentile / 100 * len(latencies)) - 1))
+        return max(self.min_delay_seconds, latencies[rank])
+
+    def _earn_budget(self) -> None:
+        with self._lock:
+            self._budget = min(self.burst, self._budget + self.max_extra_ratio)
+
+    def _spend_budget(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            return True
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        # failed attempts are observed too: a slow error is part of the latency tail
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def _submit(self, fn: Callable[[], T]):
+        # the copied context keeps the trace span of the caller
+        return self._executor.submit(contextvars.copy_context().run, self._timed, fn)
+
+    def call(self, fn: Callable[[], T], on_discarded: Callable[[T], None] = None,
+             labels: Dict[str, str] = None) -> T:
+        """
+        Runs fn, hedged with a duplicate call when it is slow and the budget allows it.
+
+        Args:
+            fn (callable): The call, safe to run twice concurrently.
+            on_discarded (callable, optional): Receives the result of the losing call if it
+                completes anyway (e.g. to account for its tokens).
+            labels (dict, optional): Labels of the hedging metrics.
+
+        Returns:
+            The result of the first call to succeed. If both fail, the error of the first call.
+        """
+        labels = labels or {}
+        self._earn_budget()
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed(fn)
+
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        if not self._spend_budget():
+            METRICS.counter("llm_hedges_over_budget_total", **labels).inc()
+            return primary.result()
+
+        METRICS.counter("llm_hedged_requests_total", **labels).inc()
+        METRICS.histogram("llm_hedge_delay_seconds", **labels).observe(delay)
+        hedge = self._submit(fn)
+        attempts = {primary: "primary", hedge: "hedge"}
+        done, _ = wait(attempts, return_when=FIRST_COMPLETED)
+        winner = next((future for future in done if future.exception() is None), None)
+        if winner is None:
+            # a failed attempt does not fail the request while the other may still answer
+            wait(attempts)
+            winner = next((future for future in attempts if future.exception() is None), None)
+            if winner is None:
+                raise primary.exception()
+        loser = hedge if winner is primary else primary
+
+        METRICS.counter("llm_hedge_wins_total", winner=attempts[winner], **labels).inc()
+        if not loser.cancel() and on_discarded is not None:
+            def discard(future):
+                if future.exception() is None:
+                    on_discarded(future.result())
+            loser.add_done_callback(discard)
+        return winner.result()
@@ -0,0 +1,162 @@
+"""Module implementing the in-process job queue of on-demand insight generation.
+
+The web app submits a job per player tag and answers at once with its id;
+a bounded worker pool runs the pipeline and clients poll the job for its
+status and result. A tag already queued or running is not submitted again:
+the new request gets the job in flight, so many requests for a popular
+player cost one computation.
+
+    jobs = InsightsJobQueue(generate_insights, max_workers=4)
+    job, coalesced = jobs.submit("#9JVU8RC")
+    jobs.get(job.id).to_dict()   # {'id', 'tag', 'status': 'queued'|'running'|'done'|'failed', ...}
+
+A job can also publish events while it runs (publish_event, e.g. every
+section as the LLM generates it), which clients follow with events_after
+instead of waiting for the whole result.
+
+Finished jobs are kept ttl_seconds for polling, then forgotten.
+"""
+
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.ai_insights.infrastructure.adapters.database.insights_store import normalize_tag
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Job run by the current worker, the one publish_event adds to
+_CURRENT_JOB = contextvars.ContextVar("insights_job", default=None)
+
+
+@dataclass
+class InsightsJob:
+    id: str
+    tag: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    _finished: threading.Event = field(default_factory=threading.Event, repr=False)
+    _changed: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job is finished or the timeout expires. Returns whether it finished."""
+        return self._finished.wait(timeout)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def events_after(self, index: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Events published after the first `index` ones, waiting up to timeout for one unless the
+        job is finished. An empty list with the job finished means there are no more events.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > index or self.finished, timeout)
+            return self.events[index:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "tag": self.tag, "status": self.status, "created_at": self.created_at,
+                "started_at": self.started_at, "finished_at": self.finished_at,
+                "result": self.result, "error": self.error}
+
+
+class InsightsJobQueue:
+    def __init__(self, run_job: Callable[[str], Dict[str, Any]], max_workers: int = 4,
+                 ttl_seconds: float = 600):
+        """
+        Args:
+            run_job (callable): Computes the result of a normalized player tag (e.g. the insights
+                and the skipped stages). Exceptions mark the job as failed.
+            max_workers (int): Jobs running concurrently; the others wait in the queue.
+            ttl_seconds (float): Time finished jobs stay available to polling.
+        """
+        self.run_job = run_job
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, InsightsJob] = {}
+        self._in_flight: Dict[str, InsightsJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="insights-job")
+
+    def submit(self, tag: str) -> Tuple[InsightsJob, bool]:
+        """
+        Queues the insights of a player, unless a job for the same tag is already in flight.
+
+        Returns:
+            (job, coalesced): the job computing the tag, and whether it was already in flight.
+        """
+        tag = normalize_tag(tag)
+        with self._lock:
+            self._evict_expired()
+            job = self._in_flight.get(tag)
+            if job is not None:
+                METRICS.counter("insights_jobs_coalesced_total").inc()
+                return job, True
+            job = InsightsJob(id=uuid.uuid4().hex, tag=tag)
+            self._jobs[job.id] = job
+            self._in_flight[tag] = job
+        METRICS.counter("insights_jobs_submitted_total").inc()
+        # the copied context links the job spans to the trace of the submitting request
+        self._executor.submit(contextvars.copy_context().run, self._run, job)
+        return job, False
+
+    def get(self, job_id: str) -> Optional[InsightsJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: InsightsJob) -> None:
+        _CURRENT_JOB.set(job)
+        job.status, job.started_at = RUNNING, time.time()
+        METRICS.histogram("insights_job_queue_seconds").observe(job.started_at - job.created_at)
+        result, error = None, None
+        try:
+            with TRACER.span("InsightsJob", tag=job.tag, job_id=job.id), METRICS.timer("insights_job_seconds"):
+                result = self.run_job(job.tag)
+        except Exception as e:
+            print(f"InsightsJobQueue: Job {job.id} for {job.tag} failed: {e}")
+            error = str(e)
+            job.publish({"event": "error", "message": error})
+
+        job.finished_at, job.result, job.error = time.time(), result, error
+        with self._lock:
+            # a new submit for the tag starts a new job from now on
+            job.status = DONE if error is None else FAILED
+            self._in_flight.pop(job.tag, None)
+        METRICS.counter("insights_jobs_total", status=job.status).inc()
+        with job._changed:
+            job._changed.notify_all()
+        job._finished.set()
+
+    def _evict_expired(self) -> None:
+        """Forgets the jobs finished for longer than the ttl. Called with the lock held."""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and now - job.finished_at > self.ttl_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+def publish_event(event: Dict[str, Any]) -> None:
+    """Publishes an event of the job running in this context (its worker); ignored outside a job."""
+    job = _CURRENT_JOB.get()
+    if job is not None:
+        job.publish(event)
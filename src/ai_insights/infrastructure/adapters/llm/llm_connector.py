@@ -1,20 +1,71 @@
 import os
 import json
+import threading
+import time
+import httpx
 # from openai import OpenAI # Example\
 from google import genai
 from dotenv import load_dotenv
+
+from src.ai_insights.infrastructure.adapters.llm.deadline import DeadlineExceeded
+from src.ai_insights.infrastructure.adapters.llm.local_llm import LocalLLMClient
+from src.ai_insights.infrastructure.adapters.llm.prompt_generator import REPAIR_PROMPT
+from src.ai_insights.infrastructure.adapters.llm.response_cache import make_cache_key
+from src.ai_insights.infrastructure.adapters.llm.response_schemas import json_output_config
+from src.ai_insights.infrastructure.adapters.metrics_logging.histogram import Histogram
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS, TOKEN_BUCKETS
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER, current_span
 load_dotenv(override=True)
 
+# USD per million tokens (list prices)
+MODEL_PRICING = {
+    "gemini-2.0-flash": {"input_per_million": 0.10, "output_per_million": 0.40},
+    "gemini-1.5-flash": {"input_per_million": 0.075, "output_per_million": 0.30},
+}
+
+
+def estimate_llm_cost(model_name: str, prompt_tokens: int, output_tokens: int) -> float:
+    """Cost in USD of a call, 0 for models without known pricing (e.g. the local stand-in)."""
+    pricing = MODEL_PRICING.get(model_name)
+    if pricing is None:
+        return 0.0
+    return ((prompt_tokens or 0) * pricing["input_per_million"]
+            + (output_tokens or 0) * pricing["output_per_million"]) / 1_000_000
+
+
+class StructuredOutputError(ValueError):
+    """Raised when the LLM keeps answering with a response that does not match the expected schema."""
+
+
+def with_timeout(config: dict, timeout_seconds: float) -> dict:
+    """Copy of a generation config with the HTTP timeout of the request (in milliseconds for genai)."""
+    config = dict(config or {})
+    config["http_options"] = {**config.get("http_options", {}), "timeout": max(1, int(timeout_seconds * 1000))}
+    return config
+
+
 class LLMConnector:
-    def __init__(self, llm_provider="google", api_key=None, model_name=None):
+    def __init__(self, llm_provider="google", api_key=None, model_name=None, cache=None, local_config=None,
+                 deadline=None, hedger=None, client=None):
         """
         Manages connection, auth, and API calls to the LLM.
         Args:
-            llm_provider (str): 'openai', 'google', 'mock', etc.
+            llm_provider (str): 'google', or 'local' for the offline stand-in used in load tests.
             api_key (str, optional): API key. Defaults to env var.
             model_name (str, optional): Specific LLM model.
+            cache (ResponseCache, optional): Exact-match cache of responses. Disabled if None.
+            local_config (LocalLLMConfig, optional): Latency/error behaviour of the 'local' provider.
+            deadline (Deadline, optional): Time budget of the request. Calls time out when it runs out,
+                raising DeadlineExceeded. No timeout if None.
+            hedger (RequestHedger, optional): Sends a duplicate of the calls slower than the recent
+                latency percentile (not the streamed ones). No hedging if None.
+            client (optional): Client the requests are sent with, e.g. an AsyncConnectorClient sharing
+                rate limits between callers. By default, a client of the provider.
         """
         self.provider = llm_provider
+        self.cache = cache
+        self.deadline = deadline
+        self.hedger = hedger
         if not api_key:
             self.api_key = os.getenv("GEMINI_API_KEY")
         else:
@@ -24,26 +75,253 @@ class LLMConnector:
         else:
             self.model_name = "gemini-2.0-flash"
     
-        if llm_provider=='google':
+        if client is not None:
+            self.client = client
+        elif llm_provider=='google':
             self.client = genai.Client(api_key=self.api_key)
+        elif llm_provider=='local':
+            self.client = LocalLLMClient(local_config)
+        else:
+            raise ValueError(f"Unsupported LLM provider: '{llm_provider}'")
+        # Per-thread, so concurrent pipeline stages can share one connector
+        self._local = threading.local()
+
+    @property
+    def last_prompt_token_count(self):
+        """Prompt tokens billed for the last call of the current thread, as reported by the provider."""
+        return getattr(self._local, "prompt_token_count", None)
+
+    @property
+    def last_output_token_count(self):
+        """Output tokens billed for the last call of the current thread, as reported by the provider."""
+        return getattr(self._local, "output_token_count", None)
 
-    def get_llm_response(self, prompt_text: str) -> str:
+    def _record_usage(self, usage):
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if isinstance(prompt_tokens, int):
+            self._local.prompt_token_count = prompt_tokens
+        if isinstance(output_tokens, int):
+            self._local.output_token_count = output_tokens
+
+    def _count_call(self, cache_hit: bool) -> None:
+        """Adds the last call of the thread, with its billed tokens and cost, to the metrics."""
+        labels = {"provider": self.provider, "model": self.model_name}
+        METRICS.counter("llm_requests_total", cache="hit" if cache_hit else "miss", **labels).inc()
+        prompt_tokens, output_tokens = self.last_prompt_token_count, self.last_output_token_count
+        span = current_span()
+        if span is not None:
+            span.set_attribute("cache_hit", cache_hit)
+            span.set_attribute("prompt_tokens", prompt_tokens)
+            span.set_attribute("output_tokens", output_tokens)
+        if cache_hit:
+            return
+        if prompt_tokens is not None:
+            METRICS.counter("llm_prompt_tokens_total", **labels).inc(prompt_tokens)
+            METRICS.histogram("llm_prompt_tokens", buckets=TOKEN_BUCKETS, **labels).observe(prompt_tokens)
+        if output_tokens is not None:
+            METRICS.counter("llm_output_tokens_total", **labels).inc(output_tokens)
+        if self.provider != "local":
+            METRICS.counter("llm_cost_usd_total", **labels).inc(
+                estimate_llm_cost(self.model_name, prompt_tokens, output_tokens))
+
+    def _count_discarded(self, response) -> None:
+        """Adds the tokens and cost of the losing call of a hedge, billed although unused, to the metrics."""
+        labels = {"provider": self.provider, "model": self.model_name}
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else 0
+        output_tokens = output_tokens if isinstance(output_tokens, int) else 0
+        METRICS.counter("llm_hedge_discarded_tokens_total", **labels).inc(prompt_tokens + output_tokens)
+        if self.provider != "local":
+            METRICS.counter("llm_cost_usd_total", **labels).inc(
+                estimate_llm_cost(self.model_name, prompt_tokens, output_tokens))
+
+    def _latency_histogram(self, name: str) -> Histogram:
+        return METRICS.histogram(name, provider=self.provider, model=self.model_name)
+
+    def _request_config(self, config: dict) -> dict:
+        """The config sent to the model: with the remaining time of the deadline as HTTP timeout."""
+        if self.deadline is None:
+            return config
+        self.deadline.check("llm_request")
+        timeout = self.deadline.timeout()
+        return config if timeout is None else with_timeout(config, timeout)
+
+    def get_llm_response(self, prompt_text: str, config: dict = None, use_cache: bool = True) -> str:
         """
         Sends the prompt to the LLM and retrieves the raw response.
+        Identical requests are answered from the cache, if one is configured.
 
         Args:
             prompt_text (str): The prompt generated by PromptGenerator.
+            config (dict, optional): Generation config sent to the model.
+            use_cache (bool): Set to False to bypass the cache (the fresh response is still stored).
 
         Returns:
             str: The raw JSON string response from the LLM.
         """
+        with TRACER.span("LLMConnector.get_llm_response", provider=self.provider, model=self.model_name,
+                         prompt_chars=len(prompt_text)):
+            return self._get_llm_response(prompt_text, config, use_cache)
+
+    def _get_llm_response(self, prompt_text: str, config: dict, use_cache: bool) -> str:
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(self.provider, self.model_name, prompt_text, config)
+            if use_cache:
+                cached_response = self.cache.get(cache_key)
+                if cached_response is not None:
+                    print(f"\nLLM response served from cache ({self.provider}).")
+                    self._local.prompt_token_count = 0
+                    self._local.output_token_count = 0
+                    self._count_call(cache_hit=True)
+                    return cached_response
+
         print(f"\nSending prompt to LLM ({self.provider})...")
         # print("Prompt snippet:", prompt_text[:200] + "...") # For debugging
 
-        response = self.client.models.generate_content(
-            model=self.model_name, contents=prompt_text
-        )
+        request_config = self._request_config(config)
+
+        def generate():
+            return self.client.models.generate_content(
+                model=self.model_name, contents=prompt_text, config=request_config
+            )
+
+        start = time.perf_counter()
+        try:
+            if self.hedger is None:
+                response = generate()
+            else:
+                response = self.hedger.call(generate, on_discarded=self._count_discarded,
+                                            labels={"provider": self.provider, "model": self.model_name})
+        except httpx.TimeoutException as e:
+            METRICS.counter("llm_errors_total", provider=self.provider, model=self.model_name).inc()
+            if self.deadline is not None:
+                raise DeadlineExceeded("llm_request") from e
+            raise
+        except Exception:
+            METRICS.counter("llm_errors_total", provider=self.provider, model=self.model_name).inc()
+            raise
+        finally:
+            self._latency_histogram("llm_request_seconds").observe(time.perf_counter() - start)
+        self._local.prompt_token_count = None
+        self._local.output_token_count = None
+        self._record_usage(getattr(response, "usage_metadata", None))
+        self._count_call(cache_hit=False)
+
+        if cache_key is not None and response.text is not None:
+            self.cache.set(cache_key, response.text)
         return response.text
+
+    def get_structured_response(self, prompt_text: str, parser, schema: dict = None):
+        """
+        Sends the prompt asking for a JSON answer (constrained by the schema if given) and parses it.
+        An invalid answer is repaired as described in parse_structured_response.
+
+        Args:
+            prompt_text (str): The prompt generated by PromptGenerator.
+            parser (callable): Parses the response text, raising ValueError if it is invalid.
+            schema (dict, optional): Response schema, see response_schemas.
+
+        Returns:
+            The value returned by the parser.
+        """
+        response_text = self.get_llm_response(prompt_text, config=json_output_config(schema))
+        return self.parse_structured_response(prompt_text, response_text, parser, schema)
+
+    def parse_structured_response(self, prompt_text: str, response_text: str, parser, schema: dict = None):
+        """
+        Parses the response to a prompt. If it is invalid, the model is asked to fix that response
+        only (a short prompt instead of the whole context); if the fix is invalid too, the prompt
+        is sent again once, bypassing the cache.
+
+        Raises:
+            StructuredOutputError: If no valid response could be obtained.
+        """
+        config = json_output_config(schema)
+        try:
+            return parser(response_text)
+        except (ValueError, KeyError, TypeError) as e:
+            error = e
+
+        print(f"LLM Service: Invalid structured response ({error}). Asking the model to repair it...")
+        repaired_text = self.get_llm_response(REPAIR_PROMPT.format(error=error, response=response_text),
+                                              config=config, use_cache=False)
+        try:
+            parsed = parser(repaired_text)
+            if self.cache is not None:
+                # replace the invalid cached answer, so the next identical request gets the fixed one
+                self.cache.set(make_cache_key(self.provider, self.model_name, prompt_text, config), repaired_text)
+            return parsed
+        except (ValueError, KeyError, TypeError) as e:
+            error = e
+
+        print(f"LLM Service: Repair failed ({error}). Sending the prompt again...")
+        try:
+            return parser(self.get_llm_response(prompt_text, config=config, use_cache=False))
+        except (ValueError, KeyError, TypeError) as e:
+            raise StructuredOutputError(f"No valid structured response after repair and retry: {e}") from e
+
+    def stream_llm_response(self, prompt_text: str, config: dict = None, use_cache: bool = True):
+        """
+        Sends the prompt to the LLM and yields the response text as it is generated.
+        A cached response is yielded as a single chunk.
+
+        Args:
+            prompt_text (str): The prompt generated by PromptGenerator.
+            config (dict, optional): Generation config sent to the model.
+            use_cache (bool): Set to False to bypass the cache (the fresh response is still stored).
+
+        Yields:
+            str: Consecutive chunks of the response text.
+        """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = make_cache_key(self.provider, self.model_name, prompt_text, config)
+            if use_cache:
+                cached_response = self.cache.get(cache_key)
+                if cached_response is not None:
+                    self._local.prompt_token_count = 0
+                    self._local.output_token_count = 0
+                    self._count_call(cache_hit=True)
+                    yield cached_response
+                    return
+
+        print(f"\nStreaming prompt to LLM ({self.provider})...")
+        self._local.prompt_token_count = None
+        self._local.output_token_count = None
+        chunks = []
+        request_config = self._request_config(config)
+        start = time.perf_counter()
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=self.model_name, contents=prompt_text, config=request_config
+            ):
+                if self.deadline is not None:
+                    # the HTTP timeout bounds each read, not the whole stream
+                    self.deadline.check("llm_request")
+                self._record_usage(getattr(chunk, "usage_metadata", None))
+                if chunk.text:
+                    if not chunks:
+                        self._latency_histogram("llm_time_to_first_chunk_seconds").observe(time.perf_counter() - start)
+                    chunks.append(chunk.text)
+                    yield chunk.text
+        except httpx.TimeoutException as e:
+            METRICS.counter("llm_errors_total", provider=self.provider, model=self.model_name).inc()
+            if self.deadline is not None:
+                raise DeadlineExceeded("llm_request") from e
+            raise
+        except Exception:
+            METRICS.counter("llm_errors_total", provider=self.provider, model=self.model_name).inc()
+            raise
+        finally:
+            self._latency_histogram("llm_request_seconds").observe(time.perf_counter() - start)
+        self._count_call(cache_hit=False)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, "".join(chunks))
             
     
 # # Example Usage
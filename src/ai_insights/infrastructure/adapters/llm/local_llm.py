@@ -0,0 +1,234 @@
+"""Module implementing a deterministic local stand-in for the Gemini client.
+
+LocalLLMClient exposes the subset of the google.genai client used by the
+connectors (models.generate_content, models.generate_content_stream and
+aio.models.generate_content) and answers without any network access. The
+answers are schema-valid JSON for each prompt type of PromptGenerator, and
+the latency, streaming token rate and error rate are configurable, so the
+whole insights pipeline can be load tested on an isolated machine.
+
+Everything is derived from the prompt and a seed: the same prompt always
+gets the same answer, latency and injected errors.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+import httpx
+from google.genai import errors
+
+from src.ai_insights.infrastructure.adapters.llm.context_packer import estimate_tokens
+
+BRAWLERS_TO_IDS_PATH = "data/processed/brawlers_to_ids.json"
+FALLBACK_BRAWLERS = ["SHELLY", "COLT", "SPIKE", "LEON", "NITA", "HANK", "STU", "MORTIS", "CROW", "PIPER"]
+GAME_MODES = ["gemGrab", "brawlBall", "heist", "bounty", "knockout", "hotZone", "soloShowdown", "duoShowdown"]
+STREAM_CHUNK_TOKENS = 8
+# Prompts whose call count is remembered (least recently used forgotten first)
+MAX_TRACKED_PROMPTS = 10000
+
+
+@dataclass
+class LocalLLMConfig:
+    """Behaviour of the local stand-in.
+
+    Attributes:
+        latency_distribution: 'fixed', 'uniform' or 'lognormal' time to first token
+        latency_median_seconds: Median (or fixed value) of the time to first token
+        latency_sigma: Spread; uniform draws in median*(1 +- sigma), lognormal uses it as shape
+        tokens_per_second: Generation speed of the output tokens. None or 0 for instant output.
+        error_rate: Probability of a call failing with one of error_codes
+        error_codes: HTTP status codes of the injected errors (4xx raise ClientError, 5xx ServerError)
+        seed: Seed of every random draw
+    """
+
+    latency_distribution: str = "lognormal"
+    latency_median_seconds: float = 0.8
+    latency_sigma: float = 0.4
+    tokens_per_second: float = 150.0
+    error_rate: float = 0.0
+    error_codes: Tuple[int, ...] = (429, 503)
+    seed: int = 0
+
+
+def _load_brawler_names() -> List[str]:
+    if os.path.exists(BRAWLERS_TO_IDS_PATH):
+        with open(BRAWLERS_TO_IDS_PATH, "r", encoding="utf-8") as f:
+            return sorted(json.load(f))
+    return FALLBACK_BRAWLERS
+
+
+def _recommendations(rng: random.Random, brawlers: List[str]) -> List[dict]:
+    return [
+        {
+            "brawler_name": brawler,
+            "reasoning": f"{brawler.title()} fits the player's recent modes and counters the current meta picks.",
+            "suggested_game_modes": rng.sample(GAME_MODES, 2),
+            "concise_tip": f"Use {brawler.title()}'s Super to control the lane before pushing.",
+            "confidence_score": round(rng.uniform(0.6, 0.95), 2),
+        }
+        for brawler in rng.sample(brawlers, 3)
+    ]
+
+
+def build_local_response(prompt_text: str, rng: random.Random, brawlers: List[str]) -> str:
+    """Builds a JSON answer with the schema expected for the prompt type."""
+    description = {
+        "title": "The Local Stand-in",
+        "narrative": "A consistent player with a wide brawler pool. Plays objective modes with steady results.",
+    }
+    summary = {"summary": "Mixed recent results with a positive trophy trend.", "win_rate": round(rng.uniform(0.4, 0.7), 2)}
+
+    if "exactly three keys" in prompt_text:
+        payload = {
+            "player_description": description,
+            "performance_summary": summary,
+            "recommendations": _recommendations(rng, brawlers),
+        }
+    elif "Make 3 concise recommendations" in prompt_text:
+        payload = {"recommendations": _recommendations(rng, brawlers)}
+    elif "performance summary for the player" in prompt_text:
+        payload = {"performance summary": summary}
+    elif "Create player description" in prompt_text:
+        payload = {"player description": description}
+    else:
+        payload = {"response": "Local stand-in response."}
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def _timeout_seconds(config) -> Optional[float]:
+    """HTTP timeout of a generation config dict, in seconds (genai takes milliseconds)."""
+    if not isinstance(config, dict):
+        return None
+    timeout_ms = (config.get("http_options") or {}).get("timeout")
+    return None if timeout_ms is None else timeout_ms / 1000
+
+
+def _wait(delay: float, timeout: Optional[float]) -> None:
+    """Sleeps like a read taking `delay`, timing out like httpx when it exceeds the timeout."""
+    if timeout is not None and delay > timeout:
+        time.sleep(timeout)
+        raise httpx.ReadTimeout("LocalLLMClient: Simulated read timeout")
+    time.sleep(delay)
+
+
+class _LocalModels:
+    def __init__(self, client: "LocalLLMClient"):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        delays, text, prompt_tokens = self._client._plan(contents)
+        _wait(sum(delay for delay, _ in delays), _timeout_seconds(config))
+        return self._client._response(text, prompt_tokens)
+
+    def generate_content_stream(self, model, contents, config=None) -> Iterator:
+        delays, text, prompt_tokens = self._client._plan(contents)
+        generated = ""
+        for delay, chunk in delays:
+            _wait(delay, _timeout_seconds(config))
+            generated += chunk
+            # like Gemini, the usage of each chunk counts the output generated so far
+            yield self._client._response(chunk, prompt_tokens, estimate_tokens(generated))
+
+
+class _LocalAsyncModels:
+    def __init__(self, client: "LocalLLMClient"):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        delays, text, prompt_tokens = self._client._plan(contents)
+        delay, timeout = sum(delay for delay, _ in delays), _timeout_seconds(config)
+        if timeout is not None and delay > timeout:
+            await asyncio.sleep(timeout)
+            raise httpx.ReadTimeout("LocalLLMClient: Simulated read timeout")
+        await asyncio.sleep(delay)
+        return self._client._response(text, prompt_tokens)
+
+    async def generate_content_stream(self, model, contents, config=None) -> AsyncIterator:
+        # like genai, awaited for the stream, which is then iterated with async for
+        delays, text, prompt_tokens = self._client._plan(contents)
+        timeout = _timeout_seconds(config)
+
+        async def chunks():
+            generated = ""
+            for delay, chunk in delays:
+                if timeout is not None and delay > timeout:
+                    await asyncio.sleep(timeout)
+                    raise httpx.ReadTimeout("LocalLLMClient: Simulated read timeout")
+                await asyncio.sleep(delay)
+                generated += chunk
+                yield self._client._response(chunk, prompt_tokens, estimate_tokens(generated))
+        return chunks()
+
+
+class LocalLLMClient:
+    """Offline, deterministic replacement of genai.Client for benchmarks and load tests."""
+
+    def __init__(self, config: LocalLLMConfig = None, max_tracked_prompts: int = MAX_TRACKED_PROMPTS):
+        self.config = config or LocalLLMConfig()
+        self.max_tracked_prompts = max_tracked_prompts
+        self.models = _LocalModels(self)
+        self.aio = SimpleNamespace(models=_LocalAsyncModels(self))
+        self._brawlers = _load_brawler_names()
+        # Calls of the recent prompts, so retries of a prompt draw new latencies and errors
+        self._calls_per_prompt = OrderedDict()
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _rng(self, prompt_text: str) -> Tuple[random.Random, random.Random]:
+        """One generator for the answer (fixed per prompt) and one for this call (latency, errors)."""
+        prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._calls_per_prompt.pop(prompt_hash, 0)
+            self._calls_per_prompt[prompt_hash] = attempt + 1
+            if len(self._calls_per_prompt) > self.max_tracked_prompts:
+                self._calls_per_prompt.popitem(last=False)
+            self.calls += 1
+        return (
+            random.Random(f"{self.config.seed}:{prompt_hash}"),
+            random.Random(f"{self.config.seed}:{prompt_hash}:{attempt}"),
+        )
+
+    def _first_token_latency(self, rng: random.Random) -> float:
+        median = self.config.latency_median_seconds
+        if self.config.latency_distribution == "fixed":
+            return median
+        if self.config.latency_distribution == "uniform":
+            return max(0.0, rng.uniform(median * (1 - self.config.latency_sigma), median * (1 + self.config.latency_sigma)))
+        if self.config.latency_distribution == "lognormal":
+            return median * math.exp(rng.gauss(0, self.config.latency_sigma)) if median > 0 else 0.0
+        raise ValueError(f"Unknown latency distribution '{self.config.latency_distribution}'")
+
+    def _plan(self, prompt_text) -> Tuple[List[Tuple[float, str]], str, int]:
+        """Decides the answer, its chunks and the delay before each chunk, or raises an injected error."""
+        prompt_text = prompt_text if isinstance(prompt_text, str) else str(prompt_text)
+        answer_rng, call_rng = self._rng(prompt_text)
+
+        if self.config.error_rate and call_rng.random() < self.config.error_rate:
+            code = call_rng.choice(self.config.error_codes)
+            error_class = errors.ClientError if code < 500 else errors.ServerError
+            raise error_class(code, {"error": {"code": code, "message": "Injected by LocalLLMClient"}})
+
+        text = build_local_response(prompt_text, answer_rng, self._brawlers)
+        chunk_chars = STREAM_CHUNK_TOKENS * 4
+        chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        per_chunk = STREAM_CHUNK_TOKENS / self.config.tokens_per_second if self.config.tokens_per_second else 0.0
+        delays = [(self._first_token_latency(call_rng), chunks[0])] + [(per_chunk, chunk) for chunk in chunks[1:]]
+        return delays, text, estimate_tokens(prompt_text)
+
+    @staticmethod
+    def _response(text: str, prompt_tokens: int, output_tokens: int = None):
+        output_tokens = estimate_tokens(text) if output_tokens is None else output_tokens
+        return SimpleNamespace(
+            text=text,
+            usage_metadata=SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=output_tokens),
+        )
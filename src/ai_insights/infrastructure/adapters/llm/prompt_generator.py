@@ -1,4 +1,18 @@
 import json
+import time
+
+from src.ai_insights.infrastructure.adapters.llm.context_packer import (
+    ContextItem,
+    ContextPacker,
+    DEFAULT_TOKEN_BUDGETS,
+)
+from src.ai_insights.infrastructure.adapters.llm.context_projection import (
+    project_battle,
+    project_brawler,
+    project_profile,
+    to_compact_json,
+)
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS, TOKEN_BUCKETS
 
 PLAYER_DESCRIPTION_PROMPT='''         
     Provide expert Brawl Stars advice.
@@ -51,42 +65,173 @@ RECOMMENDATIONS_PROMPT='''
     Please provide your entire response as a single JSON object.
     Example structure for performance summary: {{'player description': content}}'''
 
+FUSED_INSIGHTS_PROMPT='''         
+    Provide expert Brawl Stars advice.
+    
+    --- Requested Tasks ---
+    1. player_description: Create player description, provide an engaging narrative (2-3 sentences) and a catchy title.
+    2. performance_summary: Create a recent performance summary for the player using their recent battle logs.
+    3. recommendations: Make 3 concise recommendations for the player using their profile, recent battle logs and community data.
+    Take into account the player playing style, recent balance changes and current meta, to help the player win.
+    For each recommendation, provide: brawler name, detailed reasoning, 
+    suggested game modes, 1 concise tip, and a confidence score
+
+    --- Player Data ---
+    {player_data}
+
+    --- Player Battlelog ---
+    {battle_logs}
+
+    --- Community Data ---
+    {community_data}
+
+    --- Response Format ---
+    Please provide your entire response as a single JSON object with exactly three keys:
+    {{"player_description": {{...}}, "performance_summary": {{...}}, "recommendations": [...]}}'''
+
+REPAIR_PROMPT='''
+    The response below was expected to be a single JSON object, but it could not be used: {error}
+
+    --- Response ---
+    {response}
+
+    --- Response Format ---
+    Fix the response and return only the corrected JSON object, keeping its content.'''
+
 
 class PromptGenerator:
-    def __init__(self):
+    def __init__(self, token_budgets: dict = None, token_counter=None):
         """
         Initializes the Prompt Generator.
+
+        Args:
+            token_budgets (dict, optional): Max context tokens per task. Defaults to DEFAULT_TOKEN_BUDGETS.
+            token_counter (callable, optional): Function counting the tokens of a text.
         """
-        pass
-                       
+        self.token_budgets = dict(DEFAULT_TOKEN_BUDGETS)
+        if token_budgets:
+            self.token_budgets.update(token_budgets)
+        self.packer = ContextPacker(token_counter=token_counter)
+        # Measured size of the last prompt generated for each task
+        self.prompt_stats = {}
+
+    def _player_data_items(self, player_data: dict) -> list:
+        """Profile header is always kept; brawlers are ranked by trophies."""
+        header = project_profile(player_data)
+        items = [ContextItem(section='player_data', text=to_compact_json(header), required=True)]
+
+        brawlers = player_data.get('brawlers', [])
+        max_trophies = max([b.get('trophies', 0) for b in brawlers] + [1])
+        for brawler in brawlers:
+            items.append(ContextItem(section='player_data', text=to_compact_json(project_brawler(brawler)),
+                                     relevance=brawler.get('trophies', 0) / max_trophies))
+        return items
+
+    def _battle_log_items(self, battle_logs: dict, player_tag: str = None) -> list:
+        """Battles are ranked by recency (the API returns the most recent first)."""
+        battles = battle_logs.get('items', []) if isinstance(battle_logs, dict) else []
+        return [
+            ContextItem(section='battle_logs', text=to_compact_json(project_battle(battle, player_tag)),
+                        relevance=1.0 - ix / (len(battles) + 1))
+            for ix, battle in enumerate(battles)
+        ]
+
+    def _community_data_items(self, community_data: dict) -> list:
+        """RAG items keep the retriever ranking; player and meta context come first."""
+        items = []
+        if 'playerContext' in community_data:
+            items.append(ContextItem(section='community_data', text=to_compact_json({'playerContext': community_data['playerContext']}),
+                                     relevance=1.0))
+
+        game_context = dict(community_data.get('gameContext', {}))
+        characters = game_context.pop('characterData', [])
+        if game_context:
+            items.append(ContextItem(section='community_data', text=to_compact_json({'gameContext': game_context}), relevance=0.9))
+
+        ranked_sections = [
+            ('communityContext', community_data.get('communityContext', []), 0.8),
+            ('characterData', characters, 0.6),
+            ('creatorProfilesForMatching', community_data.get('creatorProfilesForMatching', []), 0.3),
+        ]
+        for name, section_items, base_relevance in ranked_sections:
+            for rank, item in enumerate(section_items):
+                items.append(ContextItem(section='community_data', text=to_compact_json({name: item}),
+                                         relevance=base_relevance / (1 + 0.1 * rank)))
+
+        if 'meta' in community_data:
+            # the timestamp is left out so identical contexts produce byte-identical (cacheable) prompts
+            meta = {k: v for k, v in community_data['meta'].items() if k != 'timestamp'}
+            items.append(ContextItem(section='community_data', text=to_compact_json({'meta': meta}), relevance=0.1))
+        return items
+
+    def _record_stats(self, requested_task: str, prompt: str, packed, start: float) -> None:
+        prompt_tokens = self.packer.token_counter(prompt)
+        METRICS.histogram('prompt_generation_seconds', task=requested_task).observe(time.perf_counter() - start)
+        METRICS.histogram('prompt_estimated_tokens', buckets=TOKEN_BUCKETS, task=requested_task).observe(prompt_tokens)
+        self.prompt_stats[requested_task] = {
+            'prompt_tokens': prompt_tokens,
+            'context_tokens': packed.tokens_used,
+            'budget': packed.budget,
+            'items_included': len(packed.items),
+            'items_dropped': len(packed.dropped),
+        }
 
     def generate_prompt(self, context: dict, requested_task: str) -> str:
         """
         Creates an effective, task-specific prompt for the LLM from context.
-        This example creates one large prompt for multiple tasks. 
-        Alternatively, you might generate one prompt per task.
+        The context is packed into the token budget of the task, keeping the
+        most relevant items, and the size of the prompt is recorded in prompt_stats.
 
         Args:
-            llm_input (dict): The formatted context (like 'llm_input.json').
+            context (dict): The context built by ContextHandler plus previous LLM outputs.
+            requested_task (str): 'player_description', 'performance_summary' or 'recommendations'.
 
         Returns:
             str: The text prompt to be sent to the LLM.
         """
+        start = time.perf_counter()
+        budget = self.token_budgets.get(requested_task)
 
         if requested_task=='player_description':
-            player_data_str = str(context['player_data'])
-            return PLAYER_DESCRIPTION_PROMPT.format(player_data=player_data_str)
-        
+            packed = self.packer.pack(self._player_data_items(context['player_data']), budget)
+            prompt = PLAYER_DESCRIPTION_PROMPT.format(player_data=packed.section_text('player_data'))
+
         elif requested_task=='performance_summary':
-            battle_logs_str = str(context['battle_logs'])
-            return PERFORMANCE_SUMMARY_PROMPT.format(player_description=context['player_description'],
-                                                   battle_logs=battle_logs_str) 
+            # When the description is not available yet (stages running concurrently),
+            # the projected profile header describes the player instead
+            player_description = context.get('player_description')
+            if player_description is None:
+                player_description = to_compact_json(project_profile(context.get('player_data') or {}))
+            items = [ContextItem(section='player_description', text=str(player_description), required=True)]
+            player_tag = (context.get('player_data') or {}).get('tag')
+            items += self._battle_log_items(context['battle_logs'], player_tag)
+            packed = self.packer.pack(items, budget)
+            prompt = PERFORMANCE_SUMMARY_PROMPT.format(player_description=packed.section_text('player_description'),
+                                                       battle_logs=packed.section_text('battle_logs'))
 
         elif requested_task=='recommendations':
-            community_data_str = str(context['community_data'])
-            return RECOMMENDATIONS_PROMPT.format(player_description=context['player_description'],
-                                                performance_summary=context["performance_summary"],
-                                                community_data=community_data_str)
+            items = [
+                ContextItem(section='player_description', text=str(context['player_description']), required=True),
+                ContextItem(section='performance_summary', text=str(context['performance_summary']), required=True),
+            ]
+            items += self._community_data_items(context['community_data'])
+            packed = self.packer.pack(items, budget)
+            prompt = RECOMMENDATIONS_PROMPT.format(player_description=packed.section_text('player_description'),
+                                                   performance_summary=packed.section_text('performance_summary'),
+                                                   community_data=packed.section_text('community_data'))
+
+        elif requested_task=='fused_insights':
+            player_data = context['player_data']
+            items = self._player_data_items(player_data)
+            items += self._battle_log_items(context['battle_logs'], player_data.get('tag'))
+            items += self._community_data_items(context['community_data'])
+            packed = self.packer.pack(items, budget)
+            prompt = FUSED_INSIGHTS_PROMPT.format(player_data=packed.section_text('player_data'),
+                                                  battle_logs=packed.section_text('battle_logs'),
+                                                  community_data=packed.section_text('community_data'))
 
         else:
             return 'Invalid task'
+
+        self._record_stats(requested_task, prompt, packed, start)
+        return prompt
@@ -1,9 +1,15 @@
 import os
 import json
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
 import faiss
 import numpy as np
 
 from src.ai_insights.infrastructure.adapters.llm.ssem_embedder import SSEMEmbedder
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER
 
 class RAGRetriever:
     def __init__(self, game_suffix: str, base_rag_index_path: str, embedder: SSEMEmbedder):
@@ -25,6 +31,7 @@ class RAGRetriever:
 
         faiss_file = os.path.join(base_rag_index_path, f"vector_store_{game_suffix}.faiss")
         metadata_file = os.path.join(base_rag_index_path, f"vector_store_metadata_{game_suffix}.json")
+        self.index_version = self._index_version(faiss_file, metadata_file)
 
         if os.path.exists(faiss_file) and os.path.exists(metadata_file):
             self.index = faiss.read_index(faiss_file)
@@ -56,10 +63,28 @@ class RAGRetriever:
 
 
 
+    @staticmethod
+    def _index_version(*paths: str) -> str:
+        """Identifies the indexed content by the size and modification time of the index files."""
+        parts = []
+        for path in paths:
+            if os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{stat.st_size}-{int(stat.st_mtime)}")
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16] if parts else "none"
+
     def retrieve(self, query_text: str, top_k: int = 5) -> list[dict]:
         """
         Retrieves the top_k most relevant original content items for the given query_text.
         """
+        with TRACER.span("RAGRetriever.retrieve", game=self.game_suffix, top_k=top_k) as span, \
+                METRICS.timer("rag_retrieve_seconds", game=self.game_suffix):
+            retrieved = self._retrieve(query_text, top_k)
+            span.set_attribute("items", len(retrieved))
+        METRICS.counter("rag_retrieved_items_total", game=self.game_suffix).inc(len(retrieved))
+        return retrieved
+
+    def _retrieve(self, query_text: str, top_k: int) -> list[dict]:
         if self.index is None or self.index.ntotal == 0:
             print("RAGRetriever: No index loaded or index is empty. Cannot retrieve.")
             return []
@@ -68,6 +93,7 @@ class RAGRetriever:
             return []
 
         print(f"RAGRetriever: Generating embedding for query (first 500 chars): '{query_text[:500]}...'")
+        embed_start = time.perf_counter()
         query_embedding = self.embedder.generate_embeddings([query_text]) # Expects list, returns array
         query_embedding_np = np.asarray(query_embedding, dtype=np.float32)
 
@@ -75,6 +101,7 @@ class RAGRetriever:
             print("RAGRetriever: Failed to generate query embedding.")
             return []
 
+        METRICS.histogram("rag_embed_query_seconds", game=self.game_suffix).observe(time.perf_counter() - embed_start)
         print(f"RAGRetriever: Searching index with {self.index.ntotal} vectors for top {top_k} results.")
         try:
             # FAISS search returns distances (D) and indices (I)
@@ -134,3 +161,40 @@ class RAGRetriever:
         return retrieved_text_chunks
             
 
+
+class MemoizedRetriever:
+    """
+    Wraps a RAGRetriever shared by concurrent requests so that identical retrievals run once.
+    Callers asking for a query already being retrieved wait for that result instead of
+    embedding and searching again. Results are kept for the life of the wrapper, which is
+    meant to be scoped to one job.
+    """
+
+    def __init__(self, retriever: RAGRetriever):
+        self._retriever = retriever
+        self._results = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # index, index_version, embedder... come from the wrapped retriever
+        return getattr(self._retriever, name)
+
+    def retrieve(self, query_text: str, top_k: int = 5) -> list[dict]:
+        key = (query_text, top_k)
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                future.set_result(self._retriever.retrieve(query_text, top_k))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
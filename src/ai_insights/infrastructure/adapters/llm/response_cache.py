@@ -0,0 +1,174 @@
+"""Module implementing exact-match caches for LLM responses.
+
+Responses are keyed by a hash of (provider, model name, prompt, generation
+config), so only byte-identical requests share an entry. Two backends are
+provided: an in-memory LRU for a single process and an on-disk store that
+survives restarts and can be shared by batch jobs. Both expire entries after
+a TTL and evict the oldest entries above a maximum size.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from src.ai_insights.application.ports.response_cache import ResponseCache
+
+
+def make_cache_key(
+    provider: str,
+    model_name: str,
+    prompt_text: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Build the cache key of an LLM request.
+
+    Args:
+        provider: LLM provider name (e.g. 'google')
+        model_name: Model used to answer the prompt
+        prompt_text: Full prompt sent to the model
+        generation_config: Generation parameters sent with the prompt
+
+    Returns:
+        Hex SHA-256 digest identifying the request
+    """
+    prompt_hash = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+    payload = json.dumps(
+        [provider, model_name, prompt_hash, generation_config or {}],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InMemoryResponseCache(ResponseCache):
+    """Thread-safe LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Max number of responses kept; least recently used are evicted
+            ttl_seconds: Seconds an entry stays valid. None disables expiration.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskResponseCache(ResponseCache):
+    """
+    On-disk cache storing one JSON file per entry.
+
+    The entries are counted in memory, so writes do not list the directory: it is scanned only
+    when the count goes over max_entries, and the oldest entries are then evicted down to 90%
+    of it, so that the next scan is max_entries / 10 writes away. Entries written by other
+    processes are only counted at the next scan.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "data/processed/llm_cache",
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = 24 * 3600,
+    ):
+        """Initialize the cache, creating its directory if needed.
+
+        Args:
+            cache_dir: Directory holding the cache files
+            max_entries: Max number of files kept; the oldest are evicted
+            ttl_seconds: Seconds an entry stays valid. None disables expiration.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._entry_count = len(self._entry_paths())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entry_paths(self) -> List[str]:
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            # already removed, e.g. by another process
+            return
+        with self._lock:
+            self._entry_count -= 1
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl_seconds is not None and time.time() - entry["stored_at"] > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return entry["value"]
+
+    def set(self, key: str, value: str) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "value": value}, f, ensure_ascii=False)
+        is_new = not os.path.exists(path)
+        # atomic, so concurrent readers never see a partial file
+        os.replace(tmp_path, path)
+        with self._lock:
+            if is_new:
+                self._entry_count += 1
+            if self._entry_count > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Removes the oldest entries down to 90% of max_entries. Called with the lock held."""
+        entries = []
+        for path in self._entry_paths():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                # removed since the listing: already evicted
+                pass
+        entries.sort()
+        target = self.max_entries - self.max_entries // 10
+        removed = 0
+        for _, path in entries[: max(0, len(entries) - target)]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        self._entry_count = len(entries) - removed
@@ -0,0 +1,144 @@
+"""Module defining the structured outputs expected from the LLM and their parsers.
+
+The schemas are sent to Gemini as response_schema, together with the JSON
+MIME type, so the model answers with JSON matching them. The parsers still
+validate every response, since older models and the cache can return text
+written before the schema was enforced, and raise ValueError on invalid ones
+so LLMConnector can repair only the failing stage.
+"""
+
+import json
+from typing import Any, Dict, List
+
+from src.ai_insights.application.dtos.insight_dtos import RecommendedCharacterDTO
+from src.ai_insights.domain.embedding import Embedding
+
+RECOMMENDATION_ITEM_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "brawler_name": {"type": "STRING"},
+        "reasoning": {"type": "STRING"},
+        "suggested_game_modes": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "concise_tip": {"type": "STRING"},
+        "confidence_score": {"type": "NUMBER"},
+    },
+    "required": ["brawler_name", "reasoning", "suggested_game_modes", "concise_tip", "confidence_score"],
+}
+
+RECOMMENDATIONS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"recommendations": {"type": "ARRAY", "items": RECOMMENDATION_ITEM_SCHEMA}},
+    "required": ["recommendations"],
+}
+
+FUSED_INSIGHTS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "player_description": {
+            "type": "OBJECT",
+            "properties": {"title": {"type": "STRING"}, "narrative": {"type": "STRING"}},
+            "required": ["title", "narrative"],
+        },
+        "performance_summary": {
+            "type": "OBJECT",
+            "properties": {"summary": {"type": "STRING"}},
+            "required": ["summary"],
+        },
+        "recommendations": {"type": "ARRAY", "items": RECOMMENDATION_ITEM_SCHEMA},
+    },
+    "required": ["player_description", "performance_summary", "recommendations"],
+}
+
+
+def json_output_config(schema: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Generation config asking for a JSON answer, constrained by the schema if given."""
+    config = {"response_mime_type": "application/json"}
+    if schema is not None:
+        config["response_schema"] = schema
+    return config
+
+
+def parse_json_response(response_text: str) -> Any:
+    """Loads a JSON answer, tolerating the Markdown code fences of unconstrained responses."""
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return json.loads(text)
+
+
+def _recommendation(item: Any) -> Dict[str, Any]:
+    if not isinstance(item, dict):
+        raise ValueError(f"Recommendation is not an object: {item!r}")
+    brawler_name = item.get("brawler_name")
+    tip = item.get("concise_tip", item.get("tip"))
+    if not isinstance(brawler_name, str) or not brawler_name.strip():
+        raise ValueError("Recommendation without brawler_name")
+    if not isinstance(tip, str):
+        raise ValueError(f"Recommendation of {brawler_name} without concise_tip")
+
+    try:
+        confidence = float(item.get("confidence_score", 0.0))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid confidence_score of {brawler_name}: {item.get('confidence_score')!r}")
+    if confidence > 1:
+        # percentages
+        confidence /= 100
+    modes = item.get("suggested_game_modes", [])
+    return {
+        "brawler_name": brawler_name.strip(),
+        "reasoning": str(item.get("reasoning", "")),
+        "suggested_game_modes": [modes] if isinstance(modes, str) else list(modes),
+        "concise_tip": tip,
+        "confidence_score": confidence,
+    }
+
+
+def validate_recommendations(recommendations: Any) -> List[Dict[str, Any]]:
+    """Checks and normalizes a list of recommendations ('tip' is accepted for 'concise_tip')."""
+    if not isinstance(recommendations, list) or not recommendations:
+        raise ValueError("'recommendations' must be a non empty list")
+    return [_recommendation(item) for item in recommendations]
+
+
+def parse_recommendations(response_text: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Parses the answer of the recommendations stage.
+
+    Returns:
+        dict: {'recommendations': [{'brawler_name', 'reasoning', 'suggested_game_modes',
+            'concise_tip', 'confidence_score'}, ...]}
+
+    Raises:
+        ValueError: If the answer is not valid JSON or does not match RECOMMENDATIONS_SCHEMA.
+    """
+    parsed = parse_json_response(response_text)
+    if isinstance(parsed, dict):
+        parsed = parsed.get("recommendations")
+    return {"recommendations": validate_recommendations(parsed)}
+
+
+def to_recommended_character_dtos(recommendations: List[Dict[str, Any]], brawler_to_id: Dict[str, Any],
+                                  tip_embeddings) -> List[RecommendedCharacterDTO]:
+    """
+    Builds the DTOs of parsed recommendations.
+
+    Args:
+        recommendations: Items of parse_recommendations
+        brawler_to_id: Brawler id by uppercase brawler name
+        tip_embeddings: Embedding of the concise tip of each recommendation
+
+    Returns:
+        One RecommendedCharacterDTO per recommendation, the tip being its reasoning
+    """
+    return [
+        RecommendedCharacterDTO(
+            character_id=brawler_to_id.get(recommendation["brawler_name"].upper()),
+            character_name=recommendation["brawler_name"],
+            reasoning=recommendation["concise_tip"],
+            embedding=Embedding(id=0, text_id=0, model_id=1, vector=vector),
+            confidence_score=recommendation["confidence_score"],
+        )
+        for recommendation, vector in zip(recommendations, tip_embeddings)
+    ]
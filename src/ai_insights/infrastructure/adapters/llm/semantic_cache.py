@@ -0,0 +1,154 @@
+"""Module implementing a semantic cache for LLM responses.
+
+Players with the same mains, trophy band and recent game modes get nearly
+interchangeable recommendations. This cache describes each request with a
+normalized key of its mains and mode mix (see build_semantic_key), embeds it,
+and reuses a previous response when a stored key is similar enough. The
+trophy band is not left to the embedding, where bands read almost alike: it
+partitions the cache (see trophy_band), so only responses of the same band
+are compared. Entries expire after a TTL and
+as soon as the RAG/meta index they were generated with changes version.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.ai_insights.application.ports.embedder import Embedder
+
+TROPHY_BUCKET_SIZE = 2000
+TOP_BRAWLERS = 5
+TOP_MODES = 3
+
+
+def trophy_band(profile: Dict[str, Any]) -> str:
+    """Trophy band of a player (e.g. '10000-11999'), the exact-match partition of the cache."""
+    trophies = profile.get("trophies", 0)
+    bucket_start = trophies // TROPHY_BUCKET_SIZE * TROPHY_BUCKET_SIZE
+    return f"{bucket_start}-{bucket_start + TROPHY_BUCKET_SIZE - 1}"
+
+
+def build_semantic_key(task: str, profile: Dict[str, Any], battle_logs: Optional[Dict[str, Any]] = None) -> str:
+    """Describe a request by what drives the answer within a trophy band: mains and mode mix.
+
+    Player specific details (name, tag, trophies) are left out on purpose, so
+    players with the same profile shape share the same key.
+
+    Args:
+        task: Prompt task the key is built for (e.g. 'recommendations')
+        profile: Player profile from the game API
+        battle_logs: Player battlelog from the game API
+
+    Returns:
+        Normalized text key of the request
+    """
+    brawlers = sorted(profile.get("brawlers", []), key=lambda b: b.get("trophies", 0), reverse=True)
+    mains = ", ".join(b.get("name", "") for b in brawlers[:TOP_BRAWLERS])
+
+    battles = (battle_logs or {}).get("items", [])
+    modes = Counter(b.get("battle", {}).get("mode", b.get("event", {}).get("mode")) for b in battles)
+    # shares are rounded to 10% so small differences in the battlelog do not change the key
+    mode_mix = ", ".join(
+        f"{mode} {round(count / len(battles) * 10) * 10}%" for mode, count in modes.most_common(TOP_MODES)
+    )
+
+    return f"task: {task} | mains: {mains} | modes: {mode_mix}"
+
+
+class SemanticResponseCache:
+    """Reuses LLM responses of previous requests whose semantic key is similar enough."""
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: Optional[float] = 6 * 3600,
+        max_entries_per_task: int = 2000,
+    ):
+        """Initialize the cache.
+
+        Args:
+            embedder: Embedder used for the keys. May be set later, before the first lookup.
+            similarity_threshold: Min cosine similarity for a stored response to be reused
+            ttl_seconds: Seconds an entry stays valid. None disables expiration.
+            max_entries_per_task: Max number of entries kept per task and partition; oldest are evicted
+        """
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_task = max_entries_per_task
+        # (task, partition) -> {"vectors": (n, d) normalized matrix, "entries": [dict]}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, key_text: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.generate_embeddings([key_text]), dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _valid_mask(self, entries: List[Dict[str, Any]], index_version: str) -> np.ndarray:
+        now = time.time()
+        return np.array(
+            [
+                entry["index_version"] == index_version
+                and (self.ttl_seconds is None or now - entry["stored_at"] <= self.ttl_seconds)
+                for entry in entries
+            ],
+            dtype=bool,
+        )
+
+    def lookup(self, task: str, key_text: str, index_version: str = "", partition: str = "") -> Optional[str]:
+        """Return the stored response most similar to the key, if above the threshold.
+
+        Args:
+            task: Prompt task of the request
+            key_text: Normalized key of the request (see build_semantic_key)
+            index_version: Version of the meta/RAG index the response must have been built with
+            partition: Part of the request that must match exactly (see trophy_band)
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        query = self._embed(key_text)
+        with self._lock:
+            store = self._tasks.get((task, partition))
+            if store is not None and store["entries"]:
+                similarities = store["vectors"] @ query
+                similarities[~self._valid_mask(store["entries"], index_version)] = -np.inf
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    self.hits += 1
+                    return store["entries"][best]["response"]
+            self.misses += 1
+            return None
+
+    def store(self, task: str, key_text: str, response: str, index_version: str = "", partition: str = "") -> None:
+        """Add a response to the cache.
+
+        Args:
+            task: Prompt task of the request
+            key_text: Normalized key of the request (see build_semantic_key)
+            response: LLM response to reuse for similar requests
+            index_version: Version of the meta/RAG index used to build the prompt
+            partition: Part of the request that must match exactly (see trophy_band)
+        """
+        vector = self._embed(key_text)
+        entry = {"key": key_text, "response": response, "index_version": index_version, "stored_at": time.time()}
+        with self._lock:
+            store = self._tasks.get((task, partition))
+            if store is None:
+                self._tasks[(task, partition)] = {"vectors": vector.reshape(1, -1), "entries": [entry]}
+                return
+            # drop entries that can never be served again before appending
+            keep = self._valid_mask(store["entries"], index_version)
+            valid_indexes = np.flatnonzero(keep)
+            excess = len(valid_indexes) + 1 - self.max_entries_per_task
+            if excess > 0:
+                keep[valid_indexes[:excess]] = False
+            store["vectors"] = np.vstack([store["vectors"][keep], vector])
+            store["entries"] = [e for e, k in zip(store["entries"], keep) if k] + [entry]
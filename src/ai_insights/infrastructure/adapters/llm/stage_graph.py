@@ -0,0 +1,129 @@
+"""Module implementing a small dependency-graph scheduler for pipeline stages.
+
+A pipeline is declared as a list of Stage objects with explicit dependencies.
+StageGraph runs every stage as soon as all its dependencies have finished,
+so independent stages (e.g. LLM calls that do not need each other's output,
+or RAG retrieval) run concurrently on a thread pool. The wall time of every
+stage is recorded, and every stage runs in a trace span, child of the span
+open when the graph is run.
+"""
+
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER
+
+
+@dataclass
+class Stage:
+    """A unit of work of a pipeline.
+
+    Attributes:
+        name: Unique name of the stage, used as key of its result
+        fn: Callable receiving the dict of results of the finished stages
+        deps: Names of the stages that must finish before this one starts
+    """
+
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: List[str] = field(default_factory=list)
+
+
+class StageGraph:
+    """Runs a set of stages respecting their dependencies, concurrently when possible."""
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None):
+        """Initialize the graph and validate its dependencies.
+
+        Args:
+            stages: Stages of the pipeline
+            max_workers: Max number of stages running at the same time.
+                Defaults to the number of stages.
+
+        Raises:
+            ValueError: If a stage name is duplicated, a dependency is unknown
+                or the dependencies contain a cycle
+        """
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicated stage name '{stage.name}'")
+            self.stages[stage.name] = stage
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self._check_acyclic()
+
+        self.max_workers = max_workers or max(len(stages), 1)
+        # Wall time in seconds of each stage of the last run
+        self.timings = {}
+
+    def _check_acyclic(self) -> None:
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle detected at stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _timed(self, stage: Stage, results: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            with TRACER.span(f"stage.{stage.name}"):
+                return stage.fn(results)
+        finally:
+            self.timings[stage.name] = time.perf_counter() - start
+
+    def run(self, initial_results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run all the stages and return their results keyed by stage name.
+
+        Args:
+            initial_results: Values available to every stage before the run. Stages
+                whose name is already a key of it are not run again.
+
+        Returns:
+            Dict with the initial values plus the result of every stage
+
+        Raises:
+            Exception: The first exception raised by a stage; stages that did
+                not start yet are cancelled
+        """
+        results = dict(initial_results or {})
+        self.timings = {}
+        pending = {name: stage for name, stage in self.stages.items() if name not in results}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                ready = [s for s in pending.values() if all(dep in results for dep in s.deps)]
+                for stage in ready:
+                    del pending[stage.name]
+                    # each stage gets a snapshot, so concurrent stages never see partial updates
+                    # the copied context carries the current trace span to the worker thread
+                    running[executor.submit(contextvars.copy_context().run, self._timed, stage,
+                                            dict(results))] = stage.name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        for other in running:
+                            other.cancel()
+                        raise error
+                    results[name] = future.result()
+
+        return results
@@ -0,0 +1,171 @@
+"""Module implementing the shared watcher of clips processing on the Gemini File API.
+
+An uploaded clip is PROCESSING for a while before it can be prompted. Instead
+of one polling loop per clip at a fixed interval, the clips being processed
+are handed to one UploadStatusWatcher: a single thread polls them and
+resolves the future of each clip when it becomes ACTIVE or FAILED.
+
+    watcher = UploadStatusWatcher(get_file=genai.get_file)
+    video_file_resource = watcher.watch(genai.upload_file(path=path), size_bytes).result()
+
+Polls are scheduled per clip. Once some clips finished, the watcher knows how
+long processing takes per MB and polls a clip when it is expected to be done;
+until then, and for clips late on their estimate, the interval grows
+geometrically from min_poll_seconds up to max_poll_seconds. Short clips are
+thus picked up early and long clips are not polled needlessly, and the polls
+of all the clips together are capped at max_polls_per_second.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+PROCESSING = "PROCESSING"
+BYTES_PER_MB = 1_000_000
+
+
+@dataclass
+class _PendingUpload:
+    name: str
+    size_mb: float
+    future: Future
+    started_at: float
+    next_poll_at: float
+    last_poll_at: Optional[float] = None
+    polls: int = 0
+    errors: int = 0
+
+
+class UploadStatusWatcher:
+    def __init__(self, get_file: Callable[[str], object], min_poll_seconds: float = 0.5,
+                 max_poll_seconds: float = 30.0, backoff_factor: float = 1.5, max_polls_per_second: float = 10.0,
+                 timeout_seconds: float = 900.0, max_errors: int = 3, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            get_file (callable): Returns the current resource of an uploaded file from its name.
+            min_poll_seconds (float): Shortest interval between two polls of a clip.
+            max_poll_seconds (float): Longest interval between two polls of a clip.
+            backoff_factor (float): Growth of the interval while a clip has no (or an exceeded) estimate.
+            max_polls_per_second (float): Cap on the polls of all the clips together.
+            timeout_seconds (float): Processing time after which a clip fails with TimeoutError.
+            max_errors (int): Consecutive failed polls after which a clip fails with the error.
+            clock (callable): Monotonic clock in seconds, replaceable in tests.
+        """
+        self.get_file = get_file
+        self.min_poll_seconds = min_poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.backoff_factor = backoff_factor
+        self.min_poll_gap = 1.0 / max_polls_per_second
+        self.timeout_seconds = timeout_seconds
+        self.max_errors = max_errors
+        self._clock = clock
+        # Moving average of the processing seconds per MB of the finished clips
+        self.seconds_per_mb: Optional[float] = None
+        self._pending: Dict[str, _PendingUpload] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, video_file_resource, size_bytes: Optional[int] = None) -> Future:
+        """
+        Future of the processed resource of an uploaded file: resolved at once if it is no
+        longer PROCESSING, else when a poll sees it ACTIVE or FAILED.
+
+        Args:
+            video_file_resource: Resource returned by the upload.
+            size_bytes (int, optional): Size of the uploaded file, used to estimate its processing time.
+        """
+        if video_file_resource.state.name != PROCESSING:
+            future = Future()
+            future.set_result(video_file_resource)
+            return future
+
+        now = self._clock()
+        # small clips are dominated by a fixed processing overhead: estimated as 1 MB at least
+        size_mb = max(1.0, (size_bytes or 0) / BYTES_PER_MB)
+        with self._condition:
+            pending = self._pending.get(video_file_resource.name)
+            if pending is None:
+                pending = _PendingUpload(name=video_file_resource.name, size_mb=size_mb, future=Future(),
+                                         started_at=now, next_poll_at=0.0)
+                pending.next_poll_at = now + self._next_delay(pending, now)
+                self._pending[pending.name] = pending
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._poll_loop, name="upload-watcher", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return pending.future
+
+    def _next_delay(self, pending: _PendingUpload, now: float) -> float:
+        """Delay of the next poll of a clip: its expected completion, else a growing backoff."""
+        delay = None
+        if self.seconds_per_mb is not None:
+            expected_remaining = pending.started_at + self.seconds_per_mb * pending.size_mb - now
+            if expected_remaining >= self.min_poll_seconds:
+                delay = expected_remaining
+        if delay is None:
+            delay = self.min_poll_seconds * self.backoff_factor ** pending.polls
+        return min(self.max_poll_seconds, max(self.min_poll_seconds, delay))
+
+    def _record_processing_time(self, pending: _PendingUpload, now: float) -> None:
+        # processing ended between the last two polls
+        seconds = (now + (pending.last_poll_at or pending.started_at)) / 2 - pending.started_at
+        METRICS.histogram("clip_processing_seconds").observe(seconds)
+        per_mb = seconds / pending.size_mb
+        self.seconds_per_mb = per_mb if self.seconds_per_mb is None else 0.7 * self.seconds_per_mb + 0.3 * per_mb
+
+    def _poll_loop(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending:
+                    self._thread = None
+                    return
+                pending = min(self._pending.values(), key=lambda p: p.next_poll_at)
+                wait_seconds = pending.next_poll_at - self._clock()
+                if wait_seconds > 0:
+                    # woken early by a new clip, whose poll may come first
+                    self._condition.wait(wait_seconds)
+                    continue
+            self._poll(pending)
+            time.sleep(self.min_poll_gap)
+
+    def _poll(self, pending: _PendingUpload) -> None:
+        METRICS.counter("clip_file_polls_total").inc()
+        resource, error = None, None
+        try:
+            resource = self.get_file(pending.name)
+        except Exception as e:
+            error = e
+        now = self._clock()
+
+        with self._condition:
+            pending.polls += 1
+            if error is not None:
+                pending.errors += 1
+                print(f"LLM Service: Could not poll '{pending.name}' ({pending.errors}/{self.max_errors}): {error}")
+                if pending.errors >= self.max_errors:
+                    del self._pending[pending.name]
+                    pending.future.set_exception(error)
+                    return
+            elif resource.state.name != PROCESSING:
+                del self._pending[pending.name]
+                self._record_processing_time(pending, now)
+                pending.future.set_result(resource)
+                return
+            else:
+                pending.errors = 0
+            if now - pending.started_at > self.timeout_seconds:
+                del self._pending[pending.name]
+                pending.future.set_exception(
+                    TimeoutError(f"Video '{pending.name}' still processing after {self.timeout_seconds:.0f}s."))
+                return
+            pending.last_poll_at = now
+            pending.next_poll_at = now + self._next_delay(pending, now)
+
+    @property
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._pending)
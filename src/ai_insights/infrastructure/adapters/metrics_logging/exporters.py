@@ -0,0 +1,110 @@
+"""Module implementing the exporters of the metrics registry.
+
+- PrometheusTextExporter renders the Prometheus text exposition format, for a
+  /metrics endpoint or a textfile collector.
+- JsonLinesExporter writes one JSON object per sample, for log pipelines.
+- InMemoryExporter keeps the exported samples, for tests.
+"""
+
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, TextIO
+
+Samples = List[Dict[str, Any]]
+
+
+class MetricsExporter(ABC):
+    @abstractmethod
+    def export(self, samples: Samples) -> None:
+        """Export the samples collected by MetricsRegistry.collect."""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def render_prometheus_text(samples: Samples) -> str:
+    """Render samples in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+    for sample in samples:
+        name = sample["name"]
+        if name not in typed:
+            lines.append(f"# TYPE {name} {sample['type']}")
+            typed.add(name)
+        labels = sample["labels"]
+        if sample["type"] == "counter":
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(sample['value'])}")
+            continue
+        for bound, count in sample["buckets"]:
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusTextExporter(MetricsExporter):
+    """Keeps the last rendering in `text`, and writes it to a file if a path is given."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.text = ""
+
+    def export(self, samples: Samples) -> None:
+        self.text = render_prometheus_text(samples)
+        if self.path:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.text)
+            # atomic, so a scraper never reads a partial file
+            os.replace(tmp_path, self.path)
+
+
+class JsonLinesExporter(MetricsExporter):
+    """Appends one JSON line per sample to a file, or writes them to a stream (stdout by default)."""
+
+    def __init__(self, path: Optional[str] = None, stream: Optional[TextIO] = None):
+        self.path = path
+        self.stream = stream
+
+    def export(self, samples: Samples) -> None:
+        timestamp = time.time()
+        lines = [json.dumps({"timestamp": timestamp, **sample}, default=str) for sample in samples]
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+        else:
+            for line in lines:
+                print(line, file=self.stream)
+
+
+class InMemoryExporter(MetricsExporter):
+    """Keeps every export, for tests."""
+
+    def __init__(self):
+        self.exports: List[Samples] = []
+
+    def export(self, samples: Samples) -> None:
+        self.exports.append(samples)
+
+    @property
+    def last(self) -> Samples:
+        return self.exports[-1] if self.exports else []
+
+    def value(self, name: str, **labels) -> Optional[float]:
+        """Value of a counter (or count of a histogram) in the last export, None if absent."""
+        for sample in self.last:
+            if sample["name"] == name and all(sample["labels"].get(k) == str(v) for k, v in labels.items()):
+                return sample.get("value", sample.get("count"))
+        return None
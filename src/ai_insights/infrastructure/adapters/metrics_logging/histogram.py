@@ -0,0 +1,79 @@
+"""Module implementing a fixed-bucket histogram for latency measurements."""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence
+
+# Upper bounds in seconds, tuned for LLM and HTTP calls
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Thread-safe histogram of observed values with cumulative-style buckets.
+
+    Values are counted in the first bucket whose upper bound is greater or
+    equal to the value; values above the last bound go to an overflow bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """Initialize an empty histogram.
+
+        Args:
+            buckets: Sorted upper bounds of the buckets
+        """
+        self.buckets = list(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._count += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def bucket_counts(self) -> List[int]:
+        """Per-bucket counts, the last element being the overflow bucket."""
+        with self._lock:
+            return list(self._counts)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate a percentile as the upper bound of the bucket containing it.
+
+        Args:
+            q: Percentile between 0 and 100
+
+        Returns:
+            Upper bound of the bucket, inf for the overflow bucket, None if empty
+        """
+        with self._lock:
+            if self._count == 0:
+                return None
+            rank = q / 100 * self._count
+            seen = 0
+            for bound, count in zip(self.buckets + [float("inf")], self._counts):
+                seen += count
+                if seen >= rank and count:
+                    return bound
+            return float("inf")
+
+    def snapshot(self) -> Dict[str, float]:
+        """Summary of the histogram: count, sum, mean and p50/p90/p99 estimates."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
@@ -0,0 +1,127 @@
+"""Module implementing the metrics registry of the insights pipeline.
+
+Code on the hot paths records counters, histograms and timers in a
+MetricsRegistry, usually the process-wide METRICS. Each metric is identified
+by its name and labels (e.g. llm_request_seconds{model="gemini-2.0-flash"}).
+The registry does not send anything by itself: exporters registered with
+add_exporter (see exporters.py) receive the collected samples on export().
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from src.ai_insights.infrastructure.adapters.metrics_logging.histogram import DEFAULT_LATENCY_BUCKETS, Histogram
+
+# Upper bounds for token counts of prompts and responses
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Thread-safe monotonically increasing value."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class MetricsRegistry:
+    """Holds the metrics of a process and hands their samples to the exporters."""
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, LabelsKey], Any] = {}
+        self._types: Dict[str, str] = {}
+        self._exporters = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_type: str, name: str, labels: Dict[str, Any], factory):
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            registered_type = self._types.setdefault(name, metric_type)
+            if registered_type != metric_type:
+                raise ValueError(f"Metric '{name}' is already registered as a {registered_type}")
+            if key not in self._metrics:
+                self._metrics[key] = factory()
+            return self._metrics[key]
+
+    def counter(self, name: str, **labels) -> Counter:
+        """Return the counter of a name and labels, creating it on first use."""
+        return self._get_or_create("counter", name, labels, Counter)
+
+    def histogram(self, name: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS, **labels) -> Histogram:
+        """Return the histogram of a name and labels, creating it on first use.
+
+        The buckets of a histogram are fixed by its first call.
+        """
+        return self._get_or_create("histogram", name, labels, lambda: Histogram(buckets))
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the wall time of the block, in seconds, in the histogram of the name and labels.
+
+        The time is recorded even if the block raises.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name, **labels).observe(time.perf_counter() - start)
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Samples of all the metrics, sorted by name.
+
+        Returns:
+            Counters as {'name', 'type', 'labels', 'value'}; histograms as {'name', 'type',
+            'labels', 'count', 'sum', 'buckets': [(upper bound, cumulative count)], 'p50', 'p90', 'p99'}
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.items(), key=lambda item: item[0])
+        samples = []
+        for (name, labels), metric in metrics:
+            sample = {"name": name, "type": self._types[name], "labels": dict(labels)}
+            if isinstance(metric, Counter):
+                sample["value"] = metric.value
+            else:
+                cumulative, buckets = 0, []
+                for bound, count in zip(metric.buckets + [float("inf")], metric.bucket_counts()):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+                snapshot = metric.snapshot()
+                sample.update(count=snapshot["count"], sum=snapshot["sum"], buckets=buckets,
+                              p50=snapshot["p50"], p90=snapshot["p90"], p99=snapshot["p99"])
+            samples.append(sample)
+        return samples
+
+    def add_exporter(self, exporter) -> None:
+        """Register an exporter receiving the samples on every export()."""
+        with self._lock:
+            self._exporters.append(exporter)
+
+    def export(self) -> None:
+        """Send the current samples to all the registered exporters."""
+        samples = self.collect()
+        for exporter in list(self._exporters):
+            exporter.export(samples)
+
+    def reset(self) -> None:
+        """Drop all the metrics (exporters are kept)."""
+        with self._lock:
+            self._metrics.clear()
+            self._types.clear()
+
+
+# Process-wide registry used by the instrumented code
+METRICS = MetricsRegistry()
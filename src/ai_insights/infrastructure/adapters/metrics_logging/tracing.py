@@ -0,0 +1,246 @@
+"""Module implementing lightweight request tracing.
+
+A trace is a tree of spans: each span times one operation, holds attributes
+and links to the span that was open when it started. The current span is
+kept in a context variable, so nesting works across function calls and, when
+the context is copied (StageGraph does it), across threads.
+
+Sampling is decided once per trace, at its root span: unsampled traces cost
+one object per span and are never exported. Spans of sampled traces are
+handed to the exporter when they end.
+
+    TRACER.configure(exporter=JsonLinesSpanExporter("data/processed/traces.jsonl"), sample_rate=0.1)
+    with TRACER.span("ApiService.get_ai_insights", user_id=user_id) as span:
+        ...
+        span.set_attribute("sections", 3)
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+from src.ai_insights.application.ports.tracer import Tracer as TracerPort
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    sampled: bool
+    start_time: float
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.sampled:
+            self.attributes[key] = value
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        return None if self.end_time is None else self.end_time - self.start_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "duration_seconds": self.duration_seconds}
+
+
+_NOOP_SPAN = Span(name="noop", trace_id="", span_id="", parent_id=None, sampled=False, start_time=0.0)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The span open in the current context, None outside any span."""
+    return _current_span.get()
+
+
+class SpanExporter(ABC):
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Export a finished span."""
+
+    def flush(self) -> None:
+        """Send the spans buffered by the exporter, if any."""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps the finished spans, for tests."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def by_name(self, name: str) -> List[Span]:
+        return [span for span in self.spans if span.name == name]
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Appends one JSON line per finished span to a file."""
+
+    def __init__(self, path: str = "data/processed/traces.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp_span(span: Span) -> Dict[str, Any]:
+    """A span in the OTLP/JSON encoding of OpenTelemetry."""
+    otlp_span = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "startTimeUnixNano": str(int(span.start_time * 1e9)),
+        "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+        # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+        "status": {"code": 2, "message": span.error} if span.status == "error" else {"code": 1},
+    }
+    if span.parent_id:
+        otlp_span["parentSpanId"] = span.parent_id
+    return otlp_span
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """
+    Buffers spans and posts them in batches, OTLP/JSON encoded, to the /v1/traces endpoint of an
+    OpenTelemetry collector (or any stand-in accepting the same payload). Export failures are
+    reported and the batch is dropped, so tracing never breaks a request.
+    """
+
+    def __init__(self, endpoint: str = "http://localhost:4318/v1/traces", service_name: str = "ai-insights",
+                 batch_size: int = 64, timeout_seconds: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.timeout_seconds = timeout_seconds
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(span)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self.flush()
+
+    def payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [to_otlp_span(span) for span in spans]}],
+            }]
+        }
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans:
+            return
+        try:
+            requests.post(self.endpoint, json=self.payload(spans), timeout=self.timeout_seconds).raise_for_status()
+        except requests.RequestException as e:
+            print(f"OTLPHttpSpanExporter: Dropped {len(spans)} spans ({e}).")
+
+
+class Tracer(TracerPort):
+    """Creates spans and exports the sampled ones. Without exporter, tracing is a no-op."""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            exporter (SpanExporter, optional): Receives the finished spans of sampled traces.
+            sample_rate (float): Fraction of the traces recorded, between 0 and 1.
+            seed (int, optional): Seed of the sampling decisions.
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed)
+
+    def configure(self, exporter: Optional[SpanExporter] = None, sample_rate: Optional[float] = None) -> None:
+        self.exporter = exporter
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+
+    @contextmanager
+    def span(self, name: str, force_sample: bool = False, **attributes: Any) -> Iterator[Span]:
+        """
+        Opens a span around the block. A root span decides the sampling of its whole trace;
+        force_sample records the trace whatever the sample rate (e.g. a debug request).
+        Exceptions raised by the block mark the span as failed and are re-raised.
+        """
+        parent = _current_span.get()
+        exporter = self.exporter
+        if parent is None and exporter is None:
+            yield _NOOP_SPAN
+            return
+
+        if parent is None:
+            sampled = force_sample or self._random.random() < self.sample_rate
+            trace_id = f"{random.getrandbits(128):032x}"
+        else:
+            sampled, trace_id = parent.sampled, parent.trace_id
+        span = Span(name=name, trace_id=trace_id, span_id=f"{random.getrandbits(64):016x}",
+                    parent_id=parent.span_id if parent else None, sampled=sampled, start_time=time.time(),
+                    attributes=dict(attributes) if sampled else {})
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time = time.time()
+            if sampled and exporter is not None:
+                exporter.export(span)
+
+
+# Process-wide tracer used by the instrumented code, a no-op until configured
+TRACER = Tracer()
+
+
+def configure_tracing_from_env(tracer: Tracer = TRACER) -> None:
+    """
+    Configures the tracer from environment variables:
+    TRACE_EXPORTER ('none', 'jsonl' or 'otlp'), TRACE_SAMPLE_RATE (default 0.05),
+    TRACE_JSONL_PATH and TRACE_OTLP_ENDPOINT.
+    """
+    exporter_name = os.getenv("TRACE_EXPORTER", "none").lower()
+    if exporter_name == "jsonl":
+        exporter = JsonLinesSpanExporter(os.getenv("TRACE_JSONL_PATH", "data/processed/traces.jsonl"))
+    elif exporter_name == "otlp":
+        exporter = OTLPHttpSpanExporter(os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"))
+    elif exporter_name == "none":
+        exporter = None
+    else:
+        raise ValueError(f"Unknown TRACE_EXPORTER '{exporter_name}'")
+    tracer.configure(exporter=exporter, sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.05")))
@@ -64,3 +64,45 @@ def test_list_replays_by_recom_use_case(entity_replays):
         assert expected.replay_description == actual.replay_description
         assert expected.embedding == actual.embedding
         assert expected.video_path == actual.video_path
+
+
+def test_list_replays_by_recoms_fetches_rankings_concurrently(entity_replays):
+    import threading
+
+    from src.ai_insights.application.use_cases.list_replays_by_recom import (
+        list_replays_by_recoms,
+    )
+    from src.ai_insights.infrastructure.adapters.game_api_clients.rankings_cache import (
+        InMemoryRankingsCache,
+    )
+
+    game_api_client = mock.Mock()
+    # only passes once the three distinct rankings are being fetched at the same time
+    all_in_flight = threading.Barrier(3, timeout=5)
+
+    def get(endpoint):
+        all_in_flight.wait()
+        return {"items": [{"tag": f"#{endpoint.rsplit('/', 1)[-1]}"}]}
+
+    game_api_client.get.side_effect = get
+    game_api_client.retrieve_data.side_effect = lambda data, filters: {
+        "ids": [player["tag"] for player in data["items"]]
+    }
+    replays_repo = mock.Mock()
+    replays_repo.get.return_value = [replay.to_dict() for replay in entity_replays]
+    requests = [
+        {"endpoint": f"/v1/rankings/global/brawlers/{brawler_id}", "filters": ["items", "tag"]}
+        for brawler_id in (1, 2, 3, 1)
+    ]
+    cache = InMemoryRankingsCache()
+
+    replays = list_replays_by_recoms(requests, game_api_client, replays_repo, rankings_cache=cache)
+
+    # three distinct rankings, fetched at the same time and queried together
+    assert game_api_client.get.call_count == 3
+    replays_repo.get.assert_called_once_with(filters={"ids": ["#1", "#2", "#3"]})
+    assert [replay.id for replay in replays] == [1, 2]
+
+    # cached rankings are not fetched again (a fetch would block on the barrier)
+    list_replays_by_recoms(requests[:2], game_api_client, replays_repo, rankings_cache=cache)
+    assert game_api_client.get.call_count == 3
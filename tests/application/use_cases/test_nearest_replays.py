@@ -0,0 +1,55 @@
+from unittest import mock
+
+import numpy as np
+
+from src.ai_insights.domain.embedding import Embedding
+from src.ai_insights.application.dtos.insight_dtos import RecommendedCharacterDTO
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.use_cases.nearest_replays import (
+    nearest_replays_by_recom,
+)
+
+
+def _recommendation(character_id, vector):
+    return RecommendedCharacterDTO(
+        character_id=character_id,
+        character_name="",
+        reasoning="",
+        embedding=Embedding(id=0, text_id=0, model_id=1, vector=np.array(vector).reshape(1, -1)),
+    )
+
+
+def _replay(ix):
+    return ReplayDTO(
+        id=f"#{ix}", title="", character_id=1, replay_description="", embedding=None, video_path=""
+    )
+
+
+def test_recommendations_of_a_character_are_searched_together():
+    replay_index = mock.Mock()
+    replay_index.search.side_effect = lambda character_id, queries, k, treshold, allow: [
+        [(character_id * 10 + row, 0.9)] for row in range(len(queries))
+    ]
+    replay_index.payload.side_effect = _replay
+    recommendations = [
+        _recommendation(1, [1.0, 0.0]),
+        _recommendation(2, [0.0, 1.0]),
+        _recommendation(1, [0.5, 0.5]),
+    ]
+
+    results = nearest_replays_by_recom(recommendations, replay_index, k=3, treshold=0.2)
+
+    assert [[replay.id for replay in replays] for replays in results] == [["#10"], ["#20"], ["#11"]]
+    assert replay_index.search.call_count == 2
+    character_id, queries, k, treshold, allow = replay_index.search.call_args_list[0].args
+    assert (character_id, queries.shape, k, treshold, allow) == (1, (2, 2), 3, 0.2, None)
+
+
+def test_allowed_keys_are_passed_to_the_index():
+    replay_index = mock.Mock()
+    replay_index.search.return_value = [[]]
+    replay_index.payload.side_effect = _replay
+
+    nearest_replays_by_recom([_recommendation(1, [1.0, 0.0])], replay_index, allow={"#4", "clip:h1"})
+
+    assert replay_index.search.call_args.args[4] == {"#4", "clip:h1"}
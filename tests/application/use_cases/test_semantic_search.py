@@ -0,0 +1,58 @@
+import numpy as np
+
+from src.ai_insights.domain.embedding import Embedding
+from src.ai_insights.application.dtos.insight_dtos import RecommendedCharacterDTO
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.application.use_cases.semantic_search import (
+    batch_semantic_search,
+    semantic_search,
+)
+
+
+def _replay(ix, vector):
+    return ReplayDTO(
+        id=ix,
+        title=f"Replay {ix}",
+        character_id=1,
+        replay_description="",
+        embedding=Embedding(id=ix, text_id=ix, model_id=1, vector=np.array(vector).reshape(1, -1)),
+        video_path="",
+    )
+
+
+def _recommendation(vector):
+    return RecommendedCharacterDTO(
+        character_id="1",
+        character_name="Shelly",
+        reasoning="",
+        embedding=Embedding(id=0, text_id=0, model_id=1, vector=np.array(vector).reshape(1, -1)),
+    )
+
+
+def test_batch_search_matches_the_per_replay_search():
+    rng = np.random.default_rng(1)
+    replays = [_replay(ix, vector) for ix, vector in enumerate(rng.normal(size=(200, 16)))]
+    recommendations = [_recommendation(vector) for vector in rng.normal(size=(3, 16))]
+
+    batched = batch_semantic_search(recommendations, replays, 0.2)
+
+    for recommendation, found in zip(recommendations, batched):
+        expected = semantic_search(recommendation, replays, 0.2)
+        assert sorted(r.id for r in found) == sorted(r.id for r in expected)
+
+
+def test_batch_search_keeps_the_top_k_above_the_treshold():
+    replays = [
+        _replay(0, [1.0, 0.0]),
+        _replay(1, [0.8, 0.6]),
+        _replay(2, [0.6, 0.8]),
+        _replay(3, [0.0, 1.0]),
+        _replay(4, [0.0, 0.0]),
+    ]
+    recommendations = [_recommendation([1.0, 0.0]), _recommendation([0.0, 2.0])]
+
+    top = batch_semantic_search(recommendations, replays, 0.5, top_k=2)
+
+    assert [[r.id for r in found] for found in top] == [[0, 1], [3, 2]]
+    assert batch_semantic_search(recommendations, [], 0.5) == [[], []]
+    assert batch_semantic_search([], replays, 0.5) == []
@@ -0,0 +1,27 @@
+import time
+
+from src.ai_insights.infrastructure.adapters.database.insights_store import InsightsStore, normalize_tag
+
+
+def test_normalize_tag():
+    assert normalize_tag("#9jvu8rc") == "9JVU8RC"
+    assert normalize_tag("%239JVU8RC") == "9JVU8RC"
+    assert normalize_tag(" 9JVU8RC\n") == "9JVU8RC"
+
+
+def test_put_and_get_by_any_tag_form(tmp_path):
+    store = InsightsStore(str(tmp_path))
+    store.put("#9JVU8RC", {"recommendations": "r"}, {"prompt_tokens": 10})
+
+    assert store.get_insights("9jvu8rc") == {"recommendations": "r"}
+    assert store.get("%239JVU8RC")["stats"] == {"prompt_tokens": 10}
+    assert store.get_insights("OTHER") is None
+
+
+def test_old_entries_are_ignored(tmp_path):
+    store = InsightsStore(str(tmp_path))
+    store.put("9JVU8RC", {"recommendations": "r"})
+    time.sleep(0.02)
+
+    assert store.get_insights("9JVU8RC", max_age_seconds=0.01) is None
+    assert store.get_insights("9JVU8RC", max_age_seconds=60) is not None
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ai_insights.infrastructure.adapters.database.replay_embeddings import (
+    ReplayEmbeddings,
+    embeddings_paths,
+    load_replays_with_embeddings,
+)
+
+
+class FakeEmbedder:
+    def __init__(self, model_name="fake-model"):
+        self.model_name = model_name
+        self.embedded = []
+
+    def generate_embeddings(self, sentences):
+        self.embedded.extend(sentences)
+        return np.array([[len(sentence), sentence.count("a")] for sentence in sentences], dtype=np.float64)
+
+
+@pytest.fixture
+def replays_path(tmp_path):
+    path = tmp_path / "replays.csv"
+    pd.DataFrame(
+        {
+            "id": ["#A", "#B", "#C"],
+            "title": ["Replay 1", "Replay 2", "Replay 3"],
+            "character_id": [1, 2, 1],
+            "replay_description": ["a leon play", "a hank play", "a leon play"],
+            "embedding": [0, 0, 0],
+            "video_path": ["path/1", "path/2", "path/3"],
+        }
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+def test_embeddings_are_computed_once_and_persisted(replays_path):
+    embedder = FakeEmbedder()
+    replays, vectors = load_replays_with_embeddings(embedder, replays_path)
+
+    assert vectors.dtype == np.float32 and vectors.shape == (3, 2)
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+    assert embedder.embedded == ["a leon play", "a hank play"]
+    assert all(path.endswith(suffix) for path, suffix in
+               zip(embeddings_paths(replays_path), (".embeddings.npy", ".embeddings.json")))
+
+    rerun = FakeEmbedder()
+    _, reloaded = load_replays_with_embeddings(rerun, replays_path)
+    assert rerun.embedded == []
+    np.testing.assert_array_equal(reloaded, vectors)
+
+
+def test_only_new_or_changed_descriptions_are_embedded(replays_path):
+    load_replays_with_embeddings(FakeEmbedder(), replays_path)
+    replays = pd.read_csv(replays_path)
+    replays.loc[1, "replay_description"] = "a hank super"
+    replays.loc[3] = ["#D", "Replay 4", 3, "nita bear", 0, "path/4"]
+    replays.to_csv(replays_path, index=False)
+
+    embedder = FakeEmbedder()
+    _, vectors = load_replays_with_embeddings(embedder, replays_path)
+
+    assert embedder.embedded == ["a hank super", "nita bear"]
+    np.testing.assert_array_equal(vectors[1], [12, 2])
+    # the embedding of the old description is dropped
+    assert len(ReplayEmbeddings(replays_path).hashes) == 3
+
+
+def test_another_model_embeds_everything_again(replays_path):
+    load_replays_with_embeddings(FakeEmbedder(), replays_path)
+    embedder = FakeEmbedder(model_name="other-model")
+    load_replays_with_embeddings(embedder, replays_path)
+    assert embedder.embedded == ["a leon play", "a hank play"]
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from src.ai_insights.infrastructure.adapters.database.replay_vector_index import (
+    ReplayVectorIndex,
+)
+from src.ai_insights.infrastructure.adapters.database.replays_index_repo import (
+    ReplaysIndexRepo,
+)
+from src.ai_insights.infrastructure.adapters.llm.clip_analysis_store import (
+    ClipAnalysisStore,
+)
+
+
+class FakeEmbedder:
+    def generate_embeddings(self, sentences):
+        return np.array([[1.0, 0.0] if "super" in s else [0.0, 1.0] for s in sentences])
+
+
+def test_search_only_scores_the_shard_of_the_character():
+    repo = ReplaysIndexRepo.from_dataframe(
+        pd.DataFrame(
+            {
+                "id": ["#A", "#B", "#C", "#D"],
+                "title": ["Replay 1", "Replay 2", "Replay 3", "Replay 4"],
+                "character_id": [1, 1, 2, 1],
+                "replay_description": ["Desc 1", "Desc 2", "Desc 3", "Desc 4"],
+                "video_path": ["path/1", "path/2", "path/3", "path/4"],
+            }
+        ),
+        vectors=np.array([[1.0, 0.0], [0.6, 0.8], [1.0, 0.0], [0.0, 3.0]]),
+    )
+    index = ReplayVectorIndex.from_repo(repo)
+
+    assert index.shard_sizes() == {1: 3, 2: 1}
+    [matches] = index.search(1, [2.0, 0.0], k=2)
+    assert [key for key, _ in matches] == ["#A", "#B"]
+    assert matches[0][1] == np.float32(1.0)
+    assert index.payload("#B").title == "Replay 2"
+    assert [key for key, _ in index.search(1, [1.0, 0.0], k=5, treshold=0.5)[0]] == ["#A", "#B"]
+    assert [key for key, _ in index.search(1, [1.0, 0.0], k=5, allow={"#B", "#C", "#D", "#Z"})[0]] == ["#B", "#D"]
+    assert index.search(1, [1.0, 0.0], k=5, allow={"#C"}) == [[]]
+    assert index.search(3, [1.0, 0.0], k=5) == [[]]
+
+    # a replay moved to another character and another vector
+    index.upsert("#A", 2, [0.0, 1.0], repo.replay_dto(0))
+    assert [key for key, _ in index.search(1, [1.0, 0.0], k=1)[0]] == ["#B"]
+    assert index.shard_sizes() == {1: 2, 2: 2}
+    index.remove("#B")
+    assert [key for key, _ in index.search(1, [1.0, 0.0], k=5)[0]] == ["#D"]
+
+
+def test_large_shards_are_searched_through_hnsw_and_kept_up_to_date():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    index = ReplayVectorIndex(16, ann_min_size=100, hnsw_m=16)
+    for key, vector in enumerate(vectors):
+        index.upsert(key, 7, vector)
+    assert index._shards[7].ann is not None
+
+    queries = rng.normal(size=(20, 16))
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(queries @ unit.T), axis=1)[:, :5]
+    found = index.search(7, queries, k=5)
+    recall = np.mean([len(set(e) & {key for key, _ in f}) / 5 for e, f in zip(exact, found)])
+    assert recall >= 0.9
+
+    # removed replays never come back, and removing many compacts the shard
+    removed = {key for f in found for key, _ in f}
+    for key in removed:
+        index.remove(key)
+    assert not removed & {key for f in index.search(7, queries, k=5) for key, _ in f}
+    for key in range(300):
+        index.remove(key)
+    assert index.shard_sizes() == {7: len(set(range(300, 400)) - removed)}
+    assert index._shards[7].size < 400  # compacted
+
+
+def test_allowed_keys_are_searched_through_hnsw_unless_few(monkeypatch):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    index = ReplayVectorIndex(16, ann_min_size=100, hnsw_m=16)
+    for key, vector in enumerate(vectors):
+        index.upsert(key, 7, vector)
+    shard = index._shards[7]
+    exact_calls = []
+    exact = shard.exact
+    monkeypatch.setattr(shard, "exact", lambda *args: exact_calls.append(1) or exact(*args))
+
+    queries = rng.normal(size=(20, 16))
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = queries @ unit.T
+    allow = set(range(0, 400, 2))
+    found = index.search(7, queries, k=5, allow=allow)
+    assert exact_calls == []
+    assert all(key in allow for f in found for key, _ in f)
+    even = np.arange(0, 400, 2)
+    expected = even[np.argsort(-scores[:, even], axis=1)[:, :5]]
+    recall = np.mean([len(set(e) & {key for key, _ in f}) / 5 for e, f in zip(expected, found)])
+    assert recall >= 0.9
+
+    # a handful of allowed replays are scored exactly
+    few = {3, 50, 120}
+    found = index.search(7, queries, k=5, allow=few)
+    assert exact_calls == [1]
+    assert all({key for key, _ in f} == few for f in found)
+
+
+def test_analyzed_clips_are_indexed_as_they_arrive(tmp_path):
+    store = ClipAnalysisStore(str(tmp_path / "clip_analyses.jsonl"))
+    store.append("h1", "leon", "leon_clip.mp4", "v1", description="leon super")
+    store.append("h1", "leon", "leon_clip.mp4", "v2", description="leon walks")
+    store.append("h2", "mystery", "mystery_clip.mp4", "v1", description="unknown brawler")
+    index = ReplayVectorIndex(2)
+
+    index.follow_clip_analyses(store, FakeEmbedder(), {"LEON": 16000023, "NITA": 16000008}, str(tmp_path / "clips"))
+    [matches] = index.search(16000023, [0.0, 1.0], k=5)
+    assert [(key, index.payload(key).replay_description) for key, _ in matches] == [("clip:h1", "leon walks")]
+    assert index.payload("clip:h1").video_path == str(tmp_path / "clips" / "leon_clip.mp4")
+
+    store.append("h3", "nita", "nita_clip.mp4", "v2", description="nita super")
+    store.append("h4", "nita", "nita_other.mp4", "v2", error="quota")
+    [matches] = index.search(16000008, [1.0, 0.0], k=5)
+    assert [key for key, _ in matches] == ["clip:h3"]
+    assert index.shard_sizes() == {16000023: 1, 16000008: 1}
+    assert index.clip_keys() == {"clip:h1", "clip:h3"}
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ai_insights.application.dtos.replay import ReplayDTO
+from src.ai_insights.domain.embedding import Embedding
+from src.ai_insights.infrastructure.adapters.database.replays_df_repo import (
+    ReplaysDfRepo,
+)
+from src.ai_insights.infrastructure.adapters.database.replays_index_repo import (
+    ReplaysIndexRepo,
+)
+
+
+@pytest.fixture
+def sample_replays_data():
+    data = {
+        "id": ["#A", "#B", "#C", "#D", "#A"],
+        "title": ["Replay 1", "Replay 2", "Replay 3", "Replay 4", "Replay 5"],
+        "character_id": [101, 102, 101, 103, 102],
+        "replay_description": ["Desc 1", "Desc 2", "Desc 3", "Desc 4", "Desc 5"],
+        "embedding": [
+            Embedding(id=ix, text_id=ix, model_id=1, vector=[0.1 * ix, 0.2 * ix])
+            for ix in range(1, 6)
+        ],
+        "video_path": ["path/1", "path/2", "path/3", "path/4", "path/5"],
+    }
+    return pd.DataFrame(data)
+
+
+@pytest.fixture
+def replays_repo(sample_replays_data):
+    return ReplaysIndexRepo.from_dataframe(sample_replays_data)
+
+
+def _without_embeddings(replays):
+    return [{k: v for k, v in replay.items() if k != "embedding"} for replay in replays]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"ids": ["#A", "#C"]},
+        {"character_id": 101},
+        {"ids": ["#A", "#B", "#C"], "character_id": 102},
+        {"ids": ["#Z"], "character_id": 999},
+        {"character_id": 999},
+    ],
+)
+def test_get_matches_the_dataframe_repo(replays_repo, sample_replays_data, filters):
+    expected = ReplaysDfRepo(sample_replays_data).get(filters=filters)
+    result = replays_repo.get(filters=filters)
+
+    assert _without_embeddings(result) == _without_embeddings(expected)
+    for replay, expected_replay in zip(result, expected):
+        np.testing.assert_allclose(
+            replay["embedding"].vector, expected_replay["embedding"].vector, rtol=1e-6
+        )
+
+
+def test_embeddings_are_views_of_one_float32_matrix(replays_repo):
+    assert replays_repo.vectors.dtype == np.float32
+    assert replays_repo.vectors.flags["C_CONTIGUOUS"]
+
+    replays = replays_repo.get(filters={"ids": ["#A"]})
+    assert list(replays.rows) == [0, 4]
+    assert np.shares_memory(replays[1]["embedding"].vector, replays_repo.vectors)
+    np.testing.assert_allclose(replays.vectors(), replays_repo.vectors[[0, 4]])
+    dto = replays.to_dtos()[1]
+    assert isinstance(dto, ReplayDTO) and dto.title == "Replay 5"
+    np.testing.assert_array_equal(dto.embedding.vector, replays_repo.vectors[4])
+
+
+def test_vectors_can_be_given_apart_from_the_dataframe(sample_replays_data):
+    data = sample_replays_data.assign(embedding=0)
+    vectors = np.arange(10, dtype=np.float64).reshape(5, 2)
+
+    repo = ReplaysIndexRepo.from_dataframe(data, vectors=vectors)
+
+    np.testing.assert_array_equal(repo.get({"character_id": 103})[0]["embedding"].vector, [6, 7])
+    assert ReplaysIndexRepo.from_dataframe(data).get({})[0]["embedding"] is None
+    with pytest.raises(ValueError):
+        ReplaysIndexRepo.from_dataframe(data, vectors=vectors[:3])
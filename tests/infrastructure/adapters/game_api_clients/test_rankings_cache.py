@@ -0,0 +1,53 @@
+import threading
+import time
+
+import pytest
+
+from src.ai_insights.infrastructure.adapters.game_api_clients.rankings_cache import (
+    InMemoryRankingsCache,
+)
+
+
+def test_tags_are_reused_until_they_expire():
+    now = [0.0]
+    cache = InMemoryRankingsCache(ttl_seconds=60, max_entries=2, clock=lambda: now[0])
+    loads = []
+
+    def loader(tags):
+        return lambda: loads.append(tags) or tags
+
+    assert cache.get_or_load(("global", 1), loader({"#A"})) == frozenset({"#A"})
+    assert cache.get_or_load(("global", 1), loader({"#B"})) == frozenset({"#A"})
+    now[0] = 61
+    assert cache.get_or_load(("global", 1), loader({"#B"})) == frozenset({"#B"})
+    cache.get_or_load(("global", 2), loader({"#C"}))
+    cache.get_or_load(("fr", 1), loader({"#D"}))
+    assert len(cache) == 2 and loads == [{"#A"}, {"#B"}, {"#C"}, {"#D"}]
+
+
+def test_concurrent_misses_share_one_load_and_failures_are_not_cached():
+    cache = InMemoryRankingsCache()
+    calls = []
+
+    def slow_load():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"#A"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("key", slow_load)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == [frozenset({"#A"})] * 5
+
+    def failing_load():
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_load("other", failing_load)
+    assert cache.get_or_load("other", lambda: {"#B"}) == frozenset({"#B"})
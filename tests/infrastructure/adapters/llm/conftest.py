@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from src.ai_insights.application.ports.embedder import Embedder
+
+
+class BagOfWordsEmbedder(Embedder):
+    """Deterministic embedder for tests: one dimension per vocabulary word."""
+
+    def __init__(self):
+        self.vocabulary = {}
+
+    def generate_embeddings(self, sentences):
+        vectors = []
+        for sentence in sentences:
+            vector = np.zeros(64)
+            for word in sentence.replace(",", " ").replace("|", " ").split():
+                index = self.vocabulary.setdefault(word, len(self.vocabulary) % 64)
+                vector[index] += 1
+            vectors.append(vector)
+        return np.array(vectors)
+
+
+@pytest.fixture
+def bag_of_words_embedder():
+    return BagOfWordsEmbedder()
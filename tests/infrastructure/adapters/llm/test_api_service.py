@@ -0,0 +1,221 @@
+import json
+import pytest
+from unittest import mock
+
+from src.ai_insights.infrastructure.adapters.llm import api_service
+from src.ai_insights.infrastructure.adapters.llm.api_service import ApiService
+from src.ai_insights.infrastructure.adapters.llm.deadline import Deadline, DeadlineExceeded
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import StructuredOutputError
+from src.ai_insights.infrastructure.adapters.llm.semantic_cache import SemanticResponseCache
+
+
+@pytest.fixture
+def player_data():
+    with open("notebooks/player_data.json", "r") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def handler(player_data):
+    handler = mock.Mock()
+    handler.fetch_player_data.return_value = (player_data["profile"], player_data["battlelog"])
+    handler.build_llm_context.return_value = {
+        "player_data": player_data["profile"],
+        "battle_logs": player_data["battlelog"],
+        "community_data": {"playerContext": {"username": "Mikey"}},
+    }
+    return handler
+
+
+def _llm_connector(responses):
+    connector = mock.Mock()
+    connector.last_prompt_token_count = 100
+
+    def respond(prompt, config=None):
+        for marker, response in responses.items():
+            if marker in prompt:
+                return response
+        raise AssertionError("Unexpected prompt")
+
+    def parse(prompt, response, parser, schema=None):
+        try:
+            return parser(response)
+        except ValueError as e:
+            raise StructuredOutputError(str(e))
+
+    connector.get_llm_response.side_effect = respond
+    connector.get_structured_response.side_effect = lambda prompt, parser, schema=None: parse(
+        prompt, respond(prompt), parser
+    )
+    connector.parse_structured_response.side_effect = parse
+    return connector
+
+
+RECOMMENDATION = {
+    "brawler_name": "SPIKE",
+    "reasoning": "r",
+    "suggested_game_modes": ["gemGrab"],
+    "concise_tip": "t",
+    "confidence_score": 0.8,
+}
+RECOMMENDATIONS = json.dumps({"recommendations": [RECOMMENDATION]})
+
+STAGED_RESPONSES = {
+    "Make 3 concise recommendations": RECOMMENDATIONS,
+    "Create player description": "description",
+    "recent performance summary": "summary",
+}
+
+
+def test_get_ai_insights_runs_each_section(handler):
+    connector = _llm_connector(STAGED_RESPONSES)
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        service = ApiService(game="brawl", user_id="%239JVU8RC")
+        insights = service.get_ai_insights()
+
+    assert insights == {
+        "player_description": "description",
+        "performance_summary": "summary",
+        "recommendations": RECOMMENDATIONS,
+    }
+    assert connector.get_llm_response.call_count == 2
+    assert connector.get_structured_response.call_count == 1
+    assert {"player_api", "community_context", "recommendations", "total"} <= set(service.stage_timings)
+    assert service.prompt_stats["recommendations"]["actual_prompt_tokens"] == 100
+
+
+def test_get_ai_insights_fused_mode_uses_one_call(handler):
+    fused_response = json.dumps(
+        {
+            "player_description": {"title": "t"},
+            "performance_summary": {"summary": "s"},
+            "recommendations": [RECOMMENDATION],
+        }
+    )
+    connector = _llm_connector({"exactly three keys": "```json\n" + fused_response + "```"})
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        insights = ApiService(game="brawl", user_id="%239JVU8RC", fused=True).get_ai_insights()
+
+    assert connector.get_structured_response.call_count == 1
+    assert json.loads(insights["recommendations"]) == {"recommendations": [RECOMMENDATION]}
+
+
+def test_get_ai_insights_fused_mode_falls_back_on_invalid_response(handler):
+    connector = _llm_connector({"exactly three keys": "not json", **STAGED_RESPONSES})
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        insights = ApiService(game="brawl", user_id="%239JVU8RC", fused=True).get_ai_insights()
+
+    assert insights["recommendations"] == RECOMMENDATIONS
+    # player data and RAG context are not fetched again
+    assert handler.fetch_player_data.call_count == 1
+    assert handler.build_llm_context.call_count == 1
+
+
+def test_get_ai_insights_reuses_recommendations_of_similar_players(handler, bag_of_words_embedder):
+    handler.embedder = bag_of_words_embedder
+    handler.rag_retriever.index_version = "v1"
+    semantic_cache = SemanticResponseCache()
+    connector = _llm_connector(STAGED_RESPONSES)
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        for _ in range(2):
+            insights = ApiService(
+                game="brawl", user_id="%239JVU8RC", semantic_cache=semantic_cache
+            ).get_ai_insights()
+
+    assert insights["recommendations"] == RECOMMENDATIONS
+    assert connector.get_llm_response.call_count + connector.get_structured_response.call_count == 5
+    assert semantic_cache.hits == 1
+
+
+def test_stream_ai_insights_yields_section_chunks(handler):
+    connector = _llm_connector(STAGED_RESPONSES)
+
+    def stream(prompt, config=None):
+        response = connector.get_llm_response(prompt)
+        yield response[:3]
+        yield response[3:]
+
+    connector.stream_llm_response.side_effect = stream
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        events = list(ApiService(game="brawl", user_id="%239JVU8RC").stream_ai_insights())
+
+    deltas = [e for e in events if e["event"] == "delta" and e["section"] == "recommendations"]
+    assert "".join(e["text"] for e in deltas) == RECOMMENDATIONS
+    assert len(deltas) == 2
+    done = {e["section"]: e["text"] for e in events if e["event"] == "section_done"}
+    assert done == {
+        "player_description": "description",
+        "performance_summary": "summary",
+        "recommendations": RECOMMENDATIONS,
+    }
+    assert events[-1]["event"] == "end"
+    assert "recommendations" in events[-1]["stage_timings"]
+
+
+def test_stream_ai_insights_reports_errors(handler):
+    handler.fetch_player_data.side_effect = RuntimeError("API down")
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector"
+    ):
+        events = list(ApiService(game="brawl", user_id="%239JVU8RC").stream_ai_insights())
+
+    assert events == [{"event": "error", "message": "API down"}]
+
+
+def test_get_ai_insights_skips_optional_sections_near_the_deadline(handler):
+    connector = _llm_connector(STAGED_RESPONSES)
+    # 2 seconds left: enough for the description only
+    deadline = Deadline(budget_seconds=2, clock=lambda: 0.0)
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        service = ApiService(game="brawl", user_id="%239JVU8RC", deadline=deadline)
+        insights = service.get_ai_insights()
+
+    assert insights == {"player_description": "description", "performance_summary": None, "recommendations": None}
+    assert service.skipped_stages == {
+        "performance_summary": "insufficient_time",
+        "recommendations": "insufficient_time",
+    }
+
+
+def test_optional_section_timing_out_is_skipped(handler):
+    connector = _llm_connector(STAGED_RESPONSES)
+    respond = connector.get_llm_response.side_effect
+
+    def slow_summary(prompt, config=None):
+        if "recent performance summary" in prompt:
+            raise DeadlineExceeded("llm_request")
+        return respond(prompt, config)
+
+    connector.get_llm_response.side_effect = slow_summary
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        service = ApiService(game="brawl", user_id="%239JVU8RC", deadline=Deadline(budget_seconds=60))
+        insights = service.get_ai_insights()
+
+    assert insights["performance_summary"] is None
+    # the recommendations still run, without the LLM performance summary
+    assert insights["recommendations"] == RECOMMENDATIONS
+    assert service.skipped_stages == {"performance_summary": "deadline_exceeded"}
+
+
+def test_required_section_timing_out_fails_the_request(handler):
+    connector = _llm_connector(STAGED_RESPONSES)
+    connector.get_llm_response.side_effect = DeadlineExceeded("llm_request")
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler), mock.patch.object(
+        api_service, "LLMConnector", return_value=connector
+    ):
+        with pytest.raises(DeadlineExceeded):
+            ApiService(game="brawl", user_id="%239JVU8RC", deadline=Deadline(budget_seconds=60)).get_ai_insights()
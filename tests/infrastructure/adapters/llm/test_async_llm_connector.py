@@ -0,0 +1,176 @@
+import asyncio
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from google.genai import errors
+
+from src.ai_insights.infrastructure.adapters.llm.async_llm_connector import (
+    AsyncConnectorClient,
+    AsyncLLMConnector,
+    AsyncTokenBucket,
+)
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.response_cache import (
+    InMemoryResponseCache,
+)
+from src.ai_insights.infrastructure.adapters.metrics_logging.exporters import InMemoryExporter
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+
+class FakeAsyncModels:
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            return mock.Mock(text=f"response to {contents}")
+        finally:
+            self.in_flight -= 1
+
+
+class FakeStreamingModels(FakeAsyncModels):
+    async def generate_content_stream(self, model, contents, config=None):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+        async def chunks():
+            self.in_flight += 1
+            try:
+                for word in ["response ", "to ", contents]:
+                    await asyncio.sleep(self.delay)
+                    yield mock.Mock(text=word, usage_metadata=None)
+            finally:
+                self.in_flight -= 1
+        return chunks()
+
+
+def _connector(models, **kwargs):
+    connector = AsyncLLMConnector(api_key="test-key", base_retry_delay=0.01, **kwargs)
+    connector.client = mock.Mock()
+    connector.client.aio.models = models
+    return connector
+
+
+def test_get_llm_response_retries_rate_limit_and_server_errors():
+    METRICS.reset()
+    models = FakeAsyncModels(failures=[errors.ClientError(429, {}), errors.ServerError(503, {})])
+    connector = _connector(models)
+
+    response = asyncio.run(connector.get_llm_response("prompt"))
+
+    assert response == "response to prompt"
+    assert models.calls == 3
+    assert connector.retries == 2
+    assert connector.latency_stats()["attempts"]["count"] == 3
+    assert connector.latency_stats()["calls"]["count"] == 1
+
+
+def test_get_llm_response_does_not_retry_client_errors():
+    models = FakeAsyncModels(failures=[errors.ClientError(400, {})])
+    connector = _connector(models)
+
+    with pytest.raises(errors.ClientError):
+        asyncio.run(connector.get_llm_response("prompt"))
+    assert models.calls == 1
+    assert connector.failures == 1
+
+
+def test_get_llm_response_gives_up_after_max_retries():
+    models = FakeAsyncModels(failures=[errors.ServerError(500, {})] * 3)
+    connector = _connector(models, max_retries=2)
+
+    with pytest.raises(errors.ServerError):
+        asyncio.run(connector.get_llm_response("prompt"))
+    assert models.calls == 3
+
+
+def test_concurrency_is_limited_by_semaphore():
+    models = FakeAsyncModels(delay=0.05)
+    connector = _connector(models, max_concurrency=3)
+
+    async def run_all():
+        return await asyncio.gather(*(connector.get_llm_response(f"prompt {ix}") for ix in range(10)))
+
+    responses = asyncio.run(run_all())
+
+    assert len(responses) == 10
+    assert models.max_in_flight == 3
+
+
+def test_get_llm_response_uses_cache():
+    models = FakeAsyncModels()
+    connector = _connector(models, cache=InMemoryResponseCache())
+
+    asyncio.run(connector.get_llm_response("prompt"))
+    asyncio.run(connector.get_llm_response("prompt"))
+
+    assert models.calls == 1
+
+
+def test_token_bucket_paces_acquisitions():
+    bucket = AsyncTokenBucket(capacity=2, refill_per_second=20)
+
+    async def acquire_all():
+        for _ in range(4):
+            await bucket.acquire(1)
+
+    start = time.perf_counter()
+    asyncio.run(acquire_all())
+    elapsed = time.perf_counter() - start
+
+    # 2 tokens of burst, the other 2 are refilled at 20 tokens/s
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_connector_client_serves_threaded_callers_within_the_limits():
+    METRICS.reset()
+    models = FakeAsyncModels(delay=0.05)
+    connector = _connector(models, max_concurrency=2)
+    client = AsyncConnectorClient(connector)
+    llm_connector = LLMConnector(client=client)
+
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            responses = list(pool.map(llm_connector.get_llm_response, [f"prompt {ix}" for ix in range(6)]))
+    finally:
+        client.close()
+
+    assert responses == [f"response to prompt {ix}" for ix in range(6)]
+    assert models.max_in_flight == 2
+    exporter = InMemoryExporter()
+    exporter.export(METRICS.collect())
+    assert exporter.value("llm_async_call_seconds", provider="google") == 6
+    assert connector.latency_stats()["attempts"]["count"] == 6
+
+
+def test_connector_client_relays_streams_chunk_by_chunk():
+    models = FakeStreamingModels(failures=[errors.ClientError(429, {"error": {"code": 429}})], delay=0.01)
+    connector = _connector(models, max_concurrency=1)
+    client = AsyncConnectorClient(connector)
+
+    try:
+        chunks = list(LLMConnector(client=client).stream_llm_response("prompt"))
+
+        # a stream closed early frees the concurrency slot for the next one
+        stream = LLMConnector(client=client).stream_llm_response("other prompt")
+        assert next(stream) == "response "
+        stream.close()
+        assert list(LLMConnector(client=client).stream_llm_response("last prompt"))[-1] == "last prompt"
+    finally:
+        client.close()
+
+    assert chunks == ["response ", "to ", "prompt"]
+    assert connector.retries == 1
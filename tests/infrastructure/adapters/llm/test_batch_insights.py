@@ -0,0 +1,91 @@
+import threading
+import time
+from unittest import mock
+
+from src.ai_insights.infrastructure.adapters.database.insights_store import InsightsStore
+from src.ai_insights.infrastructure.adapters.llm.batch_insights import BatchCheckpoint, BatchInsightsJob
+from src.ai_insights.infrastructure.adapters.llm.rag import MemoizedRetriever
+
+
+class FakeService:
+    def __init__(self, user_id, fail_tags=(), delay=0.0):
+        self.user_id = user_id
+        self.fail_tags = fail_tags
+        self.delay = delay
+        self.stage_timings = {"total": 0.1}
+        self.prompt_stats = {
+            "player_description": {"actual_prompt_tokens": 1000, "actual_output_tokens": 100},
+            "recommendations": {"semantic_cache_hit": True},
+        }
+
+    def get_ai_insights(self):
+        time.sleep(self.delay)
+        if self.user_id[3:] in self.fail_tags:
+            raise RuntimeError("API down")
+        return {"recommendations": f"recommendations of {self.user_id}"}
+
+
+def _job(tmp_path, fail_tags=(), **kwargs):
+    return BatchInsightsJob(
+        InsightsStore(str(tmp_path / "store")),
+        BatchCheckpoint(str(tmp_path / "checkpoint.json")),
+        service_factory=lambda user_id: FakeService(user_id, fail_tags, **kwargs),
+        pricing={"input_per_million": 1.0, "output_per_million": 10.0},
+    )
+
+
+def test_run_stores_insights_and_reports_cost(tmp_path):
+    job = _job(tmp_path, fail_tags=("BAD",))
+
+    report = job.run(["#AAA", "bbb", "%23AAA", "#BAD"])
+
+    assert report.players_done == 2
+    assert report.players_failed == 1
+    assert report.prompt_tokens == 2000
+    assert report.cost_usd == (2000 * 1.0 + 200 * 10.0) / 1_000_000
+    assert report.players_per_minute > 0
+    assert job.store.get_insights("AAA") == {"recommendations": "recommendations of %23AAA"}
+    assert job.checkpoint.failed == {"BAD": "API down"}
+
+
+def test_run_resumes_from_checkpoint(tmp_path):
+    _job(tmp_path, fail_tags=("BAD",)).run(["AAA", "BAD"])
+
+    resumed = _job(tmp_path)
+    report = resumed.run(["AAA", "BAD", "CCC"])
+
+    assert report.players_skipped == 1
+    assert report.players_done == 2
+    assert resumed.checkpoint.failed == {}
+
+
+def test_workers_run_concurrently(tmp_path):
+    job = _job(tmp_path, delay=0.1)
+    job.max_workers = 4
+
+    report = job.run([f"P{ix}" for ix in range(8)])
+
+    assert report.players_done == 8
+    assert report.elapsed_seconds < 0.6
+
+
+def test_memoized_retriever_runs_identical_queries_once():
+    retriever = mock.Mock(index_version="v1")
+
+    def retrieve(query_text, top_k):
+        time.sleep(0.05)
+        return [query_text]
+
+    retriever.retrieve.side_effect = retrieve
+    memoized = MemoizedRetriever(retriever)
+
+    threads = [threading.Thread(target=memoized.retrieve, args=("same query", 100)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert memoized.retrieve("same query", 100) == ["same query"]
+    assert retriever.retrieve.call_count == 1
+    assert memoized.hits == 5
+    assert memoized.index_version == "v1"
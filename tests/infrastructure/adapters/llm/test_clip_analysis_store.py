@@ -0,0 +1,57 @@
+import os
+import time
+
+from src.ai_insights.infrastructure.adapters.llm import clip_catalog
+from src.ai_insights.infrastructure.adapters.llm.clip_analysis_store import ClipAnalysisStore
+from src.ai_insights.infrastructure.adapters.llm.clip_catalog import ClipCatalog
+
+
+def test_analyses_are_appended_and_survive_a_reload(tmp_path):
+    path = str(tmp_path / "clip_analyses.jsonl")
+    store = ClipAnalysisStore(path)
+    store.append("h1", "Leon", "leon_clip.mp4", "v1", description="first")
+    store.append("h2", "nita", "nita_clip.mp4", "v1", error="quota")
+    store.append("h1", "leon", "leon_clip.mp4", "v2", description="second")
+
+    reloaded = ClipAnalysisStore(path)
+    assert len(reloaded) == 3
+    assert [r["description"] for r in reloaded.for_brawler("leon")] == ["second", "first"]
+    assert reloaded.latest("leon", prompt_version="v1")["description"] == "first"
+    assert reloaded.for_brawler("nita") == [] and reloaded.for_brawler("nita", include_errors=True)[0]["error"] == "quota"
+    assert [r["prompt_version"] for r in reloaded.for_clip("h1")] == ["v2", "v1"]
+    assert reloaded.brawlers() == ["leon", "nita"]
+
+
+def test_lookups_by_time_and_lines_appended_by_others(tmp_path):
+    path = str(tmp_path / "clip_analyses.jsonl")
+    store = ClipAnalysisStore(path)
+    store.append("h1", "leon", "leon_clip.mp4", "v1", description="old")
+    since = time.time()
+    other_process = ClipAnalysisStore(path)
+    other_process.append("h2", "leon", "leon_other_clip.mp4", "v1", description="new")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"content_hash": "h3", "brawler": "le')  # cut line of a crashed writer
+
+    assert [r["description"] for r in store.for_brawler("leon", since=since)] == ["new"]
+    assert len(store) == 2
+
+
+def test_catalog_lists_the_directory_again_only_when_it_changes(tmp_path, monkeypatch):
+    clips = tmp_path / "clips"
+    clips.mkdir()
+    for name in ("leon_clip.mp4", "el_leon_fan.mov", "nita_clip.mp4", "notes.txt"):
+        (clips / name).write_bytes(b"x")
+    listings = []
+    listdir = os.listdir
+    monkeypatch.setattr(clip_catalog.os, "listdir", lambda path: listings.append(path) or listdir(path))
+    catalog = ClipCatalog(str(clips))
+
+    assert [os.path.basename(p) for p in catalog.clips()] == ["el_leon_fan.mov", "leon_clip.mp4", "nita_clip.mp4"]
+    assert [os.path.basename(p) for p in catalog.for_brawler("Leon")] == ["leon_clip.mp4"]
+    assert [os.path.basename(p) for p in catalog.for_brawler("fan")] == ["el_leon_fan.mov"]
+    assert len(listings) == 1
+
+    (clips / "stu_clip.mp4").write_bytes(b"x")
+    os.utime(clips, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert [os.path.basename(p) for p in catalog.for_brawler("stu")] == ["stu_clip.mp4"]
+    assert len(listings) == 2
@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm import clip_context_generator
+from src.ai_insights.infrastructure.adapters.llm.clip_context_generator import ClipBatchAnalyzer
+from src.ai_insights.infrastructure.adapters.llm.clip_analysis_store import ClipAnalysisStore
+from src.ai_insights.infrastructure.adapters.llm.clip_preprocessing import ProxyResult, ProxySettings
+from src.ai_insights.infrastructure.adapters.llm.clip_registry import ClipRegistry
+
+
+class FakeGenai:
+    """Stand-in of google.generativeai: files are ACTIVE processing_seconds after their upload."""
+
+    def __init__(self, upload_seconds=0.1, processing_seconds=0.2, generation_seconds=0.1, failing=()):
+        self.upload_seconds = upload_seconds
+        self.processing_seconds = processing_seconds
+        self.generation_seconds = generation_seconds
+        self.failing = failing
+        self.uploads = []
+        self.get_file_calls = 0
+        self.deleted = []
+        self._uploaded_at = {}
+        self._lock = threading.Lock()
+
+    def _file(self, name):
+        if time.perf_counter() - self._uploaded_at[name] < self.processing_seconds:
+            state = "PROCESSING"
+        else:
+            state = "FAILED" if os.path.basename(name) in self.failing else "ACTIVE"
+        return SimpleNamespace(name=name, state=SimpleNamespace(name=state))
+
+    def upload_file(self, path):
+        time.sleep(self.upload_seconds)
+        with self._lock:
+            name = f"files/{len(self.uploads)}/{os.path.basename(path)}"
+            self.uploads.append(path)
+            self._uploaded_at[name] = time.perf_counter()
+        return self._file(name)
+
+    def get_file(self, name):
+        with self._lock:
+            self.get_file_calls += 1
+        return self._file(name)
+
+    def delete_file(self, name):
+        with self._lock:
+            self.deleted.append(name)
+
+    def GenerativeModel(self, model_name):
+        def generate_content(parts):
+            time.sleep(self.generation_seconds)
+            return SimpleNamespace(text=f" Play of {os.path.basename(parts[1].name)} ")
+        return SimpleNamespace(generate_content=generate_content)
+
+
+@pytest.fixture
+def clips_dir(tmp_path):
+    clips = tmp_path / "clips"
+    clips.mkdir()
+    for name in ("hank_clip.mp4", "leon_clip.mp4", "nita_clip.mp4", "stu_clip.mp4"):
+        (clips / name).write_bytes(name.encode())
+    (clips / "notes.txt").write_text("not a clip")
+    return clips
+
+
+def test_batch_analysis_pipelines_all_clips(clips_dir, tmp_path, monkeypatch):
+    fake = FakeGenai()
+    monkeypatch.setattr(clip_context_generator, "genai", fake)
+    paths = clip_context_generator._discover_clips(str(clips_dir))
+    analyzer = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path),
+                                 max_uploads=2, poll_seconds=0.02)
+
+    start = time.perf_counter()
+    results = analyzer.run(paths)
+    elapsed = time.perf_counter() - start
+
+    # 0.4s per clip in sequence; the stages of different clips overlap
+    assert elapsed < 1.0
+    assert [os.path.basename(path) for path in paths] == ["hank_clip.mp4", "leon_clip.mp4", "nita_clip.mp4", "stu_clip.mp4"]
+    assert sorted(r["description"] for r in results) == [f"Play of {name}" for name in
+                                                         ("hank_clip.mp4", "leon_clip.mp4", "nita_clip.mp4", "stu_clip.mp4")]
+    assert {r["brawler"] for r in results} == {"hank", "leon", "nita", "stu"}
+    with open(tmp_path / "results.jsonl", encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 4
+    assert len(fake.deleted) == 4
+
+
+def test_batch_analysis_reports_failed_clips(clips_dir, tmp_path, monkeypatch):
+    fake = FakeGenai(processing_seconds=0, failing=("leon_clip.mp4",))
+    monkeypatch.setattr(clip_context_generator, "genai", fake)
+    store = ClipAnalysisStore(str(tmp_path / "clip_analyses.jsonl"))
+    analyzer = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path),
+                                 store=store)
+
+    results = {r["video_id"]: r for r in analyzer.run(clip_context_generator._discover_clips(str(clips_dir)))}
+
+    assert "error" in results["leon_clip.mp4"]
+    assert results["hank_clip.mp4"]["description"] == "Play of hank_clip.mp4"
+    assert store.latest("hank")["description"] == "Play of hank_clip.mp4"
+    assert store.latest("leon") is None and "error" in store.for_brawler("leon", include_errors=True)[0]
+
+
+def test_identical_clips_are_uploaded_once(clips_dir, tmp_path, monkeypatch):
+    (clips_dir / "stu_clip.mp4").write_bytes((clips_dir / "nita_clip.mp4").read_bytes())
+    fake = FakeGenai(processing_seconds=0)
+    monkeypatch.setattr(clip_context_generator, "genai", fake)
+    analyzer = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path))
+
+    results = analyzer.run(clip_context_generator._discover_clips(str(clips_dir)))
+
+    assert len(results) == 4 and all("description" in r for r in results)
+    assert len(fake.uploads) == 3
+    assert len(fake.deleted) == 3
+
+
+def test_registry_reuses_analyses_and_uploaded_files(clips_dir, tmp_path, monkeypatch):
+    fake = FakeGenai(processing_seconds=0)
+    monkeypatch.setattr(clip_context_generator, "genai", fake)
+    paths = clip_context_generator._discover_clips(str(clips_dir))
+
+    def run():
+        registry = ClipRegistry(str(tmp_path / "registry.jsonl"))
+        analyzer = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path),
+                                     registry=registry, keep_uploaded_files=True)
+        return analyzer.run(paths)
+
+    run()
+    rerun = run()
+    assert len(fake.uploads) == 4
+    assert all(r["cached"] for r in rerun)
+
+    # a new prompt version analyzes again, with the files uploaded by the first run
+    monkeypatch.setattr(clip_context_generator, "CLIP_PROMPT_VERSION", "v2")
+    results = run()
+    assert len(fake.uploads) == 4
+    assert not any(r.get("cached") for r in results)
+    assert fake.deleted == []
+
+
+class FakePreprocessor:
+    """Stand-in of ClipPreprocessor writing 'proxy' files, or falling back to the clips if failing."""
+
+    def __init__(self, proxies_dir, failing=False):
+        self.enabled = True
+        self.settings = ProxySettings()
+        self.proxies_dir = proxies_dir
+        self.failing = failing
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def proxy(self, source_path, content_hash=None):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.02)
+        with self._lock:
+            self.running -= 1
+        if self.failing:
+            return ProxyResult(source_path=source_path, proxy_path=source_path, source_bytes=10, proxy_bytes=10)
+        proxy_path = str(self.proxies_dir / os.path.basename(source_path))
+        with open(proxy_path, "wb") as f:
+            f.write(b"proxy")
+        return ProxyResult(source_path=source_path, proxy_path=proxy_path, source_bytes=105, proxy_bytes=5,
+                           settings_tag=self.settings.tag())
+
+
+def test_batch_uploads_proxies_and_reports_savings(clips_dir, tmp_path, monkeypatch):
+    fake = FakeGenai(upload_seconds=0, processing_seconds=0, generation_seconds=0)
+    monkeypatch.setattr(clip_context_generator, "genai", fake)
+    proxies_dir = tmp_path / "clip_proxies"
+    proxies_dir.mkdir()
+    preprocessor = FakePreprocessor(proxies_dir)
+    registry = ClipRegistry(str(tmp_path / "registry.jsonl"))
+    analyzer = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path),
+                                 poll_seconds=0.01, registry=registry, preprocessor=preprocessor, max_preprocessing=1)
+    results = analyzer.run(clip_context_generator._discover_clips(str(clips_dir)))
+
+    assert all(path.startswith(str(proxies_dir)) for path in fake.uploads)
+    assert all(result["preprocessing"]["bytes_saved"] == 100 for result in results)
+    # ffmpeg runs in its own bounded stage
+    assert preprocessor.max_running == 1
+    # analyses of proxies are stored apart from analyses of the full clips
+    versions = {entry["prompt_version"] for entry in registry.analyses.values()}
+    assert versions == {f"{clip_context_generator.CLIP_PROMPT_VERSION}+proxy-{ProxySettings().tag()}"}
+
+
+def test_clips_without_proxy_are_stored_as_clips(clips_dir, tmp_path, monkeypatch):
+    fake = FakeGenai(upload_seconds=0, processing_seconds=0, generation_seconds=0)
+    monkeypatch.setattr(clip_context_generator, "genai", fake)
+    registry = ClipRegistry(str(tmp_path / "registry.jsonl"))
+    analyzer = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path),
+                                 registry=registry, preprocessor=FakePreprocessor(tmp_path, failing=True))
+    results = analyzer.run(clip_context_generator._discover_clips(str(clips_dir)))
+
+    # ffmpeg failed: the clips themselves were uploaded, under the keys and version of clips
+    assert all(path.startswith(str(clips_dir)) for path in fake.uploads)
+    assert not any("preprocessing" in result for result in results) and analyzer.proxy_results == {}
+    versions = {entry["prompt_version"] for entry in registry.analyses.values()}
+    assert versions == {clip_context_generator.CLIP_PROMPT_VERSION}
+
+    rerun = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), contexts_dir_relative=str(tmp_path),
+                              registry=registry).run(clip_context_generator._discover_clips(str(clips_dir)))
+    assert all(result["cached"] for result in rerun)
+
+
+def test_brawler_analysis_uploads_the_proxy(clips_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(clip_context_generator, "_ensure_api_key_is_configured", lambda: True)
+    monkeypatch.setattr(clip_context_generator, "PROJECT_ROOT", str(tmp_path))
+    monkeypatch.setattr(clip_context_generator, "ClipPreprocessor", lambda cache_dir, settings: FakePreprocessor(tmp_path))
+    (tmp_path / "context").mkdir()
+    (tmp_path / "context" / "leon_context.txt").write_text("Leon supers")
+    uploaded = []
+
+    def analyze(path, context, upload_path=None):
+        uploaded.append(upload_path)
+        return {"video_id": os.path.basename(path), "description": "Proxy play"}
+    monkeypatch.setattr(clip_context_generator, "_analyze_clip_with_gemini", analyze)
+
+    clip_context_generator.brawler_clip_analysis("leon", videos_dir_relative_to_root="clips/",
+                                                 contexts_dir_relative_to_root="context/")
+    clip_context_generator.brawler_clip_analysis("leon", videos_dir_relative_to_root="clips/",
+                                                 contexts_dir_relative_to_root="context/")
+
+    # the second run reuses the analysis of the proxy
+    assert uploaded == [str(tmp_path / "leon_clip.mp4")]
+    store = ClipAnalysisStore(str(tmp_path / "data/processed/clip_analyses.jsonl"))
+    assert store.latest("leon")["prompt_version"] == clip_context_generator._analysis_version(ProxySettings().tag())
+
+
+def test_brawler_analysis_keeps_earlier_results(clips_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(clip_context_generator, "_ensure_api_key_is_configured", lambda: True)
+    monkeypatch.setattr(clip_context_generator, "PROJECT_ROOT", str(tmp_path))
+    analyses = iter([{"video_id": "leon_clip.mp4", "description": "First play"},
+                     {"video_id": "leon_clip.mp4", "error": "quota"}])
+    monkeypatch.setattr(clip_context_generator, "_analyze_clip_with_gemini",
+                        lambda path, context, upload_path=None: next(analyses))
+
+    def run():
+        clip_context_generator.brawler_clip_analysis("leon", videos_dir_relative_to_root="clips/",
+                                                     contexts_dir_relative_to_root="context/")
+        with open(tmp_path / "data/raw/clip_context/leon_clip_context.json", encoding="utf-8") as f:
+            return json.load(f)
+
+    assert run()[0]["description"] == "First play"
+    # the clip changed and its new analysis failed: the earlier analysis is still listed
+    (clips_dir / "leon_clip.mp4").write_bytes(b"new bytes")
+    results = run()
+    assert results[0]["error"] == "quota"
+    assert results[1]["description"] == "First play"
+    store = ClipAnalysisStore(str(tmp_path / "data/processed/clip_analyses.jsonl"))
+    assert len(store.for_brawler("leon", include_errors=True)) == 2
+
+
+def test_batch_runs_share_the_process_watcher(tmp_path):
+    first = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"))
+    second = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"))
+    custom = ClipBatchAnalyzer(results_path=str(tmp_path / "results.jsonl"), poll_seconds=0.01)
+
+    assert first.watcher is second.watcher is clip_context_generator._upload_watcher()
+    assert custom.watcher is not first.watcher
@@ -0,0 +1,93 @@
+import json
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm import clip_preprocessing
+from src.ai_insights.infrastructure.adapters.llm.clip_preprocessing import (
+    ClipPreprocessor, ProxySettings, build_proxy_command, estimate_video_tokens)
+
+
+class FakeFfmpeg:
+    """Stand-in of the ffmpeg/ffprobe CLIs: proxies are a tenth of the source, videos last 30s."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.conversions = []
+
+    def run(self, command, check=False, capture_output=False, text=False):
+        if command[0] == "ffprobe":
+            is_proxy = "clip_proxies" in command[-1]
+            streams = [{"codec_type": "video", "avg_frame_rate": "1/1" if is_proxy else "60/1"}]
+            if not is_proxy:
+                streams.append({"codec_type": "audio"})
+            return SimpleNamespace(stdout=json.dumps({"format": {"duration": "30.0"}, "streams": streams}))
+        self.conversions.append(command)
+        if self.fail:
+            raise subprocess.CalledProcessError(1, command)
+        source = command[command.index("-i") + 1]
+        with open(source, "rb") as src, open(command[-1], "wb") as dst:
+            data = src.read()
+            dst.write(data[:len(data) // 10])
+        return SimpleNamespace(stdout="")
+
+
+@pytest.fixture
+def ffmpeg(monkeypatch):
+    fake = FakeFfmpeg()
+    monkeypatch.setattr(clip_preprocessing, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(clip_preprocessing.subprocess, "run", fake.run)
+    return fake
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = tmp_path / "hank_clip.mp4"
+    path.write_bytes(b"x" * 10000)
+    return str(path)
+
+
+def test_proxy_command_trims_downscales_and_drops_audio():
+    command = build_proxy_command("in.mp4", "out.mp4", ProxySettings(start_seconds=5, max_duration_seconds=20))
+
+    assert command[command.index("-ss") + 1] == "5"
+    assert command[command.index("-t") + 1] == "20"
+    assert command[command.index("-vf") + 1] == "fps=1.0,scale=-2:'min(480,ih)'"
+    assert "-an" in command and command[-1] == "out.mp4"
+
+    keyframes = build_proxy_command("in.mp4", "out.mp4", ProxySettings(keyframes_only=True, keep_audio=True))
+    assert keyframes[keyframes.index("-vf") + 1].startswith("select='gt(scene,0.3)'")
+    assert "-an" not in keyframes and "-ss" not in keyframes
+
+
+def test_token_estimate_counts_sampled_frames_and_audio():
+    assert estimate_video_tokens(30, fps=60, has_audio=True) == 30 * 258 + 30 * 32
+    assert estimate_video_tokens(30, fps=0.5, has_audio=False) == 15 * 258
+
+
+def test_proxy_is_made_once_and_reports_savings(ffmpeg, clip, tmp_path):
+    preprocessor = ClipPreprocessor(str(tmp_path / "clip_proxies"))
+
+    first = preprocessor.proxy(clip, content_hash="a" * 64)
+    second = preprocessor.proxy(clip, content_hash="a" * 64)
+
+    assert len(ffmpeg.conversions) == 1
+    assert first.proxy_path == second.proxy_path != clip
+    assert not first.cached and second.cached
+    assert first.bytes_saved == 10000 - first.proxy_bytes > 0
+    assert first.tokens_saved == 30 * 32  # same frames sampled, no audio
+    # other settings, other proxy
+    ClipPreprocessor(str(tmp_path / "clip_proxies"), ProxySettings(max_height=360)).proxy(clip, "a" * 64)
+    assert len(ffmpeg.conversions) == 2
+
+
+def test_source_is_uploaded_when_ffmpeg_fails_or_is_missing(ffmpeg, clip, tmp_path, monkeypatch):
+    ffmpeg.fail = True
+    result = ClipPreprocessor(str(tmp_path / "clip_proxies")).proxy(clip)
+    assert result.proxy_path == clip and result.bytes_saved == 0
+    assert list((tmp_path / "clip_proxies").iterdir()) == []
+
+    monkeypatch.setattr(clip_preprocessing, "ffmpeg_available", lambda: False)
+    preprocessor = ClipPreprocessor(str(tmp_path / "clip_proxies"))
+    assert not preprocessor.enabled and preprocessor.proxy(clip).proxy_path == clip
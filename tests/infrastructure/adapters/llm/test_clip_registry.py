@@ -0,0 +1,87 @@
+import json
+import os
+import time
+from unittest import mock
+
+from src.ai_insights.infrastructure.adapters.llm import clip_registry
+from src.ai_insights.infrastructure.adapters.llm.clip_registry import ClipRegistry, analysis_key
+
+
+def test_analysis_key_depends_on_clip_context_and_prompt_version():
+    key = analysis_key("abc", "context", "v1")
+
+    assert key == analysis_key("abc", "context", "v1")
+    assert key != analysis_key("abd", "context", "v1")
+    assert key != analysis_key("abc", "other context", "v1")
+    assert key != analysis_key("abc", "context", "v2")
+
+
+def test_identical_files_have_the_same_hash_computed_once(tmp_path):
+    first, second = tmp_path / "nita_clip.mp4", tmp_path / "stu_clip.mp4"
+    first.write_bytes(b"same video")
+    second.write_bytes(b"same video")
+    registry = ClipRegistry(str(tmp_path / "registry.jsonl"))
+
+    with mock.patch.object(clip_registry, "file_sha256", wraps=clip_registry.file_sha256) as sha256:
+        assert registry.content_hash(str(first)) == registry.content_hash(str(second))
+        registry.content_hash(str(first))
+        assert sha256.call_count == 2
+
+        first.write_bytes(b"edited video")
+        os.utime(first, ns=(time.time_ns(), time.time_ns() + 1))
+        assert registry.content_hash(str(first)) != registry.content_hash(str(second))
+        assert sha256.call_count == 3
+
+
+def test_analyses_and_files_survive_a_reload(tmp_path):
+    path = str(tmp_path / "registry.jsonl")
+    registry = ClipRegistry(path)
+    registry.put_analysis("abc", "context", "v1", "Nita's bear wins the fight.", "nita_clip.mp4")
+    registry.put_file("abc", "files/123")
+
+    reloaded = ClipRegistry(path)
+
+    assert reloaded.get_analysis("abc", "context", "v1")["description"] == "Nita's bear wins the fight."
+    assert reloaded.get_analysis("abc", "context", "v2") is None
+    assert reloaded.get_file("abc") == "files/123"
+
+
+def test_expired_file_handles_are_not_reused(tmp_path):
+    registry = ClipRegistry(str(tmp_path / "registry.jsonl"), file_ttl_seconds=60)
+    registry.put_file("old", "files/1", uploaded_at=time.time() - 120)
+    registry.put_file("new", "files/2")
+
+    assert registry.get_file("old") is None
+    assert registry.get_file("new") == "files/2"
+    registry.forget_file("new")
+    assert registry.get_file("new") is None
+
+
+def test_changes_are_appended_one_line_each(tmp_path):
+    path = tmp_path / "registry.jsonl"
+    registry = ClipRegistry(str(path))
+    for i in range(3):
+        registry.put_analysis(f"clip{i}", "context", "v1", f"Analysis {i}.", f"clip{i}.mp4")
+    registry.put_file("clip0", "files/1")
+    registry.forget_file("clip0")
+
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 5
+    reloaded = ClipRegistry(str(path))
+    assert reloaded.get_analysis("clip2", "context", "v1")["description"] == "Analysis 2."
+    assert reloaded.get_file("clip0") is None
+
+
+def test_json_registry_is_migrated_and_compacted(tmp_path):
+    legacy_path, path = tmp_path / "registry.json", tmp_path / "registry.jsonl"
+    legacy_path.write_text(json.dumps({"analyses": {}, "files": {"abc": {"name": "files/1", "uploaded_at": time.time()}},
+                                       "hashes": {}}), encoding="utf-8")
+    registry = ClipRegistry(str(path))
+    assert not legacy_path.exists()
+    registry.put_file("abc", "files/2")
+    registry.put_file("abc", "files/3")
+
+    reloaded = ClipRegistry(str(path))
+
+    assert reloaded.get_file("abc") == "files/3"
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+    assert ClipRegistry(str(path)).get_file("abc") == "files/3"
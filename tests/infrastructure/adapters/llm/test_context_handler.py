@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm import context_handler
+from src.ai_insights.infrastructure.adapters.llm.context_handler import ContextHandler
+from src.ai_insights.infrastructure.adapters.llm.deadline import Deadline
+from src.ai_insights.infrastructure.adapters.llm.rag import MemoizedRetriever
+
+META = {"gameVersion": "58", "summary": "Tanks dominate.", "dominantBrawlers": ["Frank"]}
+CHARACTER = {"name": "Nita", "role": "Tank", "rarity": "Rare"}
+COMMUNITY = {"topic": "Nita tips", "summary": "Bear first."}
+
+
+@pytest.fixture(autouse=True)
+def empty_meta_cache(monkeypatch):
+    monkeypatch.setattr(context_handler, "_LAST_META_ITEMS", {})
+
+
+def _retriever(retrieve):
+    return SimpleNamespace(embedder=None, index=SimpleNamespace(ntotal=3), retrieve=retrieve)
+
+
+def _handler(retriever, deadline):
+    rag_retriever = retriever if isinstance(retriever, MemoizedRetriever) else _retriever(retriever)
+    return ContextHandler(game="brawl", user_id="%239JVU8RC", rag_retriever=rag_retriever, deadline=deadline)
+
+
+def _context(handler, name):
+    profile = {"tag": "#9JVU8RC", "name": name, "trophies": 20000, "brawlers": [{"name": "NITA", "trophies": 700}]}
+    return handler._build_llm_context(profile, {"items": []}, ["player_description"])["community_data"]
+
+
+def test_skipped_retrieval_reuses_only_the_meta_of_other_players():
+    retrieve = mock.Mock(return_value=[META, CHARACTER, COMMUNITY])
+    _context(_handler(retrieve, Deadline()), "first player")
+
+    deadline = Deadline(1)
+    context = _context(_handler(retrieve, deadline), "second player")
+
+    # the game and player retrievals of the first player only
+    assert retrieve.call_count == 2
+    assert deadline.skipped_stages == {"rag": "cached_meta"}
+    assert context["gameContext"]["currentMetaSummary"] == "Tanks dominate."
+    assert context["gameContext"]["characterData"] == []
+    assert context["meta"]["rag_cached"]
+
+
+def test_skipped_retrieval_without_cached_meta_has_insufficient_time():
+    deadline = Deadline(1)
+    context = _context(_handler(mock.Mock(), deadline), "player")
+
+    assert deadline.skipped_stages == {"rag": "insufficient_time"}
+    assert context["gameContext"]["currentMetaSummary"] == "N/A"
+
+
+def test_players_of_a_batch_share_the_game_retrieval():
+    retrieve = mock.Mock(side_effect=lambda query, top_k: [META] if query.startswith("Requested") else [CHARACTER])
+    memoized = MemoizedRetriever(_retriever(retrieve))
+
+    first = _context(_handler(memoized, Deadline()), "first player")
+    second = _context(_handler(memoized, Deadline()), "second player")
+
+    assert memoized.hits == 1 and memoized.misses == 3
+    assert retrieve.call_count == 3
+    for context in (first, second):
+        assert context["gameContext"]["currentMetaSummary"] == "Tanks dominate."
+        assert context["gameContext"]["characterData"] == [CHARACTER]
@@ -0,0 +1,102 @@
+import json
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.context_packer import (
+    ContextItem,
+    ContextPacker,
+    estimate_tokens,
+)
+from src.ai_insights.infrastructure.adapters.llm.prompt_generator import (
+    PromptGenerator,
+)
+
+
+@pytest.fixture
+def player_data():
+    with open("notebooks/player_data.json", "r") as f:
+        return json.load(f)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_pack_keeps_most_relevant_items_within_budget():
+    packer = ContextPacker(token_counter=len)
+    items = [
+        ContextItem(section="a", text="x" * 10, relevance=0.1),
+        ContextItem(section="a", text="y" * 10, relevance=0.9),
+        ContextItem(section="a", text="z" * 10, relevance=0.5),
+    ]
+    packed = packer.pack(items, budget=22)
+
+    assert [item.text[0] for item in packed.items] == ["y", "z"]
+    assert [item.text[0] for item in packed.dropped] == ["x"]
+    assert packed.tokens_used == 22
+
+
+def test_pack_skips_large_item_and_fills_with_smaller_ones():
+    packer = ContextPacker(token_counter=len)
+    items = [
+        ContextItem(section="a", text="big" * 10, relevance=0.9),
+        ContextItem(section="a", text="small", relevance=0.2),
+    ]
+    packed = packer.pack(items, budget=10)
+
+    assert [item.text for item in packed.items] == ["small"]
+
+
+def test_pack_always_includes_required_items():
+    packer = ContextPacker(token_counter=len)
+    items = [
+        ContextItem(section="a", text="optional", relevance=1.0),
+        ContextItem(section="b", text="required" * 5, required=True),
+    ]
+    packed = packer.pack(items, budget=5)
+
+    assert [item.section for item in packed.items] == ["b"]
+    assert packed.tokens_used > packed.budget
+
+
+def test_pack_preserves_original_order():
+    packer = ContextPacker(token_counter=len)
+    items = [
+        ContextItem(section="a", text="first", relevance=0.1),
+        ContextItem(section="a", text="second", relevance=0.9),
+    ]
+    packed = packer.pack(items, budget=100)
+
+    assert packed.section_text("a") == "first\nsecond"
+
+
+def test_generate_prompt_respects_budget_and_records_stats(player_data):
+    generator = PromptGenerator(token_budgets={"player_description": 500})
+    prompt = generator.generate_prompt(
+        context={"player_data": player_data["profile"]},
+        requested_task="player_description",
+    )
+    stats = generator.prompt_stats["player_description"]
+
+    assert stats["prompt_tokens"] == estimate_tokens(prompt)
+    assert stats["context_tokens"] <= 500
+    assert stats["items_dropped"] > 0
+    # the highest trophy brawler is always kept
+    top_brawler = max(player_data["profile"]["brawlers"], key=lambda b: b["trophies"])
+    assert top_brawler["name"] in prompt
+
+
+def test_generate_prompt_performance_summary_prefers_recent_battles(player_data):
+    generator = PromptGenerator(token_budgets={"performance_summary": 400})
+    prompt = generator.generate_prompt(
+        context={
+            "player_description": "An aggressive thrower main.",
+            "battle_logs": player_data["battlelog"],
+        },
+        requested_task="performance_summary",
+    )
+
+    assert "An aggressive thrower main." in prompt
+    assert player_data["battlelog"]["items"][0]["battleTime"] in prompt
+    assert player_data["battlelog"]["items"][-1]["battleTime"] not in prompt
@@ -0,0 +1,98 @@
+import json
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.context_projection import (
+    project_battle,
+    project_brawler,
+    project_profile,
+    serialize_battlelog,
+    serialize_profile,
+    to_compact_json,
+)
+
+
+@pytest.fixture
+def player_data():
+    with open("notebooks/player_data.json", "r") as f:
+        return json.load(f)
+
+
+def test_to_compact_json_is_stable():
+    assert to_compact_json({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+
+
+def test_project_profile_drops_icon_and_brawlers(player_data):
+    projected = project_profile(player_data["profile"])
+
+    assert projected["name"] == "Mikey"
+    assert projected["trophies"] == 11928
+    assert "icon" not in projected
+    assert "brawlers" not in projected
+    # empty clubs are omitted
+    assert "club" not in projected
+
+
+def test_project_brawler_keeps_item_names_for_recommendations():
+    brawler = {
+        "id": 16000001,
+        "name": "COLT",
+        "power": 9,
+        "rank": 15,
+        "trophies": 287,
+        "gears": [],
+        "starPowers": [{"id": 23000077, "name": "SLICK BOOTS"}],
+        "gadgets": [{"id": 23000273, "name": "SPEEDLOADER"}],
+    }
+
+    assert project_brawler(brawler, "recommendations") == {
+        "name": "COLT",
+        "power": 9,
+        "trophies": 287,
+        "starPowers": ["SLICK BOOTS"],
+        "gadgets": ["SPEEDLOADER"],
+    }
+    assert "gadgets" not in project_brawler(brawler, "player_description")
+
+
+def test_project_battle_splits_own_team():
+    battle_event = {
+        "battleTime": "20250516T053640.000Z",
+        "event": {"id": 15000018, "mode": "heist", "map": "Kaboom Canyon"},
+        "battle": {
+            "mode": "heist",
+            "result": "victory",
+            "starPlayer": {"tag": "#B", "brawler": {"name": "BROCK"}},
+            "teams": [
+                [
+                    {"tag": "#A", "name": "me", "brawler": {"name": "DYNAMIKE", "power": 11}},
+                    {"tag": "#B", "name": "mate", "brawler": {"name": "BROCK", "power": 11}},
+                ],
+                [
+                    {"tag": "#C", "name": "foe", "brawler": {"name": "LEON", "power": 11}},
+                    {"tag": "#D", "name": "foe2", "brawler": {"name": "SAM", "power": 11}},
+                ],
+            ],
+        },
+    }
+
+    assert project_battle(battle_event, player_tag="#A") == {
+        "time": "20250516T053640.000Z",
+        "mode": "heist",
+        "map": "Kaboom Canyon",
+        "result": "victory",
+        "starPlayer": False,
+        "brawler": "DYNAMIKE",
+        "allies": ["BROCK"],
+        "enemies": [["LEON", "SAM"]],
+    }
+
+
+def test_serialization_is_several_times_smaller(player_data):
+    profile, battlelog = player_data["profile"], player_data["battlelog"]
+    profile_lines = serialize_profile(profile)
+    battle_lines = serialize_battlelog(battlelog, profile["tag"])
+
+    assert len(profile_lines) == len(profile["brawlers"]) + 1
+    assert len(battle_lines) == len(battlelog["items"])
+    assert len("\n".join(battle_lines)) * 3 < len(str(battlelog))
+    assert len("\n".join(profile_lines)) * 2 < len(str(profile))
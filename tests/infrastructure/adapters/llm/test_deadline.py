@@ -0,0 +1,59 @@
+import math
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.deadline import Deadline, DeadlineExceeded
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.local_llm import LocalLLMConfig
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deadline_counts_down():
+    clock = FakeClock()
+    deadline = Deadline(budget_seconds=10, clock=clock)
+
+    clock.now += 4
+    assert deadline.remaining() == 6
+    assert deadline.allows(5) and not deadline.allows(7)
+    assert deadline.timeout(cap=2) == 2
+    assert deadline.timeout() == 6
+
+    clock.now += 10
+    assert deadline.remaining() == 0 and deadline.expired()
+    with pytest.raises(DeadlineExceeded, match="player_api"):
+        deadline.check("player_api")
+
+
+def test_no_deadline_never_expires():
+    deadline = Deadline()
+
+    assert deadline.remaining() == math.inf
+    assert deadline.allows(1e9)
+    assert deadline.timeout() is None
+    assert deadline.timeout(cap=10) == 10
+    deadline.check("anything")
+
+
+def test_skipped_stages_are_recorded():
+    deadline = Deadline(budget_seconds=1)
+
+    deadline.record_skip("rag", "insufficient_time")
+    deadline.record_skip("recommendations", "deadline_exceeded")
+
+    assert deadline.skipped_stages == {"rag": "insufficient_time", "recommendations": "deadline_exceeded"}
+
+
+def test_llm_call_times_out_at_the_deadline():
+    slow = LocalLLMConfig(latency_distribution="fixed", latency_median_seconds=5, tokens_per_second=0)
+    connector = LLMConnector(llm_provider="local", local_config=slow, deadline=Deadline(budget_seconds=0.05))
+
+    with pytest.raises(DeadlineExceeded):
+        connector.get_llm_response("Create player description")
+    with pytest.raises(DeadlineExceeded):
+        list(connector.stream_llm_response("Create player description"))
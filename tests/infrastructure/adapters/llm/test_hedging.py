@@ -0,0 +1,121 @@
+import threading
+import time
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.hedging import RequestHedger
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.local_llm import LocalLLMConfig
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+
+
+def _warm_hedger(**kwargs):
+    hedger = RequestHedger(min_samples=5, min_delay_seconds=0.01, **kwargs)
+    for _ in range(5):
+        hedger.observe(0.02)
+    return hedger
+
+
+def _first_call_slow(slow_seconds=1.0, results=("primary", "hedge")):
+    calls = []
+    lock = threading.Lock()
+
+    def fn():
+        with lock:
+            attempt = len(calls)
+            calls.append(attempt)
+        if attempt == 0:
+            time.sleep(slow_seconds)
+        return results[min(attempt, 1)]
+    return fn, calls
+
+
+def test_no_hedging_before_enough_latencies():
+    hedger = RequestHedger(min_samples=5)
+    fn, calls = _first_call_slow(slow_seconds=0.05)
+
+    assert hedger.hedge_delay() is None
+    assert hedger.call(fn) == "primary"
+    assert calls == [0]
+
+
+def test_hedge_delay_is_the_recent_percentile():
+    hedger = RequestHedger(percentile=90, window=10, min_samples=10, min_delay_seconds=0)
+    for seconds in range(1, 21):
+        hedger.observe(seconds)
+
+    # only the last 10 latencies (11..20) are considered
+    assert hedger.hedge_delay() == 19
+
+
+def test_slow_call_is_hedged_and_the_duplicate_wins():
+    hedger = _warm_hedger()
+    fn, calls = _first_call_slow()
+    wins = METRICS.counter("llm_hedge_wins_total", winner="hedge", model="m")
+    wins_before = wins.value
+    discarded = []
+
+    start = time.perf_counter()
+    assert hedger.call(fn, on_discarded=discarded.append, labels={"model": "m"}) == "hedge"
+
+    assert time.perf_counter() - start < 0.5
+    assert calls == [0, 1]
+    assert wins.value == wins_before + 1
+    # the losing call completes in the background and is reported
+    time.sleep(1.1)
+    assert discarded == ["primary"]
+
+
+def test_hedges_are_capped_by_the_budget():
+    hedger = _warm_hedger(max_extra_ratio=0, burst=1)
+    first, first_calls = _first_call_slow(slow_seconds=0.3)
+    second, second_calls = _first_call_slow(slow_seconds=0.3)
+
+    assert hedger.call(first) == "hedge"
+    assert hedger.call(second) == "primary"
+    assert len(first_calls) == 2 and len(second_calls) == 1
+
+
+def test_failed_attempt_waits_for_the_other():
+    hedger = _warm_hedger()
+    calls = []
+
+    def fn():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            time.sleep(0.2)
+            return "primary"
+        raise RuntimeError("hedge failed")
+
+    assert hedger.call(fn) == "primary"
+
+    def always_fails():
+        time.sleep(0.05)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError, match="down"):
+        hedger.call(always_fails)
+
+
+def test_failed_attempts_are_in_the_latency_window():
+    hedger = RequestHedger(percentile=100, min_samples=2, min_delay_seconds=0)
+
+    def slow_failure():
+        time.sleep(0.05)
+        raise RuntimeError("timeout")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            hedger.call(slow_failure)
+
+    assert hedger.hedge_delay() >= 0.05
+
+
+def test_connector_records_the_usage_of_the_hedged_call():
+    config = LocalLLMConfig(latency_distribution="fixed", latency_median_seconds=0.05, tokens_per_second=0)
+    connector = LLMConnector(llm_provider="local", local_config=config, hedger=_warm_hedger())
+
+    response = connector.get_llm_response("Create player description")
+
+    assert response
+    assert connector.last_prompt_token_count > 0
+    assert connector.client.calls == 2
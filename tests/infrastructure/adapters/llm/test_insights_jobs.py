@@ -0,0 +1,108 @@
+import threading
+
+from src.ai_insights.infrastructure.adapters.llm.insights_jobs import DONE, FAILED, InsightsJobQueue, publish_event
+
+
+def _blocking_job():
+    release = threading.Event()
+    calls = []
+
+    def run_job(tag):
+        calls.append(tag)
+        release.wait(5)
+        if tag == "BROKEN":
+            raise RuntimeError("API down")
+        return {"insights": {"player_description": tag}}
+    return run_job, calls, release
+
+
+def test_job_runs_in_the_background_and_can_be_polled():
+    run_job, calls, release = _blocking_job()
+    jobs = InsightsJobQueue(run_job, max_workers=2)
+
+    job, coalesced = jobs.submit("#9jvu8rc")
+    assert not coalesced
+    assert jobs.get(job.id).status in ("queued", "running")
+
+    release.set()
+    assert job.wait(5)
+    polled = jobs.get(job.id).to_dict()
+    assert polled["status"] == DONE
+    assert polled["result"] == {"insights": {"player_description": "9JVU8RC"}}
+    assert calls == ["9JVU8RC"]
+
+
+def test_requests_for_a_tag_in_flight_share_one_job():
+    run_job, calls, release = _blocking_job()
+    jobs = InsightsJobQueue(run_job, max_workers=2)
+
+    first, _ = jobs.submit("9JVU8RC")
+    second, coalesced = jobs.submit("%239jvu8rc")
+    other, other_coalesced = jobs.submit("2PP")
+    release.set()
+
+    assert coalesced and second is first
+    assert not other_coalesced and other is not first
+    assert first.wait(5) and other.wait(5)
+    assert sorted(calls) == ["2PP", "9JVU8RC"]
+    # finished: a new request computes the tag again
+    again, coalesced = jobs.submit("9JVU8RC")
+    assert not coalesced and again is not first
+
+
+def test_failed_job_reports_the_error():
+    run_job, _, release = _blocking_job()
+    release.set()
+    jobs = InsightsJobQueue(run_job)
+
+    job, _ = jobs.submit("broken")
+
+    assert job.wait(5)
+    assert job.status == FAILED
+    assert job.error == "API down"
+
+
+def test_finished_jobs_expire():
+    run_job, _, release = _blocking_job()
+    release.set()
+    jobs = InsightsJobQueue(run_job, ttl_seconds=0)
+
+    job, _ = jobs.submit("9JVU8RC")
+    job.wait(5)
+    jobs.submit("2PP")
+
+    assert jobs.get(job.id) is None
+    assert jobs.get("unknown") is None
+
+
+def test_events_published_by_the_job_are_followed_as_they_come():
+    release = threading.Event()
+
+    def run_job(tag):
+        publish_event({"event": "section_done", "section": "player_description", "text": tag})
+        release.wait(5)
+        publish_event({"event": "end"})
+        return {}
+
+    jobs = InsightsJobQueue(run_job)
+    job, _ = jobs.submit("9JVU8RC")
+
+    first = job.events_after(0, timeout=5)
+    assert first == [{"event": "section_done", "section": "player_description", "text": "9JVU8RC"}]
+    release.set()
+    assert job.events_after(1, timeout=5) == [{"event": "end"}]
+    assert job.wait(5)
+    assert job.events_after(2, timeout=5) == []
+    publish_event({"event": "outside a job"})
+    assert len(job.events) == 2
+
+
+def test_failed_job_publishes_the_error():
+    run_job, _, release = _blocking_job()
+    release.set()
+    jobs = InsightsJobQueue(run_job)
+
+    job, _ = jobs.submit("broken")
+
+    assert job.wait(5)
+    assert job.events_after(0) == [{"event": "error", "message": "API down"}]
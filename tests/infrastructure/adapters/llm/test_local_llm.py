@@ -0,0 +1,112 @@
+import asyncio
+import json
+import pytest
+from unittest import mock
+
+from google.genai import errors
+
+from src.ai_insights.infrastructure.adapters.llm import api_service
+from src.ai_insights.infrastructure.adapters.llm.api_service import ApiService
+from src.ai_insights.infrastructure.adapters.llm.async_llm_connector import AsyncLLMConnector
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.local_llm import LocalLLMClient, LocalLLMConfig
+from src.ai_insights.infrastructure.adapters.llm.prompt_generator import FUSED_INSIGHTS_PROMPT, RECOMMENDATIONS_PROMPT
+
+INSTANT = LocalLLMConfig(latency_distribution="fixed", latency_median_seconds=0, tokens_per_second=0)
+RECOMMENDATION_KEYS = {"brawler_name", "reasoning", "suggested_game_modes", "concise_tip", "confidence_score"}
+
+
+def _recommendations_prompt(player="Mikey"):
+    return RECOMMENDATIONS_PROMPT.format(player_description=player, performance_summary="", community_data="")
+
+
+def test_recommendations_are_schema_valid_and_deterministic():
+    connector = LLMConnector(llm_provider="local", local_config=INSTANT)
+
+    response = connector.get_llm_response(_recommendations_prompt())
+    recommendations = json.loads(response)["recommendations"]
+
+    assert len(recommendations) == 3
+    assert all(set(rec) == RECOMMENDATION_KEYS for rec in recommendations)
+    assert LLMConnector(llm_provider="local", local_config=INSTANT).get_llm_response(_recommendations_prompt()) == response
+    assert connector.last_prompt_token_count > 0
+
+
+def test_fused_prompt_gets_all_sections():
+    client = LocalLLMClient(INSTANT)
+    prompt = FUSED_INSIGHTS_PROMPT.format(player_data="{}", battle_logs="[]", community_data="{}")
+
+    response = json.loads(client.models.generate_content(model="local", contents=prompt).text)
+
+    assert set(response) == {"player_description", "performance_summary", "recommendations"}
+
+
+def test_stream_is_paced_by_token_rate():
+    config = LocalLLMConfig(latency_distribution="fixed", latency_median_seconds=0, tokens_per_second=10_000)
+    client = LocalLLMClient(config)
+    prompt = _recommendations_prompt()
+
+    chunks = [chunk.text for chunk in client.models.generate_content_stream(model="local", contents=prompt)]
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == client.models.generate_content(model="local", contents=prompt).text
+
+
+def test_latency_distribution_is_seeded():
+    config = LocalLLMConfig(latency_distribution="lognormal", latency_median_seconds=1.0, latency_sigma=0.5, seed=7)
+    first = [LocalLLMClient(config)._plan(_recommendations_prompt(f"p{ix}"))[0][0][0] for ix in range(5)]
+    second = [LocalLLMClient(config)._plan(_recommendations_prompt(f"p{ix}"))[0][0][0] for ix in range(5)]
+
+    assert first == second
+    assert len(set(first)) == 5
+
+
+def test_call_counts_are_kept_for_the_recent_prompts_only():
+    client = LocalLLMClient(INSTANT, max_tracked_prompts=2)
+    for ix in range(5):
+        client.models.generate_content(model="local", contents=_recommendations_prompt(f"p{ix}"))
+    client.models.generate_content(model="local", contents=_recommendations_prompt("p3"))
+
+    assert len(client._calls_per_prompt) == 2
+    assert list(client._calls_per_prompt.values()) == [1, 2]
+    assert client.calls == 6
+
+
+def test_injected_errors_are_retried_by_async_connector():
+    config = LocalLLMConfig(latency_distribution="fixed", latency_median_seconds=0, error_rate=0.5, error_codes=(503,))
+    connector = AsyncLLMConnector(llm_provider="local", local_config=config, base_retry_delay=0.001, max_retries=20)
+
+    async def run_all():
+        return await asyncio.gather(*(connector.get_llm_response(_recommendations_prompt(f"p{ix}")) for ix in range(20)))
+
+    responses = asyncio.run(run_all())
+
+    assert all("recommendations" in json.loads(response) for response in responses)
+    assert connector.retries > 0
+
+
+def test_error_rate_one_always_fails():
+    client = LocalLLMClient(LocalLLMConfig(error_rate=1.0, error_codes=(429,)))
+
+    with pytest.raises(errors.ClientError):
+        client.models.generate_content(model="local", contents="prompt")
+
+
+def test_api_service_selects_local_provider():
+    with open("notebooks/player_data.json", "r") as f:
+        player_data = json.load(f)
+    handler = mock.Mock()
+    handler.fetch_player_data.return_value = (player_data["profile"], player_data["battlelog"])
+    handler.build_llm_context.return_value = {
+        "player_data": player_data["profile"],
+        "battle_logs": player_data["battlelog"],
+        "community_data": {},
+    }
+
+    with mock.patch.object(api_service, "ContextHandler", return_value=handler):
+        insights = ApiService(
+            game="brawl", user_id="%239JVU8RC", llm_provider="local", local_config=INSTANT
+        ).get_ai_insights()
+
+    assert len(json.loads(insights["recommendations"])["recommendations"]) == 3
+    assert "player description" in json.loads(insights["player_description"])
@@ -0,0 +1,118 @@
+import os
+import pytest
+from unittest import mock
+
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.response_cache import (
+    DiskResponseCache,
+    InMemoryResponseCache,
+    make_cache_key,
+)
+
+
+def test_make_cache_key_depends_on_every_field():
+    key = make_cache_key("google", "gemini-2.0-flash", "prompt", {"temperature": 0})
+
+    assert key == make_cache_key("google", "gemini-2.0-flash", "prompt", {"temperature": 0})
+    assert key != make_cache_key("google", "gemini-2.0-flash", "prompt ", {"temperature": 0})
+    assert key != make_cache_key("google", "gemini-1.5-flash", "prompt", {"temperature": 0})
+    assert key != make_cache_key("mock", "gemini-2.0-flash", "prompt", {"temperature": 0})
+    assert key != make_cache_key("google", "gemini-2.0-flash", "prompt", {"temperature": 1})
+
+
+@pytest.fixture(params=["memory", "disk"])
+def cache_factory(request, tmp_path):
+    def build(**kwargs):
+        if request.param == "memory":
+            return InMemoryResponseCache(**kwargs)
+        return DiskResponseCache(cache_dir=str(tmp_path), **kwargs)
+
+    return build
+
+
+def test_cache_get_and_set(cache_factory):
+    cache = cache_factory()
+
+    assert cache.get("key") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+
+def test_cache_expires_entries(cache_factory):
+    cache = cache_factory(ttl_seconds=10)
+    with mock.patch("time.time", return_value=1000.0):
+        cache.set("key", "value")
+    with mock.patch("time.time", return_value=1005.0):
+        assert cache.get("key") == "value"
+    with mock.patch("time.time", return_value=1011.0):
+        assert cache.get("key") is None
+
+
+def test_cache_evicts_oldest_entries(cache_factory):
+    cache = cache_factory(max_entries=2)
+    with mock.patch("os.path.getmtime", side_effect=lambda path: ["a", "b", "c"].index(path[-6])):
+        for key in ["a", "b", "c"]:
+            cache.set(key, key)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+    assert cache.get("c") == "c"
+
+
+def test_disk_cache_scans_the_directory_only_when_full(tmp_path):
+    cache = DiskResponseCache(cache_dir=str(tmp_path), max_entries=20)
+    with mock.patch("os.listdir", wraps=os.listdir) as listdir:
+        for ix in range(20):
+            cache.set(f"key{ix}", "value")
+        assert listdir.call_count == 0
+
+        cache.set("key20", "value")
+
+    assert listdir.call_count == 1
+    assert len(os.listdir(tmp_path)) == 18
+
+
+def test_disk_cache_eviction_tolerates_entries_removed_meanwhile(tmp_path):
+    cache = DiskResponseCache(cache_dir=str(tmp_path), max_entries=2)
+    cache.set("a", "a")
+    cache.set("b", "b")
+
+    def getmtime(path):
+        if path.endswith("a.json"):
+            raise FileNotFoundError(path)
+        return 0.0
+
+    with mock.patch("os.path.getmtime", side_effect=getmtime):
+        cache.set("c", "c")
+
+    assert cache.get("b") == "b" and cache.get("c") == "c"
+
+
+def _connector(cache):
+    connector = LLMConnector(api_key="test-key", cache=cache)
+    connector.client = mock.Mock()
+    connector.client.models.generate_content.return_value = mock.Mock(
+        text="response", usage_metadata=mock.Mock(prompt_token_count=42)
+    )
+    return connector
+
+
+def test_llm_connector_serves_identical_prompts_from_cache():
+    connector = _connector(InMemoryResponseCache())
+
+    assert connector.get_llm_response("prompt") == "response"
+    assert connector.last_prompt_token_count == 42
+    assert connector.get_llm_response("prompt") == "response"
+    assert connector.last_prompt_token_count == 0
+    assert connector.client.models.generate_content.call_count == 1
+
+    connector.get_llm_response("other prompt")
+    assert connector.client.models.generate_content.call_count == 2
+
+
+def test_llm_connector_cache_bypass():
+    connector = _connector(InMemoryResponseCache())
+    connector.get_llm_response("prompt")
+    connector.get_llm_response("prompt", use_cache=False)
+
+    assert connector.client.models.generate_content.call_count == 2
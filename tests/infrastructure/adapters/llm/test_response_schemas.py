@@ -0,0 +1,102 @@
+import json
+import numpy as np
+import pytest
+from unittest import mock
+
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector, StructuredOutputError
+from src.ai_insights.infrastructure.adapters.llm.response_cache import InMemoryResponseCache, make_cache_key
+from src.ai_insights.infrastructure.adapters.llm.response_schemas import (
+    RECOMMENDATIONS_SCHEMA,
+    json_output_config,
+    parse_recommendations,
+    to_recommended_character_dtos,
+)
+
+VALID = json.dumps(
+    {
+        "recommendations": [
+            {
+                "brawler_name": "Spike",
+                "reasoning": "r",
+                "suggested_game_modes": ["gemGrab"],
+                "concise_tip": "t",
+                "confidence_score": 0.8,
+            }
+        ]
+    }
+)
+
+
+def test_parse_recommendations_accepts_fences_and_legacy_fields():
+    legacy = '```json\n{"recommendations": [{"brawler_name": "Spike", "tip": "t", "confidence_score": "85"}]}\n```'
+
+    recommendation = parse_recommendations(legacy)["recommendations"][0]
+
+    assert recommendation["concise_tip"] == "t"
+    assert recommendation["confidence_score"] == 0.85
+    assert recommendation["suggested_game_modes"] == []
+
+
+@pytest.mark.parametrize(
+    "response",
+    ["not json", '{"recommendations": []}', '{"recommendations": [{"concise_tip": "t"}]}', '{"other": 1}'],
+)
+def test_parse_recommendations_rejects_invalid_responses(response):
+    with pytest.raises(ValueError):
+        parse_recommendations(response)
+
+
+def test_to_recommended_character_dtos():
+    recommendations = parse_recommendations(VALID)["recommendations"]
+
+    dtos = to_recommended_character_dtos(recommendations, {"SPIKE": 16000005}, [np.ones(3)])
+
+    assert dtos[0].character_id == 16000005
+    assert dtos[0].reasoning == "t"
+    assert dtos[0].confidence_score == 0.8
+    assert dtos[0].embedding.vector.shape == (3,)
+
+
+def _connector(responses, cache=None):
+    connector = LLMConnector(api_key="test-key", cache=cache)
+    connector.client = mock.Mock()
+    connector.client.models.generate_content.side_effect = [mock.Mock(text=text) for text in responses]
+    return connector
+
+
+def test_get_structured_response_sends_schema():
+    connector = _connector([VALID])
+
+    parsed = connector.get_structured_response("prompt", parse_recommendations, RECOMMENDATIONS_SCHEMA)
+
+    assert parsed["recommendations"][0]["brawler_name"] == "Spike"
+    config = connector.client.models.generate_content.call_args.kwargs["config"]
+    assert config == json_output_config(RECOMMENDATIONS_SCHEMA)
+
+
+def test_invalid_response_is_repaired_and_cache_fixed():
+    cache = InMemoryResponseCache()
+    connector = _connector(["{broken", VALID], cache=cache)
+
+    parsed = connector.get_structured_response("prompt", parse_recommendations, RECOMMENDATIONS_SCHEMA)
+
+    assert parsed["recommendations"][0]["concise_tip"] == "t"
+    repair_prompt = connector.client.models.generate_content.call_args.kwargs["contents"]
+    assert "{broken" in repair_prompt
+    key = make_cache_key("google", connector.model_name, "prompt", json_output_config(RECOMMENDATIONS_SCHEMA))
+    assert cache.get(key) == VALID
+
+
+def test_prompt_is_retried_when_repair_fails():
+    connector = _connector(["{broken", "still broken", VALID])
+
+    connector.get_structured_response("prompt", parse_recommendations)
+
+    assert connector.client.models.generate_content.call_args.kwargs["contents"] == "prompt"
+
+
+def test_structured_output_error_after_retry():
+    connector = _connector(["{broken", "still broken", "{}"])
+
+    with pytest.raises(StructuredOutputError):
+        connector.get_structured_response("prompt", parse_recommendations)
@@ -0,0 +1,70 @@
+import json
+import pytest
+from unittest import mock
+
+from src.ai_insights.infrastructure.adapters.llm.semantic_cache import (
+    SemanticResponseCache,
+    build_semantic_key,
+    trophy_band,
+)
+
+
+@pytest.fixture
+def player_data():
+    with open("notebooks/player_data.json", "r") as f:
+        return json.load(f)
+
+
+def test_build_semantic_key_ignores_player_specific_details(player_data):
+    profile, battlelog = player_data["profile"], player_data["battlelog"]
+    key = build_semantic_key("recommendations", profile, battlelog)
+
+    assert key.startswith("task: recommendations | mains: ")
+    assert "trophies" not in key and "Mikey" not in key
+    assert trophy_band(profile) == "10000-11999"
+
+    other_profile = {**profile, "name": "Someone", "tag": "#OTHER", "trophies": profile["trophies"] + 50}
+    assert build_semantic_key("recommendations", other_profile, battlelog) == key
+    assert trophy_band(other_profile) == trophy_band(profile)
+
+
+def test_lookup_reuses_similar_keys_only(bag_of_words_embedder):
+    cache = SemanticResponseCache(embedder=bag_of_words_embedder, similarity_threshold=0.9)
+    key = "task: recommendations | mains: SPIKE, STU, MAX, BO, LEON | modes: knockout 60%"
+    cache.store("recommendations", key, "response", index_version="v1", partition="10000-11999")
+
+    assert cache.lookup("recommendations", key, index_version="v1", partition="10000-11999") == "response"
+    assert cache.lookup("player_description", key, index_version="v1", partition="10000-11999") is None
+    assert (
+        cache.lookup(
+            "recommendations",
+            "task: recommendations | mains: SHELLY, COLT, BULL, RICO, CROW | modes: knockout 60%",
+            index_version="v1",
+            partition="10000-11999",
+        )
+        is None
+    )
+    # the same mains and modes in another trophy band are never served
+    assert cache.lookup("recommendations", key, index_version="v1", partition="40000-41999") is None
+    assert cache.hits == 1
+    assert cache.misses == 3
+
+
+def test_entries_expire_with_ttl_and_index_version(bag_of_words_embedder):
+    cache = SemanticResponseCache(embedder=bag_of_words_embedder, ttl_seconds=10)
+    with mock.patch("time.time", return_value=1000.0):
+        cache.store("recommendations", "key", "response", index_version="v1")
+    with mock.patch("time.time", return_value=1005.0):
+        assert cache.lookup("recommendations", "key", index_version="v1") == "response"
+        assert cache.lookup("recommendations", "key", index_version="v2") is None
+    with mock.patch("time.time", return_value=1011.0):
+        assert cache.lookup("recommendations", "key", index_version="v1") is None
+
+
+def test_store_evicts_oldest_entries(bag_of_words_embedder):
+    cache = SemanticResponseCache(embedder=bag_of_words_embedder, max_entries_per_task=2)
+    for ix in range(3):
+        cache.store("recommendations", f"key{ix}", f"response{ix}")
+
+    assert cache.lookup("recommendations", "key0") is None
+    assert cache.lookup("recommendations", "key2") == "response2"
@@ -0,0 +1,81 @@
+import time
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.stage_graph import Stage, StageGraph
+
+
+def _sleep_and_return(value, seconds=0.2):
+    def run(results):
+        time.sleep(seconds)
+        return value
+
+    return run
+
+
+def test_run_passes_dependency_results():
+    graph = StageGraph(
+        [
+            Stage("a", lambda results: 1),
+            Stage("b", lambda results: results["a"] + 1, deps=["a"]),
+            Stage("c", lambda results: results["a"] + results["b"], deps=["a", "b"]),
+        ]
+    )
+    results = graph.run()
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert set(graph.timings) == {"a", "b", "c"}
+
+
+def test_independent_stages_run_concurrently():
+    graph = StageGraph(
+        [
+            Stage("a", _sleep_and_return(1)),
+            Stage("b", _sleep_and_return(2)),
+            Stage("c", _sleep_and_return(3)),
+            Stage("d", lambda results: results["a"] + results["b"] + results["c"], deps=["a", "b", "c"]),
+        ]
+    )
+    start = time.perf_counter()
+    results = graph.run()
+    elapsed = time.perf_counter() - start
+
+    assert results["d"] == 6
+    assert elapsed < 0.5
+
+
+def test_run_skips_stages_with_initial_results():
+    calls = []
+    graph = StageGraph(
+        [
+            Stage("a", lambda results: calls.append("a") or 10),
+            Stage("b", lambda results: results["a"] * 2, deps=["a"]),
+        ]
+    )
+    results = graph.run({"a": 5})
+
+    assert results["b"] == 10
+    assert calls == []
+
+
+def test_run_raises_stage_errors():
+    def fail(results):
+        raise RuntimeError("boom")
+
+    graph = StageGraph([Stage("a", fail), Stage("b", lambda results: 1, deps=["a"])])
+
+    with pytest.raises(RuntimeError, match="boom"):
+        graph.run()
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown stage"):
+        StageGraph([Stage("a", lambda results: 1, deps=["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        StageGraph(
+            [
+                Stage("a", lambda results: 1, deps=["b"]),
+                Stage("b", lambda results: 1, deps=["a"]),
+            ]
+        )
+    with pytest.raises(ValueError, match="Duplicated"):
+        StageGraph([Stage("a", lambda results: 1), Stage("a", lambda results: 2)])
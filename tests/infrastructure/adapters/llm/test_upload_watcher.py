@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.upload_watcher import UploadStatusWatcher
+
+
+class FakeFiles:
+    """Stand-in of the Gemini File API: a file is processed `seconds_per_mb` per MB after its upload."""
+
+    def __init__(self, seconds_per_mb=0.05, failing=()):
+        self.seconds_per_mb = seconds_per_mb
+        self.failing = failing
+        self.polls = Counter()
+        self._ready_at = {}
+        self._lock = threading.Lock()
+
+    def upload(self, name, size_bytes):
+        self._ready_at[name] = time.monotonic() + self.seconds_per_mb * size_bytes / 1_000_000
+        return SimpleNamespace(name=name, state=SimpleNamespace(name="PROCESSING"))
+
+    def get_file(self, name):
+        with self._lock:
+            self.polls[name] += 1
+        if time.monotonic() < self._ready_at[name]:
+            state = "PROCESSING"
+        else:
+            state = "FAILED" if name in self.failing else "ACTIVE"
+        return SimpleNamespace(name=name, state=SimpleNamespace(name=state))
+
+
+def test_one_watcher_resolves_every_upload():
+    files = FakeFiles(failing=("files/b",))
+    watcher = UploadStatusWatcher(get_file=files.get_file, min_poll_seconds=0.01, max_polls_per_second=1000)
+
+    futures = {name: watcher.watch(files.upload(name, 1_000_000), 1_000_000) for name in ("files/a", "files/b", "files/c")}
+
+    states = {name: future.result(timeout=2).state.name for name, future in futures.items()}
+    assert states == {"files/a": "ACTIVE", "files/b": "FAILED", "files/c": "ACTIVE"}
+    assert watcher.pending_count == 0
+    # an already processed file is not polled
+    done = SimpleNamespace(name="files/d", state=SimpleNamespace(name="ACTIVE"))
+    assert watcher.watch(done).result(timeout=0) is done and files.polls["files/d"] == 0
+
+
+def test_polls_follow_the_observed_processing_time():
+    files = FakeFiles(seconds_per_mb=0.05)
+    watcher = UploadStatusWatcher(get_file=files.get_file, min_poll_seconds=0.01, max_polls_per_second=1000)
+    for name in ("files/warmup-1", "files/warmup-2"):
+        watcher.watch(files.upload(name, 1_000_000), 1_000_000).result(timeout=2)
+    assert watcher.seconds_per_mb == pytest.approx(0.05, abs=0.03)
+
+    # 10 MB: processed in 0.5s, i.e. 50 polls at the minimum interval
+    start = time.monotonic()
+    watcher.watch(files.upload("files/long", 10_000_000), 10_000_000).result(timeout=3)
+
+    assert time.monotonic() - start < 0.8
+    assert files.polls["files/long"] <= 5
+
+
+def test_failing_polls_and_stuck_files_fail_the_future():
+    def broken(name):
+        raise ConnectionError("unreachable")
+
+    watcher = UploadStatusWatcher(get_file=broken, min_poll_seconds=0.01, max_errors=2, max_polls_per_second=1000)
+    with pytest.raises(ConnectionError):
+        watcher.watch(FakeFiles().upload("files/a", 1), 1).result(timeout=2)
+
+    stuck = FakeFiles(seconds_per_mb=100)
+    watcher = UploadStatusWatcher(get_file=stuck.get_file, min_poll_seconds=0.01, timeout_seconds=0.1,
+                                  max_polls_per_second=1000)
+    with pytest.raises(TimeoutError):
+        watcher.watch(stuck.upload("files/a", 1_000_000), 1_000_000).result(timeout=2)
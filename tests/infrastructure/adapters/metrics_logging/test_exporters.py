@@ -0,0 +1,47 @@
+import io
+import json
+
+from src.ai_insights.infrastructure.adapters.metrics_logging.exporters import (
+    JsonLinesExporter,
+    PrometheusTextExporter,
+)
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import MetricsRegistry
+
+
+def _registry():
+    registry = MetricsRegistry()
+    registry.counter("llm_requests_total", model="gemini").inc(3)
+    histogram = registry.histogram("llm_request_seconds", buckets=[1.0, 5.0], model="gemini")
+    for value in [0.5, 2.0, 10.0]:
+        histogram.observe(value)
+    return registry
+
+
+def test_prometheus_text_format(tmp_path):
+    path = tmp_path / "metrics.prom"
+    exporter = PrometheusTextExporter(str(path))
+
+    exporter.export(_registry().collect())
+
+    assert exporter.text.splitlines() == [
+        "# TYPE llm_request_seconds histogram",
+        'llm_request_seconds_bucket{model="gemini",le="1"} 1',
+        'llm_request_seconds_bucket{model="gemini",le="5"} 2',
+        'llm_request_seconds_bucket{model="gemini",le="+Inf"} 3',
+        'llm_request_seconds_sum{model="gemini"} 12.5',
+        'llm_request_seconds_count{model="gemini"} 3',
+        "# TYPE llm_requests_total counter",
+        'llm_requests_total{model="gemini"} 3',
+    ]
+    assert path.read_text() == exporter.text
+
+
+def test_json_lines_exporter():
+    stream = io.StringIO()
+
+    JsonLinesExporter(stream=stream).export(_registry().collect())
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["name"] for line in lines] == ["llm_request_seconds", "llm_requests_total"]
+    assert lines[1]["value"] == 3
+    assert "timestamp" in lines[0]
@@ -0,0 +1,24 @@
+from src.ai_insights.infrastructure.adapters.metrics_logging.histogram import Histogram
+
+
+def test_histogram_counts_values_in_buckets():
+    histogram = Histogram(buckets=[1.0, 2.0])
+    for value in [0.5, 1.0, 1.5, 3.0]:
+        histogram.observe(value)
+
+    assert histogram.bucket_counts() == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 6.0
+
+
+def test_histogram_percentiles():
+    histogram = Histogram(buckets=[1.0, 2.0, 5.0])
+    assert histogram.percentile(50) is None
+
+    for value in [0.1] * 90 + [1.5] * 9 + [10.0]:
+        histogram.observe(value)
+
+    assert histogram.percentile(50) == 1.0
+    assert histogram.percentile(99) == 2.0
+    assert histogram.percentile(100) == float("inf")
+    assert histogram.snapshot()["count"] == 100
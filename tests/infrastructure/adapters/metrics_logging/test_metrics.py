@@ -0,0 +1,75 @@
+import pytest
+
+from src.ai_insights.infrastructure.adapters.llm.llm_connector import LLMConnector
+from src.ai_insights.infrastructure.adapters.llm.local_llm import LocalLLMConfig
+from src.ai_insights.infrastructure.adapters.llm.prompt_generator import RECOMMENDATIONS_PROMPT
+from src.ai_insights.infrastructure.adapters.llm.response_cache import InMemoryResponseCache
+from src.ai_insights.infrastructure.adapters.metrics_logging.exporters import InMemoryExporter
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS, MetricsRegistry
+
+
+def test_counters_and_timers_are_keyed_by_labels():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", model="a").inc()
+    registry.counter("requests_total", model="a").inc(2)
+    registry.counter("requests_total", model="b").inc()
+    with registry.timer("request_seconds", model="a"):
+        pass
+
+    samples = {(s["name"], s["labels"].get("model")): s for s in registry.collect()}
+
+    assert samples[("requests_total", "a")]["value"] == 3
+    assert samples[("requests_total", "b")]["value"] == 1
+    assert samples[("request_seconds", "a")]["count"] == 1
+    assert samples[("request_seconds", "a")]["buckets"][-1] == (float("inf"), 1)
+
+
+def test_timer_records_failing_blocks():
+    registry = MetricsRegistry()
+    with pytest.raises(RuntimeError):
+        with registry.timer("request_seconds"):
+            raise RuntimeError("boom")
+
+    assert registry.histogram("request_seconds").count == 1
+
+
+def test_metric_type_conflicts_are_rejected():
+    registry = MetricsRegistry()
+    registry.counter("requests")
+
+    with pytest.raises(ValueError):
+        registry.histogram("requests")
+    with pytest.raises(ValueError):
+        registry.counter("requests").inc(-1)
+
+
+def test_export_sends_samples_to_exporters():
+    registry = MetricsRegistry()
+    exporter = InMemoryExporter()
+    registry.add_exporter(exporter)
+    registry.counter("requests_total", model="a").inc()
+
+    registry.export()
+
+    assert exporter.value("requests_total", model="a") == 1
+    assert exporter.value("requests_total", model="b") is None
+
+
+def test_llm_connector_records_tokens_latency_and_cache_hits():
+    METRICS.reset()
+    config = LocalLLMConfig(latency_distribution="fixed", latency_median_seconds=0, tokens_per_second=0)
+    connector = LLMConnector(llm_provider="local", local_config=config, cache=InMemoryResponseCache())
+    prompt = RECOMMENDATIONS_PROMPT.format(player_description="", performance_summary="", community_data="")
+
+    connector.get_llm_response(prompt)
+    connector.get_llm_response(prompt)
+
+    exporter = InMemoryExporter()
+    exporter.export(METRICS.collect())
+    assert exporter.value("llm_requests_total", cache="miss") == 1
+    assert exporter.value("llm_requests_total", cache="hit") == 1
+    # the cached call is not billed
+    assert exporter.value("llm_prompt_tokens_total") > 0
+    assert connector.last_prompt_token_count == 0
+    assert exporter.value("llm_output_tokens_total") > 0
+    assert exporter.value("llm_request_seconds", provider="local") == 1
@@ -0,0 +1,117 @@
+import json
+import pytest
+from unittest import mock
+
+from src.ai_insights.application.use_cases.list_replays_by_recom import list_replays_by_recom
+from src.ai_insights.infrastructure.adapters.llm.stage_graph import Stage, StageGraph
+from src.ai_insights.infrastructure.adapters.metrics_logging import tracing
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import (
+    InMemorySpanExporter,
+    JsonLinesSpanExporter,
+    OTLPHttpSpanExporter,
+    Tracer,
+)
+
+
+def test_spans_are_linked_to_their_parent():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter)
+
+    with tracer.span("request", user_id="A") as root:
+        with tracer.span("llm_call") as child:
+            child.set_attribute("prompt_tokens", 100)
+
+    assert [span.name for span in exporter.spans] == ["llm_call", "request"]
+    assert child.parent_id == root.span_id
+    assert child.trace_id == root.trace_id
+    assert root.attributes == {"user_id": "A"}
+    assert child.attributes == {"prompt_tokens": 100}
+    assert root.duration_seconds >= child.duration_seconds
+
+
+def test_failing_block_marks_span_as_error():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter)
+
+    with pytest.raises(RuntimeError):
+        with tracer.span("request"):
+            raise RuntimeError("API down")
+
+    assert exporter.spans[0].status == "error"
+    assert "API down" in exporter.spans[0].error
+
+
+def test_sampling_is_decided_for_the_whole_trace():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+
+    with tracer.span("request"):
+        with tracer.span("llm_call"):
+            pass
+    assert exporter.spans == []
+
+    with tracer.span("request", force_sample=True):
+        with tracer.span("llm_call"):
+            pass
+    assert len(exporter.spans) == 2
+
+
+def test_tracer_without_exporter_is_a_noop():
+    with Tracer().span("request") as span:
+        span.set_attribute("ignored", 1)
+        assert tracing.current_span() is None
+
+
+def test_stage_spans_are_children_of_the_caller_span():
+    exporter = InMemorySpanExporter()
+    with mock.patch.object(tracing.TRACER, "exporter", exporter):
+        with tracing.TRACER.span("request") as root:
+            StageGraph([Stage("a", lambda r: 1), Stage("b", lambda r: r["a"] + 1, deps=["a"])]).run()
+
+    stage_spans = [span for span in exporter.spans if span.name.startswith("stage.")]
+    assert sorted(span.name for span in stage_spans) == ["stage.a", "stage.b"]
+    assert all(span.parent_id == root.span_id for span in stage_spans)
+
+
+def test_list_replays_by_recom_is_traced():
+    exporter = InMemorySpanExporter()
+    game_api_client = mock.Mock()
+    game_api_client.retrieve_data.return_value = {"ids": []}
+    replays_repo = mock.Mock()
+    replays_repo.get.return_value = []
+
+    list_replays_by_recom({"endpoint": "/v1/rankings", "filters": []}, game_api_client, replays_repo,
+                          tracer=Tracer(exporter))
+
+    assert exporter.spans[0].name == "list_replays_by_recom"
+    assert exporter.spans[0].attributes == {"endpoint": "/v1/rankings", "replays": 0}
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(JsonLinesSpanExporter(str(path)))
+
+    with tracer.span("request", user_id="A"):
+        pass
+
+    line = json.loads(path.read_text())
+    assert line["name"] == "request"
+    assert line["attributes"] == {"user_id": "A"}
+
+
+def test_otlp_exporter_posts_batches():
+    exporter = OTLPHttpSpanExporter("http://collector/v1/traces", batch_size=2)
+    tracer = Tracer(exporter)
+
+    with mock.patch.object(tracing.requests, "post") as post:
+        with tracer.span("request", tokens=10):
+            pass
+        assert post.call_count == 0
+        with tracer.span("request"):
+            pass
+
+    payload = post.call_args.kwargs["json"]
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 2
+    assert spans[0]["attributes"] == [{"key": "tokens", "value": {"intValue": "10"}}]
+    assert len(spans[0]["traceId"]) == 32
@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+import json
 import sys
 import os
 
@@ -7,28 +8,190 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
-from src.ai_insights.infrastructure.adapters.llm.api_service import ApiService
+from src.ai_insights.infrastructure.adapters.database.insights_store import InsightsStore
+from src.ai_insights.infrastructure.adapters.llm.api_service import INSIGHT_SECTIONS, ApiService
+from src.ai_insights.infrastructure.adapters.llm.async_llm_connector import AsyncConnectorClient, get_async_llm_connector
+from src.ai_insights.infrastructure.adapters.llm.deadline import Deadline
+from src.ai_insights.infrastructure.adapters.llm.hedging import RequestHedger
+from src.ai_insights.infrastructure.adapters.llm.insights_jobs import InsightsJobQueue, publish_event
+from src.ai_insights.infrastructure.adapters.llm.response_cache import InMemoryResponseCache
+from src.ai_insights.infrastructure.adapters.llm.semantic_cache import SemanticResponseCache
+from src.ai_insights.infrastructure.adapters.metrics_logging.exporters import render_prometheus_text
+from src.ai_insights.infrastructure.adapters.metrics_logging.metrics import METRICS
+from src.ai_insights.infrastructure.adapters.metrics_logging.tracing import TRACER, configure_tracing_from_env
 
 app = Flask(__name__)
+# Shared by all requests, so refreshing the page does not pay for the same prompts again
+RESPONSE_CACHE = InMemoryResponseCache(max_entries=512, ttl_seconds=600)
+# Recommendations of players with the same mains, trophy band and modes are reused
+SEMANTIC_CACHE = SemanticResponseCache(similarity_threshold=0.95)
+# 'local' serves deterministic answers without calling Gemini, for offline load tests
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google")
+LLM_MODEL = "gemini-1.5-flash"
+# Insights precomputed by the batch job (llm/batch_insights.py) are served first while fresh enough
+INSIGHTS_STORE = InsightsStore()
+INSIGHTS_STORE_MAX_AGE = float(os.getenv("INSIGHTS_STORE_MAX_AGE", 24 * 3600))
+# Time budget of a request: optional sections are skipped rather than exceeding it
+INSIGHTS_DEADLINE_SECONDS = float(os.getenv("INSIGHTS_DEADLINE_SECONDS", 20))
+# Insight jobs running at the same time, each making at most one LLM call per section at once
+INSIGHTS_JOB_WORKERS = int(os.getenv("INSIGHTS_JOB_WORKERS", 4))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", INSIGHTS_JOB_WORKERS * len(INSIGHT_SECTIONS)))
+# All the LLM calls of the process go through one connector: within LLM_CONCURRENCY and the
+# RPM/TPM quota, with 429/5xx responses retried (streams only before their first chunk)
+LLM_CLIENT = AsyncConnectorClient(get_async_llm_connector(
+    llm_provider=LLM_PROVIDER, model_name=LLM_MODEL, max_concurrency=LLM_CONCURRENCY,
+    requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", 1000)),
+    tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", 1_000_000))))
+# LLM calls slower than this percentile of the recent ones get a duplicate (at most 5% extra calls); off if unset
+LLM_HEDGER = RequestHedger(percentile=float(os.environ["LLM_HEDGE_PERCENTILE"]),
+                           max_concurrency=LLM_CONCURRENCY) if os.getenv("LLM_HEDGE_PERCENTILE") else None
+
+def _stored_events(insights):
+    for section, text in insights.items():
+        yield {'event': 'section_done', 'section': section, 'text': text}
+    yield {'event': 'end', 'stage_timings': {}, 'skipped_stages': {}}
+
+def _generate_insights(tag):
+    """
+    Job of INSIGHTS_JOBS: the insights of a player tag (stored ones first) and the stages skipped.
+    The sections are published to the job as they are generated, for /insights/stream.
+    """
+    stored_insights = INSIGHTS_STORE.get_insights(tag, INSIGHTS_STORE_MAX_AGE)
+    if stored_insights is not None:
+        events = _stored_events(stored_insights)
+    else:
+        api_service = ApiService(game = 'brawl', user_id='%23' + tag, llm_provider = LLM_PROVIDER, model = LLM_MODEL,
+                                 response_cache = RESPONSE_CACHE, semantic_cache = SEMANTIC_CACHE,
+                                 deadline = Deadline(INSIGHTS_DEADLINE_SECONDS), hedger = LLM_HEDGER,
+                                 llm_client = LLM_CLIENT)
+        events = api_service.stream_ai_insights()
+    insights = dict.fromkeys(INSIGHT_SECTIONS)
+    skipped_stages = {}
+    for event in events:
+        if event['event'] == 'error':
+            # published by the job queue with the failure
+            raise RuntimeError(event['message'])
+        publish_event(event)
+        if event['event'] == 'section_done':
+            insights[event['section']] = event['text']
+        elif event['event'] == 'end':
+            skipped_stages = event['skipped_stages']
+    return {'insights': insights, 'skipped_stages': skipped_stages}
+
+# Insight generation off the request threads; concurrent requests for the same tag share one job
+INSIGHTS_JOBS = InsightsJobQueue(_generate_insights, max_workers=INSIGHTS_JOB_WORKERS)
+# Tracing is off unless TRACE_EXPORTER is set; requests with an 'X-Trace: 1' header are always sampled
+configure_tracing_from_env()
+
+def _force_trace():
+    return request.headers.get('X-Trace') == '1'
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
+    with TRACER.span(f"{request.method} /", force_sample=_force_trace()) as span:
+        response = _index()
+        span.set_attribute("user_id", request.form.get('user_id'))
+        return response
+
+def _index():
     ai_insights = None
     user_id = None
+    skipped_stages = {}
+    error = None
+    job_id = request.args.get('job_id')
     
     if request.method == 'POST':
         user_id = request.form.get('user_id')
         if user_id:
-            api_service = ApiService(game = 'brawl', user_id='%23' + user_id, model = "gemini-1.5-flash")
-            ai_insights = api_service.get_ai_insights()
+            ai_insights = INSIGHTS_STORE.get_insights(user_id, INSIGHTS_STORE_MAX_AGE)
+        if user_id and ai_insights is None:
+            # Generated by INSIGHTS_JOBS: the page polls the job instead of holding this worker
+            job, _ = INSIGHTS_JOBS.submit(user_id)
+            job_id = job.id
+    elif job_id:
+        # Reloaded by clients without JavaScript until the job is finished
+        job = INSIGHTS_JOBS.get(job_id)
+        if job is None:
+            job_id, error = None, "The insights job is unknown or expired, please generate the insights again."
+        else:
+            user_id = job.tag
+            if job.status == 'done':
+                job_id, ai_insights, skipped_stages = None, job.result['insights'], job.result['skipped_stages']
+            elif job.status == 'failed':
+                job_id, error = None, f"The insights could not be generated ({job.error})."
     
     data = {
         'title': 'Supercell AI Insights',
         'user_id': user_id,
-        'ai_insights': ai_insights
+        'ai_insights': ai_insights,
+        'skipped_stages': skipped_stages,
+        'job_id': job_id,
+        'error': error
     }
     
     return render_template('index.html', data=data)
 
+@app.route('/insights/stream')
+def stream_insights():
+    """
+    Streams the insight sections of a job as Server-Sent Events while the LLM generates them.
+    The job is the one of ?job_id=, or the one in flight for ?user_id= (submitted if none).
+    """
+    job_id, user_id = request.args.get('job_id'), request.args.get('user_id')
+    if job_id:
+        job = INSIGHTS_JOBS.get(job_id)
+        if job is None:
+            return Response('Unknown or expired job', status=404)
+    elif user_id:
+        job, _ = INSIGHTS_JOBS.submit(user_id)
+    else:
+        return Response('Missing user_id', status=400)
+
+    # a reconnecting EventSource resumes after the last event it received
+    start = request.headers.get('Last-Event-ID', default=-1, type=int) + 1
+    force_sample = _force_trace()
+
+    def event_stream():
+        with TRACER.span("GET /insights/stream", force_sample=force_sample, user_id=job.tag, job_id=job.id):
+            index = start
+            while True:
+                events = job.events_after(index, timeout=15)
+                if not events:
+                    if job.finished:
+                        return
+                    # keeps proxies from closing the idle connection
+                    yield ": keepalive\n\n"
+                for event in events:
+                    yield f"id: {index}\nevent: {event['event']}\ndata: {json.dumps(event)}\n\n"
+                    index += 1
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/insights', methods=['POST'])
+def submit_insights():
+    """Queues the insights of a player and answers at once with the job to poll."""
+    user_id = request.form.get('user_id') or (request.get_json(silent=True) or {}).get('user_id')
+    if not user_id:
+        return jsonify(error='Missing user_id'), 400
+    with TRACER.span("POST /insights", force_sample=_force_trace(), user_id=user_id) as span:
+        job, coalesced = INSIGHTS_JOBS.submit(user_id)
+        span.set_attribute("coalesced", coalesced)
+    return (jsonify(job_id=job.id, status=job.status, coalesced=coalesced), 202,
+            {'Location': f'/insights/{job.id}'})
+
+@app.route('/insights/<job_id>')
+def insights_job(job_id):
+    """Status of an insights job, with its result ({'insights', 'skipped_stages'}) once done."""
+    job = INSIGHTS_JOBS.get(job_id)
+    if job is None:
+        return jsonify(error='Unknown or expired job'), 404
+    return jsonify(job.to_dict())
+
+@app.route('/metrics')
+def metrics():
+    """Pipeline metrics (latencies, tokens, cost) in the Prometheus text format."""
+    return Response(render_prometheus_text(METRICS.collect()), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file